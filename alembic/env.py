@@ -5,8 +5,13 @@ from sqlalchemy import engine_from_config, pool
 from accounts.models import *
 from alembic import context
 from auth.models import *
+from cart.models import *
 from core.database import BaseModel
 from core.environment import env
+from favorites.models import *
+from items.models import *
+from orders.models import *
+from uploads.models import *
 from users.models import *
 
 config = context.config
@@ -0,0 +1,36 @@
+"""add image variants
+
+Revision ID: 3f1c2a7d9b04
+Revises: 8669d0f3fe8c
+Create Date: 2026-10-16 23:10:42.518301
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a7d9b04'
+down_revision = '8669d0f3fe8c'
+branch_labels = None
+depends_on = None
+
+
+# Nullable без default: добавление колонки не переписывает таблицу
+COLUMNS = [
+    ('items', 'photo_variants'),
+    ('users', 'avatar_variants'),
+]
+
+
+def upgrade():
+    for table, column in COLUMNS:
+        op.add_column(
+            table, sa.Column(column, postgresql.JSONB(astext_type=sa.Text()), nullable=True)
+        )
+
+
+def downgrade():
+    for table, column in reversed(COLUMNS):
+        op.drop_column(table, column)
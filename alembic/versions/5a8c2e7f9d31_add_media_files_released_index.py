@@ -0,0 +1,27 @@
+"""add media files released index
+
+Revision ID: 5a8c2e7f9d31
+Revises: 9d3e6f1a2b58
+Create Date: 2026-10-17 01:37:52.660193
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a8c2e7f9d31'
+down_revision = '9d3e6f1a2b58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_media_files_released', 'media_files', ['digest'],
+        unique=False, postgresql_where=sa.text('refcount = 0'),
+    )
+
+
+def downgrade():
+    op.drop_index('ix_media_files_released', table_name='media_files')
@@ -0,0 +1,40 @@
+"""add trigram search indexes
+
+Revision ID: 6878149ae7a2
+Revises: 8151065d7ecb
+Create Date: 2026-10-16 15:02:47.631905
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '6878149ae7a2'
+down_revision = '8151065d7ecb'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_items_name_trgm', 'items', 'name'),
+    ('ix_users_name_trgm', 'users', 'name'),
+]
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    with op.get_context().autocommit_block():
+        for name, table, column in INDEXES:
+            op.create_index(
+                name, table, [column],
+                postgresql_using='gin',
+                postgresql_ops={column: 'gin_trgm_ops'},
+                postgresql_concurrently=True
+            )
+
+
+def downgrade():
+    # Расширение не удаляем: им могут пользоваться не только эти индексы
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
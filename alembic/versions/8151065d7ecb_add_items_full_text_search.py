@@ -0,0 +1,54 @@
+"""add items full-text search
+
+Revision ID: 8151065d7ecb
+Revises: a9cf4a1f6194
+Create Date: 2026-10-16 13:40:05.117342
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '8151065d7ecb'
+down_revision = 'a9cf4a1f6194'
+branch_labels = None
+depends_on = None
+
+
+SEARCH_VECTOR = " || ".join([
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A')",
+    "setweight(to_tsvector('russian', coalesce(name, '')), 'A')",
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'A')",
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')",
+    "setweight(to_tsvector('russian', coalesce(description, '')), 'B')",
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'B')",
+])
+
+
+def upgrade():
+    # STORED-колонка вычисляется при добавлении: таблица переписывается
+    # под ACCESS EXCLUSIVE, на больших объёмах выкатывать в окно обслуживания
+    op.add_column(
+        'items',
+        sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed(SEARCH_VECTOR, persisted=True),
+            nullable=True,
+        ),
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_items_search_vector', 'items', ['search_vector'],
+            postgresql_using='gin', postgresql_concurrently=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_items_search_vector', table_name='items', postgresql_concurrently=True
+        )
+    op.drop_column('items', 'search_vector')
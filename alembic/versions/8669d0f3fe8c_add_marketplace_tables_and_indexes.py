@@ -0,0 +1,104 @@
+"""add marketplace indexes and unique constraints
+
+Revision ID: 8669d0f3fe8c
+Revises: 6878149ae7a2
+Create Date: 2026-10-16 17:21:09.468213
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8669d0f3fe8c'
+down_revision = '6878149ae7a2'
+branch_labels = None
+depends_on = None
+
+
+# (имя, таблица, колонки, параметры); таблицы создаёт 2e6b9f4c1a07
+INDEXES = [
+    # Внешние ключи: удаление товара/пользователя не должно сканировать таблицы
+    ('ix_favorite_items_item_id', 'favorite_items', ['item_id'], {}),
+    ('ix_favorite_shops_shop_id', 'favorite_shops', ['shop_id'], {}),
+    ('ix_cart_item_id', 'cart', ['item_id'], {}),
+    ('ix_orders_user_id', 'orders', ['user_id'], {}),
+    ('ix_order_items_item_id', 'order_items', ['item_id'], {}),
+    ('ix_refresh_tokens_user_id_expiration', 'refresh_tokens', ['user_id', 'expiration'], {}),
+    ('idx_order_item', 'order_items', ['order_id', 'item_id'], {'unique': True}),
+]
+
+# (ограничение, таблица, колонки); строится из уникального индекса с тем же именем
+UNIQUE_CONSTRAINTS = [
+    ('uq_favorite_items_user_id_item_id', 'favorite_items', ['user_id', 'item_id']),
+    ('uq_favorite_shops_user_id_shop_id', 'favorite_shops', ['user_id', 'shop_id']),
+    ('unique_user_item_cart', 'cart', ['user_id', 'item_id']),
+]
+
+# Дубли до уникальных ограничений: количества складываются в самую
+# раннюю строку, в избранном остаётся самая ранняя запись
+DEDUPLICATE = [
+    """
+    UPDATE cart SET quantity = d.quantity
+    FROM (
+        SELECT min(id) AS id, sum(quantity) AS quantity FROM cart
+        GROUP BY user_id, item_id HAVING count(*) > 1
+    ) AS d
+    WHERE cart.id = d.id
+    """,
+    """
+    DELETE FROM cart a USING cart b
+    WHERE a.user_id = b.user_id AND a.item_id = b.item_id AND a.id > b.id
+    """,
+    """
+    UPDATE order_items SET quantity = d.quantity
+    FROM (
+        SELECT min(id) AS id, sum(quantity) AS quantity FROM order_items
+        GROUP BY order_id, item_id HAVING count(*) > 1
+    ) AS d
+    WHERE order_items.id = d.id
+    """,
+    """
+    DELETE FROM order_items a USING order_items b
+    WHERE a.order_id = b.order_id AND a.item_id = b.item_id AND a.id > b.id
+    """,
+    """
+    DELETE FROM favorite_items a USING favorite_items b
+    WHERE a.user_id = b.user_id AND a.item_id = b.item_id AND a.id > b.id
+    """,
+    """
+    DELETE FROM favorite_shops a USING favorite_shops b
+    WHERE a.user_id = b.user_id AND a.shop_id = b.shop_id AND a.id > b.id
+    """,
+]
+
+
+def upgrade():
+    for statement in DEDUPLICATE:
+        op.execute(statement)
+
+    # Индексы строятся без блокировки записи, поэтому вне транзакции
+    with op.get_context().autocommit_block():
+        for name, table, columns, options in INDEXES:
+            op.create_index(
+                name, table, columns,
+                postgresql_concurrently=True, **options
+            )
+        for name, table, columns in UNIQUE_CONSTRAINTS:
+            op.create_index(
+                name, table, columns, unique=True,
+                postgresql_concurrently=True
+            )
+
+    for name, table, _ in UNIQUE_CONSTRAINTS:
+        op.execute(
+            f'ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE USING INDEX {name}'
+        )
+
+
+def downgrade():
+    # Дубли, слитые в upgrade, не восстанавливаются
+    for name, table, _ in reversed(UNIQUE_CONSTRAINTS):
+        op.drop_constraint(name, table, type_='unique')
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,35 @@
+"""add image placeholders
+
+Revision ID: 9d3e6f1a2b58
+Revises: e5b20d8c4a17
+Create Date: 2026-10-17 01:02:11.384506
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d3e6f1a2b58'
+down_revision = 'e5b20d8c4a17'
+branch_labels = None
+depends_on = None
+
+
+# Старые строки заполняет python -m dev_tools.backfill_placeholders
+COLUMNS = [
+    ('items', 'photo_placeholder', 64),
+    ('items', 'photo_color', 7),
+    ('users', 'avatar_placeholder', 64),
+    ('users', 'avatar_color', 7),
+]
+
+
+def upgrade():
+    for table, column, length in COLUMNS:
+        op.add_column(table, sa.Column(column, sa.String(length=length), nullable=True))
+
+
+def downgrade():
+    for table, column, _ in reversed(COLUMNS):
+        op.drop_column(table, column)
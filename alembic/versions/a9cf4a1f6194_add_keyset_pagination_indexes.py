@@ -0,0 +1,37 @@
+"""add keyset pagination indexes
+
+Revision ID: a9cf4a1f6194
+Revises: 2e6b9f4c1a07
+Create Date: 2026-10-16 10:12:31.204518
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9cf4a1f6194'
+down_revision = '2e6b9f4c1a07'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_items_shop_id_id', 'items', ['shop_id', 'id']),
+    ('ix_items_price_id', 'items', ['price', 'id']),
+    ('ix_favorite_items_user_id_created_at_id', 'favorite_items', ['user_id', 'created_at', 'id']),
+    ('ix_favorite_shops_user_id_created_at_id', 'favorite_shops', ['user_id', 'created_at', 'id']),
+    ('ix_cart_user_id_created_at_id', 'cart', ['user_id', 'created_at', 'id']),
+]
+
+
+def upgrade():
+    # CONCURRENTLY не работает внутри транзакции
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,27 @@
+"""add users token version
+
+Revision ID: b3d7f0e2c815
+Revises: 5a8c2e7f9d31
+Create Date: 2026-10-17 02:14:06.518230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3d7f0e2c815'
+down_revision = '5a8c2e7f9d31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        'users',
+        sa.Column('token_version', sa.Integer(), server_default='0', nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_column('users', 'token_version')
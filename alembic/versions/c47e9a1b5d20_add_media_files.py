@@ -0,0 +1,35 @@
+"""add media files
+
+Revision ID: c47e9a1b5d20
+Revises: 3f1c2a7d9b04
+Create Date: 2026-10-16 23:48:17.204715
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'c47e9a1b5d20'
+down_revision = '3f1c2a7d9b04'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('media_files',
+    sa.Column('digest', sa.String(length=64), nullable=False),
+    sa.Column('path', sa.String(length=255), nullable=False),
+    sa.Column('variants', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('refcount', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('digest'),
+    sa.UniqueConstraint('path')
+    )
+
+
+def downgrade():
+    op.drop_table('media_files')
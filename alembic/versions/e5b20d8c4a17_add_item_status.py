@@ -0,0 +1,34 @@
+"""add item status
+
+Revision ID: e5b20d8c4a17
+Revises: c47e9a1b5d20
+Create Date: 2026-10-17 00:21:36.940127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b20d8c4a17'
+down_revision = 'c47e9a1b5d20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Константный server_default не переписывает таблицу (PostgreSQL 11+)
+    op.add_column(
+        'items',
+        sa.Column('status', sa.String(length=16), server_default='ready', nullable=False),
+    )
+    op.add_column('items', sa.Column('photo_error', sa.String(length=255), nullable=True))
+    op.alter_column('items', 'photo', existing_type=sa.String(), nullable=True)
+
+
+def downgrade():
+    # У товаров без готового фото на них ссылаются корзины и избранное
+    op.execute("UPDATE items SET photo = '' WHERE photo IS NULL")
+    op.alter_column('items', 'photo', existing_type=sa.String(), nullable=False)
+    op.drop_column('items', 'photo_error')
+    op.drop_column('items', 'status')
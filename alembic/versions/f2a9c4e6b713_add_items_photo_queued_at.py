@@ -0,0 +1,27 @@
+"""add items photo queued at
+
+Revision ID: f2a9c4e6b713
+Revises: b3d7f0e2c815
+Create Date: 2026-10-17 02:41:19.072934
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2a9c4e6b713'
+down_revision = 'b3d7f0e2c815'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        'items',
+        sa.Column('photo_queued_at', sa.DateTime(timezone=True), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_column('items', 'photo_queued_at')
@@ -1,145 +1,131 @@
+import secrets
 from typing import Optional
 
-import jwt
 from dependency_injector.wiring import Provide, inject
-from fastapi import Depends
+from fastapi import Depends, Header
 
 from core.container import Container
+from core.database import set_consistency_key
 from core.environment import env
-from core.exceptions import AuthError
-from core.logger import logger
-from users.schemas import UserWithPasswordDTO
+from core.exceptions import AuthError, NotFoundError
+from core.logger import get_logger
+from users.schemas import PrincipalDTO
 from users.services import UserService
 
-from .services import JWTBearer
+from .schemas import AccessTokenClaims
+from .services import JWTBearer, TokenVersions
 
+logger = get_logger(__name__)
 
-@inject
-async def get_current_user(
-    user_service: UserService = Depends(Provide[Container.user_service]),
-    token: Optional[str] = Depends(JWTBearer()),
-) -> UserWithPasswordDTO:
-    if not token:
+
+async def _get_principal(
+    token: Optional[AccessTokenClaims],
+    user_service: UserService,
+    token_versions: TokenVersions,
+) -> PrincipalDTO:
+    if token is None:
         raise AuthError(detail="error.auth.token_not_provided")
-    payload = jwt.decode(token, env.secret_key, algorithms=[env.jwt_algorithm])
-    current_user: UserWithPasswordDTO = await user_service.get_user_by_id(
-        payload["id"], True
-    )
+    # Чтения после записи этого пользователя идут на primary
+    set_consistency_key(token.id)
+    if not await token_versions.is_current(token.id, token.ver):
+        raise AuthError(detail="error.auth.token.revoked")
+
+    # Токены, выпущенные до появления iin_bin в claims, проверяем по базе
+    if env.auth_stateless and "iin_bin" in token.model_fields_set:
+        return PrincipalDTO.model_validate(token, from_attributes=True)
+
+    current_user = await user_service.get_principal(token.id)
     if not current_user:
         raise AuthError(detail="error.auth.user.not_found")
     return current_user
 
+
 @inject
-async def get_current_seller(
+async def get_current_user(
     user_service: UserService = Depends(Provide[Container.user_service]),
-    token: Optional[str] = Depends(JWTBearer()),
-) -> UserWithPasswordDTO:
-    if not token:
-        raise AuthError(detail="error.auth.token_not_provided")
-    payload = jwt.decode(token, env.secret_key, algorithms=[env.jwt_algorithm])
-    logger.warning(f"getting current verified seller with pasyload: {payload}")
-    current_user: UserWithPasswordDTO = await user_service.get_user_by_id(
-        payload["id"], True
-    )
-    logger.warning(f"Current verified seller: {current_user}")
+    token_versions: TokenVersions = Depends(Provide[Container.token_versions]),
+    token: Optional[AccessTokenClaims] = Depends(JWTBearer()),
+) -> PrincipalDTO:
+    return await _get_principal(token, user_service, token_versions)
 
-    if not current_user:
-        raise AuthError(detail="error.auth.user.not_found")
+@inject
+async def get_current_seller(
+    user_service: UserService = Depends(Provide[Container.user_service]),
+    token_versions: TokenVersions = Depends(Provide[Container.token_versions]),
+    token: Optional[AccessTokenClaims] = Depends(JWTBearer()),
+) -> PrincipalDTO:
+    current_user = await _get_principal(token, user_service, token_versions)
     if not current_user.is_shop:
         raise AuthError(detail="error.auth.not_shop")
-    logger.info(f"User {current_user.email} is verified seller")
+    logger.debug("User %s is verified seller", current_user.email)
     return current_user
-    
+
 @inject
 async def get_current_verified_seller(
     user_service: UserService = Depends(Provide[Container.user_service]),
-    token: Optional[str] = Depends(JWTBearer()),
-) -> UserWithPasswordDTO:
-    if not token:
-        raise AuthError(detail="error.auth.token_not_provided")
-    payload = jwt.decode(token, env.secret_key, algorithms=[env.jwt_algorithm])
-    logger.warning(f"getting current verified seller with pasyload: {payload}")
-    current_user: UserWithPasswordDTO = await user_service.get_user_by_id(
-        payload["id"], True
-    )
-    logger.warning(f"Current verified seller: {current_user}")
-
-    if not current_user:
-        raise AuthError(detail="error.auth.user.not_found")
+    token_versions: TokenVersions = Depends(Provide[Container.token_versions]),
+    token: Optional[AccessTokenClaims] = Depends(JWTBearer()),
+) -> PrincipalDTO:
+    current_user = await _get_principal(token, user_service, token_versions)
     if not current_user.verified:
         raise AuthError(detail="error.auth.user.not_verified")
     if not current_user.is_shop:
         raise AuthError(detail="error.auth.not_shop")
-    logger.info(f"User {current_user.email} is verified seller")
+    logger.debug("User %s is verified seller", current_user.email)
     return current_user
 
 @inject
 async def get_current_verified_seller_with_iin_bin(
     user_service: UserService = Depends(Provide[Container.user_service]),
-    token: Optional[str] = Depends(JWTBearer()),
-) -> UserWithPasswordDTO:
-    if not token:
-        raise AuthError(detail="error.auth.token_not_provided")
-    payload = jwt.decode(token, env.secret_key, algorithms=[env.jwt_algorithm])
-    logger.warning(f"getting current verified seller with pasyload: {payload}")
-    current_user: UserWithPasswordDTO = await user_service.get_user_by_id(
-        payload["id"], True
-    )
-    logger.warning(f"Current verified seller: {current_user}")
-
-    if not current_user:
-        raise AuthError(detail="error.auth.user.not_found")
-    elif not current_user.verified:
+    token_versions: TokenVersions = Depends(Provide[Container.token_versions]),
+    token: Optional[AccessTokenClaims] = Depends(JWTBearer()),
+) -> PrincipalDTO:
+    current_user = await _get_principal(token, user_service, token_versions)
+    if not current_user.verified:
         raise AuthError(detail="error.auth.user.not_verified")
     elif not current_user.is_shop:
         raise AuthError(detail="error.auth.not_shop")
     elif not current_user.iin_bin:
         raise AuthError(detail="error.auth.iin_bin_not_provided")
-    logger.info(f"User {current_user.email} is verified seller with iin_bin")
+    logger.debug("User %s is verified seller with iin_bin", current_user.email)
     return current_user
 
 @inject
 async def get_current_verified_buyer(
     user_service: UserService = Depends(Provide[Container.user_service]),
-    token: Optional[str] = Depends(JWTBearer()),
-) -> UserWithPasswordDTO:
-    if not token:
-        raise AuthError(detail="error.auth.token_not_provided")
-    payload = jwt.decode(token, env.secret_key, algorithms=[env.jwt_algorithm])
-    logger.warning(f"getting current verified buyer with pasyload: {payload}")
-    current_user: UserWithPasswordDTO = await user_service.get_user_by_id(
-        payload["id"], True
-    )
-    logger.warning(f"Current verified buyer: {current_user}")
-
-    if not current_user:
-        raise AuthError(detail="error.auth.user.not_found")
+    token_versions: TokenVersions = Depends(Provide[Container.token_versions]),
+    token: Optional[AccessTokenClaims] = Depends(JWTBearer()),
+) -> PrincipalDTO:
+    current_user = await _get_principal(token, user_service, token_versions)
     if not current_user.verified:
         raise AuthError(detail="error.auth.user.not_verified")
     if current_user.is_shop:
         raise AuthError(detail="error.auth.is_shop")
-    
-    logger.info(f"User {current_user.email} is verified buyer")
+
+    logger.debug("User %s is verified buyer", current_user.email)
     return current_user
 
 @inject
 async def get_current_verified_user(
     user_service: UserService = Depends(Provide[Container.user_service]),
-    token: Optional[str] = Depends(JWTBearer()),
-) -> UserWithPasswordDTO:
-    if not token:
-        raise AuthError(detail="error.auth.token_not_provided")
-    payload = jwt.decode(token, env.secret_key, algorithms=[env.jwt_algorithm])
-    logger.warning(f"getting current verified user with pasyload: {payload}")
-    current_user: UserWithPasswordDTO = await user_service.get_user_by_id(
-        payload["id"], True
-    )
-    logger.warning(f"Current verified user: {current_user}")
-
-    if not current_user:
-        raise AuthError(detail="error.auth.user.not_found")
+    token_versions: TokenVersions = Depends(Provide[Container.token_versions]),
+    token: Optional[AccessTokenClaims] = Depends(JWTBearer()),
+) -> PrincipalDTO:
+    current_user = await _get_principal(token, user_service, token_versions)
     if not current_user.verified:
         raise AuthError(detail="error.auth.user.not_verified")
-    
-    logger.info(f"User {current_user.email} is verified user")
-    return current_user
\ No newline at end of file
+
+    logger.debug("User %s is verified user", current_user.email)
+    return current_user
+
+
+async def require_internal_token(
+    x_internal_token: Optional[str] = Header(default=None),
+) -> None:
+    """Служебные эндпоинты: только с INTERNAL_TOKEN, иначе их как будто нет."""
+    if not env.internal_token:
+        raise NotFoundError(detail="error.not_found")
+    if not x_internal_token or not secrets.compare_digest(
+        x_internal_token, env.internal_token
+    ):
+        raise AuthError(detail="error.auth.internal_token.invalid")
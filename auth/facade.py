@@ -4,9 +4,8 @@ from datetime import datetime, timezone
 import jwt
 import httpx
 from fastapi import HTTPException
-from core.logger import logger
 from core.environment import env
-from core.exceptions import AuthError
+from core.exceptions import AuthError, ServiceUnavailableError
 from users.schemas import UserDTO
 from users.services import UserService
 
@@ -45,15 +44,20 @@ class AuthFacade:
         return SignUpResponseSchema(data=tokens)
 
     async def sign_in(self, schema: SignInSchema) -> SignInResponseSchema:
-        logger.info(f"schema: {schema}")
         user = await self.user_service.get_user_by_email(
             schema.email, pwd_required=True
         )
-        logger.info(f"user: {user}")
         if not user or not await self.user_service.verify_password(
             schema.password, user.password
         ):
             raise InvalidCredentials()
+        try:
+            await self.user_service.rehash_password_if_needed(
+                user.id, schema.password, user.password
+            )
+        except ServiceUnavailableError:
+            # Пул занят: вход не блокируем, пересчитаем в следующий раз
+            pass
 
         tokens: AuthTokensSchema = await self.auth_service.generate_tokens(
             user
@@ -62,7 +66,12 @@ class AuthFacade:
         return SignInResponseSchema(data=tokens)
 
     async def sign_out(self, token: RefreshTokenRequestSchema) -> None:
+        refresh_token_record: RefreshTokenDTO = (
+            await self.auth_service.get_refresh_token(token.refresh_token)
+        )
         await self.auth_service.delete_refresh_token_by_token(token.refresh_token)
+        if refresh_token_record:
+            await self.auth_service.revoke_access_tokens(refresh_token_record.user_id)
         return None
 
     async def refresh_token(self, token: RefreshTokenRequestSchema) -> AuthTokensSchema:
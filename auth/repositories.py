@@ -48,16 +48,16 @@ class RefreshTokenRepository(BaseRepository):
 
     async def delete_refresh_token_by_id(self, token_id: int) -> None:
         async with self.session_factory() as session:
-            async with session.begin():
-                await session.execute(
-                    delete(RefreshToken).where(RefreshToken.id == token_id)
-                )
+            await session.execute(
+                delete(RefreshToken).where(RefreshToken.id == token_id)
+            )
+            await session.commit()
 
     async def delete_refresh_token_by_token(self, refresh_token: str) -> None:
         async with self.get_session() as session:
-            async with session.begin():
-                await session.execute(
-                    delete(RefreshToken).where(
-                        RefreshToken.refresh_token == refresh_token
-                    )
+            await session.execute(
+                delete(RefreshToken).where(
+                    RefreshToken.refresh_token == refresh_token
                 )
+            )
+            await session.commit()
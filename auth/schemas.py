@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Optional
 
 from fastapi import HTTPException
 from pydantic import BaseModel, EmailStr, field_validator, model_validator
@@ -103,6 +104,22 @@ class AccessTokenSchema(BaseModel):
     verified: bool
 
 
+class AccessTokenClaims(BaseModel):
+    """Проверенные claims access-токена, лежат в request.state.token_claims."""
+    exp: int
+    id: int
+    email: str
+    is_shop: bool
+    verified: bool
+    iin_bin: Optional[str] = None
+    ver: int = 0
+
+
+class TokenVersionDTO(BaseModel):
+    """users.token_version в кэше TokenVersions."""
+    version: int
+
+
 class RefreshTokenRequestSchema(BaseModel):
     refresh_token: str
 
@@ -1,4 +1,7 @@
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
+from typing import Optional
 
 import jwt
 from fastapi import Request
@@ -6,66 +9,120 @@ from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from pydantic import ValidationError
 
 from auth.exceptions import InvalidTokenFormat, MissingToken
+from core.cache import ObjectCache
 from core.environment import env
 from core.exceptions import AuthError
-from core.logger import logger
+from core.logger import get_logger
+from users.repositories import UserRepository
 from users.schemas import UserDTO
 
 from .repositories import RefreshTokenRepository
-from .schemas import AccessTokenSchema, AuthTokensSchema, RefreshTokenDTO
+from .schemas import (
+    AccessTokenClaims,
+    AccessTokenSchema,
+    AuthTokensSchema,
+    RefreshTokenDTO,
+)
+
+logger = get_logger(__name__)
 
 
 class JWTBearer(HTTPBearer):
+    """
+    Проверяет access-токен один раз за запрос.
+
+    Claims кладутся в request.state.token_claims, повторные вызовы в том же
+    запросе берут их оттуда. Недавно проверенные токены запоминаются в
+    небольшом LRU, чтобы не считать HMAC заново на каждый запрос клиента.
+    """
+
+    max_verified = 4096
+    _verified: OrderedDict[str, AccessTokenClaims] = OrderedDict()
+
     def __init__(self, auto_error: bool = False):
         super(JWTBearer, self).__init__(auto_error=auto_error)
 
-    async def __call__(self, request: Request):
+    async def __call__(self, request: Request) -> Optional[AccessTokenClaims]:
+        claims = getattr(request.state, "token_claims", None)
+        if claims is not None:
+            return claims
+
         credentials: HTTPAuthorizationCredentials = await super(
             JWTBearer, self
         ).__call__(request)
         if credentials:
             if not credentials.scheme == "Bearer":
                 raise AuthError(detail="error.auth.scheme.invalid")
-            if not self.verify_jwt(credentials.credentials):
+            claims = self.decode_jwt(credentials.credentials)
+            if claims is None:
                 raise AuthError(detail="error.auth.token.invalid")
-            return credentials.credentials
+            request.state.token_claims = claims
+            return claims
         else:
             return None
 
-    @staticmethod
-    def verify_jwt(jwt_token: str) -> bool:
-        is_token_valid: bool = False
-        try:
-            payload = JWTBearer.decode_jwt(jwt_token)
-            logger.warning(f"Payload: {payload}")
-        except Exception as e:
-            logger.warning(f"Error decoding JWT: {str(e)}")
-            payload = None
-        if payload:
-            is_token_valid = True
-        return is_token_valid
-
-    @staticmethod
-    def decode_jwt(token: str) -> dict:
+    @classmethod
+    def decode_jwt(cls, token: str) -> Optional[AccessTokenClaims]:
+        claims = cls._verified.get(token)
+        if claims is not None:
+            if claims.exp >= time.time():
+                cls._verified.move_to_end(token)
+                return claims
+            del cls._verified[token]
+            return None
+
         try:
-            decoded_token = jwt.decode(
+            payload = jwt.decode(
                 token, env.secret_key, algorithms=[env.jwt_algorithm]
             )
-            logger.warning(f"Decoded token: {decoded_token}")
-            return (
-                decoded_token
-                if decoded_token["exp"]
-                >= int(round(datetime.now(timezone.utc).timestamp()))
-                else None
-            )
-        except Exception as e:
-            logger.warning(f"Error decoding JWT: {str(e)}")
-            return {}
+            claims = AccessTokenClaims.model_validate(payload)
+        except (jwt.PyJWTError, ValidationError) as exc:
+            logger.debug("Invalid access token: %s", exc)
+            return None
+
+        cls._verified[token] = claims
+        while len(cls._verified) > cls.max_verified:
+            cls._verified.popitem(last=False)
+        return claims
+
+
+class TokenVersions:
+    """
+    Версия токенов пользователя для отзыва access-токенов до истечения.
+
+    Токен несёт версию на момент выпуска (claim ver) и принимается, пока
+    она не меньше текущей. Повышение версии отзывает все выпущенные
+    ранее access-токены пользователя; refresh-токены продолжают работать
+    и выдают токены с новой версией и актуальными claims.
+
+    Версия хранится в users.token_version, кэш только ускоряет проверку:
+    вытесненный или истёкший ключ означает чтение из базы, а не 0.
+    """
+
+    def __init__(self, cache: ObjectCache, repo: UserRepository):
+        self.cache = cache
+        self.repo = repo
+
+    async def get(self, user_id: int) -> int:
+        current = await self.cache.get_or_load(
+            user_id, lambda: self.repo.get_token_version(user_id)
+        )
+        return current.version if current else 0
+
+    async def is_current(self, user_id: int, version: int) -> bool:
+        return version >= await self.get(user_id)
+
+    async def bump(self, user_id: int) -> int:
+        version = await self.repo.bump_token_version(user_id)
+        # Метка поколения не даст загрузке со старой версией вернуться в кэш
+        await self.cache.invalidate(user_id)
+        return version
 
 
 class AuthService:
-    def __init__(self, repo: RefreshTokenRepository):
+    def __init__(self, repo: RefreshTokenRepository, token_versions: TokenVersions):
         self.repo = repo
+        self.token_versions = token_versions
 
     async def _create_access_token(self, user: UserDTO) -> tuple[str, datetime]:
         expiration_datetime = datetime.now(timezone.utc) + timedelta(
@@ -77,7 +134,9 @@ class AuthService:
             "id": user.id,
             "email": user.email,
             "is_shop": user.is_shop,
-            "verified": user.verified
+            "verified": user.verified,
+            "iin_bin": user.iin_bin,
+            "ver": await self.token_versions.get(user.id),
         }
         access_token = jwt.encode(payload, env.secret_key, algorithm=env.jwt_algorithm)
         access_token_padded = self.add_padding_to_jwt(access_token)
@@ -124,7 +183,7 @@ class AuthService:
             token_data = AccessTokenSchema(**payload)
             return token_data
         except (jwt.PyJWTError, ValidationError) as e:
-            logger.warning(f"Invalid JWT token, reason is {e}")
+            logger.debug("Invalid JWT token: %s", e)
             raise AuthError(detail="error.auth.credentials.invalid")
 
     async def get_refresh_token(self, refresh_token: str) -> RefreshTokenDTO:
@@ -136,6 +195,9 @@ class AuthService:
     async def delete_refresh_token_by_token(self, refresh_token: str) -> None:
         await self.repo.delete_refresh_token_by_token(refresh_token)
 
+    async def revoke_access_tokens(self, user_id: int) -> None:
+        await self.token_versions.bump(user_id)
+
     async def get_socketio_token(self, environ: dict) -> RefreshTokenDTO:
         headers = dict(environ["asgi.scope"].get("headers", []))
         auth_header = headers.get(b"authorization", None)
@@ -1,14 +1,16 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, func, UniqueConstraint
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, func, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
-from core.database import Base
+from core.database import BaseModel
 from sqlalchemy.orm import Mapped, mapped_column
 from datetime import datetime
 
 
-class Cart(Base):
+class Cart(BaseModel):
     __tablename__ = "cart"
     __table_args__ = (
         UniqueConstraint("user_id", "item_id", name="unique_user_item_cart"),
+        Index("ix_cart_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_cart_item_id", "item_id"),
     )
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"))
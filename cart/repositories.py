@@ -1,42 +1,46 @@
+from core.pagination import Keyset, paginate
 from core.repositories import BaseRepository
 from cart.models import Cart
 from items.models import Item
 from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import selectinload
 from cart.schemas import CartDTO, CartItemDTO
 
 
+CART_KEYSET = Keyset("-created_at", Cart.created_at, Cart.id, descending=True)
+
+
 class CartRepository(BaseRepository):
 
     async def add_to_cart(self, item_id: int, user_id: int) -> Item:
         async with self.get_session() as session:
-            query = await session.execute(
-                select(Cart).where(
-                    Cart.item_id == item_id, 
-                    Cart.user_id == user_id
+            # Один запрос вместо SELECT + INSERT/UPDATE: параллельные
+            # добавления не упираются в unique_user_item_cart
+            cart = await session.scalar(
+                insert(Cart)
+                .values(item_id=item_id, user_id=user_id, quantity=1)
+                .on_conflict_do_update(
+                    constraint="unique_user_item_cart",
+                    set_={"quantity": Cart.quantity + 1},
                 )
+                .returning(Cart)
             )
-            cart = query.scalar_one_or_none()
-            if cart:
-                cart.quantity += 1
-            else:
-                cart = Cart(item_id=item_id, user_id=user_id, quantity=1)
-                session.add(cart)
             await session.commit()
-            await session.refresh(cart)
             return CartDTO.model_validate(cart)
 
-    async def get_cart(self, user_id: int, limit: int = 10, offset: int = 0) -> tuple[list[CartItemDTO], int, float]:
+    async def get_cart(
+        self, user_id: int, limit: int = 10, offset: int = 0,
+        cursor: str | None = None
+    ) -> tuple[list[CartItemDTO], int, float, str | None]:
         async with self.get_session() as session:
-            query = await session.execute(
+            carts, next_cursor = await paginate(
+                session,
                 select(Cart).options(
                     selectinload(Cart.item)
-                ).where(Cart.user_id == user_id)
-                .order_by(Cart.created_at.desc())
-                .limit(limit)
-                .offset(offset)
+                ).where(Cart.user_id == user_id),
+                CART_KEYSET, limit, offset, cursor
             )
-            carts = query.scalars().all()
             count_query = await session.execute(
                 select(func.count(Cart)).where(Cart.user_id == user_id)
             )
@@ -51,7 +55,9 @@ class CartRepository(BaseRepository):
             )
             total_price = total_price_query.scalar()
             
-            return [CartItemDTO.model_validate(cart) for cart in carts], count, total_price
+            return [
+                CartItemDTO.model_validate(cart) for cart in carts
+            ], count, total_price, next_cursor
 
     async def decrease_item_quantity(self, item_id: int, user_id: int) -> None:
         async with self.get_session() as session:
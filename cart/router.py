@@ -27,11 +27,12 @@ async def add_to_cart(
 async def get_cart(
     limit: int = 10,
     offset: int = 0,
+    cursor: str | None = None,
     cart_service: CartService = Depends(Provide[Container.cart_service]),
     user: UserDTO = Depends(get_current_verified_buyer)
 ) -> GetCartResponseSchema:
     """Get cart"""
-    return await cart_service.get_cart(user.id, limit, offset)
+    return await cart_service.get_cart(user.id, limit, offset, cursor)
 
 
 @router.delete("/decrease/{item_id}/")
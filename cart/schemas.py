@@ -1,4 +1,5 @@
 from pydantic import BaseModel, ConfigDict
+from core.schemas import CursorSchema
 from items.schemas import ItemDTO
 from datetime import datetime
 from orders.schemas import OrderDTO
@@ -25,7 +26,7 @@ class CartItemDTO(BaseModel):
     item: ItemDTO
 
 
-class GetCartResponseSchema(BaseModel):
+class GetCartResponseSchema(CursorSchema):
     data: list[CartItemDTO]
     total_price: float
 
@@ -20,15 +20,17 @@ class CartService:
         return AddToCartResponseSchema(data=cart_item)
 
     async def get_cart(
-        self, user_id: int, limit: int = 10, offset: int = 0
+        self, user_id: int, limit: int = 10, offset: int = 0,
+        cursor: str | None = None
     ) -> GetCartResponseSchema:
-        cart_items, count, total_price = await self.cart_repository.get_cart(
-            user_id, limit, offset
+        cart_items, count, total_price, next_cursor = (
+            await self.cart_repository.get_cart(user_id, limit, offset, cursor)
         )
         return GetCartResponseSchema(
             data=cart_items,
             total_price=total_price,
-            total_count=count
+            total_count=count,
+            next_cursor=next_cursor
         )
     
     async def decrease_item_quantity(
@@ -0,0 +1,371 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable, Generic, Hashable, Optional, TypeVar
+
+from pydantic import BaseModel
+
+from core.database import primary_scope
+from core.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class CacheBackend:
+    """Хранилище кэша, общее для воркеров (Redis) или локальное (память)."""
+
+    async def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        raise NotImplementedError
+
+    async def delete(self, *keys: str) -> None:
+        raise NotImplementedError
+
+    async def incr(self, key: str, ttl: float) -> int:
+        """Атомарно увеличивает счётчик и продлевает его TTL."""
+        raise NotImplementedError
+
+    async def publish(self, channel: str, message: str) -> None:
+        raise NotImplementedError
+
+    async def subscribe(self, channel: str, callback: Callable[[str], None]) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryCacheBackend(CacheBackend):
+    """LRU с TTL в памяти процесса; сообщения доходят только до этого процесса."""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[bytes, float]] = OrderedDict()
+        self._subscribers: dict[str, list[Callable[[str], None]]] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        cached = self._entries.get(key)
+        if cached is None:
+            return None
+        if cached[1] <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return cached[0]
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+    async def incr(self, key: str, ttl: float) -> int:
+        value = int(await self.get(key) or 0) + 1
+        await self.set(key, str(value).encode(), ttl)
+        return value
+
+    async def publish(self, channel: str, message: str) -> None:
+        for callback in self._subscribers.get(channel, []):
+            callback(message)
+
+    async def subscribe(self, channel: str, callback: Callable[[str], None]) -> None:
+        self._subscribers.setdefault(channel, []).append(callback)
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Redis (или совместимый сервер) через redis.asyncio.
+
+    Пакет redis импортируется только при выборе этого бэкенда. Ошибки Redis
+    не роняют запросы: чтение считается промахом, запись пропускается.
+    """
+
+    def __init__(self, url: str, prefix: str = "vtrende"):
+        try:
+            from redis import asyncio as redis
+        except ImportError as exc:
+            raise RuntimeError(
+                "cache_url указывает на Redis, но пакет redis не установлен"
+            ) from exc
+        self.prefix = prefix
+        self._errors = (redis.RedisError, OSError)
+        self._redis = redis.from_url(url)
+        self._subscribers: dict[str, list[Callable[[str], None]]] = {}
+        self._listener: Optional[asyncio.Task] = None
+        self._pubsub = None
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    async def get(self, key: str) -> Optional[bytes]:
+        try:
+            return await self._redis.get(self._key(key))
+        except self._errors as exc:
+            logger.warning("Cache read failed: %s", exc)
+            return None
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        try:
+            await self._redis.set(self._key(key), value, px=int(ttl * 1000))
+        except self._errors as exc:
+            logger.warning("Cache write failed: %s", exc)
+
+    async def delete(self, *keys: str) -> None:
+        # Удаление не глотаем: иначе другие воркеры увидят старые данные
+        await self._redis.delete(*(self._key(key) for key in keys))
+
+    async def incr(self, key: str, ttl: float) -> int:
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.incr(self._key(key))
+            pipe.pexpire(self._key(key), int(ttl * 1000))
+            value, _ = await pipe.execute()
+        return value
+
+    async def publish(self, channel: str, message: str) -> None:
+        try:
+            await self._redis.publish(self._key(channel), message)
+        except self._errors as exc:
+            logger.warning("Cache invalidation publish failed: %s", exc)
+
+    async def subscribe(self, channel: str, callback: Callable[[str], None]) -> None:
+        self._subscribers.setdefault(self._key(channel), []).append(callback)
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+        elif self._pubsub is not None:
+            await self._pubsub.subscribe(self._key(channel))
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = self._pubsub = self._redis.pubsub()
+            try:
+                await pubsub.subscribe(*self._subscribers)
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    channel = message["channel"].decode()
+                    for callback in self._subscribers.get(channel, []):
+                        callback(message["data"].decode())
+            except asyncio.CancelledError:
+                raise
+            except self._errors as exc:
+                logger.warning("Cache invalidation listener failed: %s", exc)
+                await asyncio.sleep(1.0)
+            finally:
+                self._pubsub = None
+                await pubsub.aclose()
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+        await self._redis.aclose()
+
+
+def create_cache_backend(url: str) -> CacheBackend:
+    """memory:// - кэш внутри воркера, redis://... - общий для всех воркеров."""
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCacheBackend(url)
+    return MemoryCacheBackend()
+
+
+class ResponseCache:
+    """
+    Ограниченный LRU-кэш готовых ответов (bytes) внутри процесса.
+
+    Параллельные промахи по одному ключу ждут одну загрузку, а не идут
+    в базу каждый сам. invalidate() сбрасывает всё и отбрасывает результаты
+    загрузок, начатых до сброса, чтобы они не вернули в кэш старые данные.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 10.0,
+        max_entries: int = 1024,
+        backend: Optional[CacheBackend] = None,
+        channel: str = "catalog",
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.backend = backend
+        self.channel = f"invalidate:{channel}"
+        # Свои же сообщения об инвалидации пропускаем
+        self._instance_id = uuid.uuid4().hex
+        self._entries: OrderedDict[Hashable, tuple[bytes, float]] = OrderedDict()
+        self._loading: dict[Hashable, asyncio.Future] = {}
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    async def get_or_load(
+        self, key: Hashable, loader: Callable[[], Awaitable[bytes]]
+    ) -> bytes:
+        cached = self._entries.get(key)
+        if cached is not None and cached[1] > time.monotonic():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return cached[0]
+
+        pending = self._loading.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # Отменили загружавший запрос (клиент отключился), а не нас
+                if not pending.cancelled():
+                    raise
+                return await self.get_or_load(key, loader)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        generation = self._generation
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            # Исключение уже отдано ожидающим, само future никто не читает
+            future.exception()
+            raise
+        finally:
+            if self._loading.get(key) is future:
+                del self._loading[key]
+
+        future.set_result(value)
+        if generation == self._generation:
+            self._store(key, value)
+        return value
+
+    async def invalidate(self) -> None:
+        """Сбрасывает кэш в этом воркере и рассылает сброс остальным."""
+        self._invalidate_local()
+        if self.backend is not None:
+            await self.backend.publish(self.channel, self._instance_id)
+
+    async def listen(self) -> None:
+        if self.backend is not None:
+            await self.backend.subscribe(self.channel, self._on_invalidate)
+
+    def _on_invalidate(self, sender: str) -> None:
+        if sender != self._instance_id:
+            self._invalidate_local()
+
+    def _invalidate_local(self) -> None:
+        self._entries.clear()
+        self._loading.clear()
+        self._generation += 1
+        self.invalidations += 1
+
+    def _store(self, key: Hashable, value: bytes) -> None:
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
+
+
+Model = TypeVar("Model", bound=BaseModel)
+
+
+class ObjectCache(Generic[Model]):
+    """
+    Кэш DTO по id поверх CacheBackend.
+
+    Версия входит в ключ ({namespace}:v{version}:{id}): при изменении
+    формы DTO версию поднимают, и воркеры со старым кодом во время выкатки
+    не читают несовместимые записи. Инвалидация удаляет ключ в общем
+    бэкенде, поэтому видна всем воркерам сразу.
+
+    Инвалидация ещё и ставит метку поколения объекта. Загрузка, начатая
+    до метки, не кладёт результат в кэш (как в ResponseCache), а загрузка
+    при существующей метке читает primary: реплика могла не догнать запись.
+    """
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        namespace: str,
+        schema: type[Model],
+        ttl: float = 60.0,
+        version: int = 1,
+    ):
+        self.backend = backend
+        self.namespace = namespace
+        self.schema = schema
+        self.ttl = ttl
+        self.version = version
+        # Метка поколения живёт дольше загрузки и отставания реплики
+        self.generation_ttl = max(ttl, 60.0)
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, object_id: Hashable) -> str:
+        return f"{self.namespace}:v{self.version}:{object_id}"
+
+    def _generation_key(self, object_id: Hashable) -> str:
+        return f"{self.key(object_id)}:gen"
+
+    async def get_or_load(
+        self, object_id: Hashable, loader: Callable[[], Awaitable[Optional[Model]]]
+    ) -> Optional[Model]:
+        cached = await self.backend.get(self.key(object_id))
+        if cached is not None:
+            self.hits += 1
+            return self.schema.model_validate_json(cached)
+
+        self.misses += 1
+        generation_key = self._generation_key(object_id)
+        generation = await self.backend.get(generation_key)
+        if generation is not None:
+            with primary_scope():
+                value = await loader()
+        else:
+            value = await loader()
+        # Отсутствие не кэшируем: объект может появиться следующим запросом.
+        # Если за время загрузки объект изменили, результат уже устарел
+        if value is not None and await self.backend.get(generation_key) == generation:
+            await self.backend.set(
+                self.key(object_id), value.model_dump_json().encode(), self.ttl
+            )
+        return value
+
+    async def invalidate(self, object_id: Hashable) -> None:
+        # Сначала метка: загрузка, прочитавшая старые данные, её увидит
+        await self.backend.set(
+            self._generation_key(object_id), uuid.uuid4().hex.encode(),
+            self.generation_ttl,
+        )
+        await self.backend.delete(self.key(object_id))
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
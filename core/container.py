@@ -10,16 +10,35 @@ from accounts.services import (
 )
 from auth.facade import AuthFacade
 from auth.repositories import RefreshTokenRepository
-from auth.services import AuthService
-from core.database import Database, UnitOfWork
+from auth.schemas import TokenVersionDTO
+from auth.services import AuthService, TokenVersions
+from core.cache import ObjectCache, ResponseCache, create_cache_backend
+from core.counting import RowCounter
+from core.database import Database, UnitOfWork, UnitOfWorkFactory
 from core.email_sender import EmailSender
+from core.hashing import PasswordHasher
+from core.images import ImageProcessor
+from core.jobs import JobQueue
 from core.environment import env
+from uploads.collector import MediaCollector
+from uploads.repositories import MediaRepository
+from uploads.services import MediaService
+from uploads.storage import create_media_storage
 from users.repositories import UserRepository
 from users.services import UserService
 from favorites.repositories import FavoriteRepository
 from favorites.services import FavoriteService
 from items.repositories import ItemRepository
 from items.services import ItemService
+from items.schemas import ItemDTO
+from users.schemas import PrincipalDTO, UserDTO
+
+
+def database_url(host: str) -> str:
+    if ":" not in host:
+        host = f"{host}:{env.POSTGRES_PORT}"
+    return f"{env.DATABASE_DIALECT}+asyncpg://{env.POSTGRES_USER}:{env.POSTGRES_PASSWORD}@{host}/{env.POSTGRES_DB}"
+
 
 class Container(containers.DeclarativeContainer):
     wiring_config = containers.WiringConfiguration(
@@ -30,15 +49,95 @@ class Container(containers.DeclarativeContainer):
             "accounts.router",
             "favorites.router",
             "items.router",
+            "core.router",
+            "uploads.router",
         ]
     )
 
     db = providers.Singleton(
         Database,
-        db_url=f"{env.DATABASE_DIALECT}+asyncpg://{env.POSTGRES_USER}:{env.POSTGRES_PASSWORD}@{env.POSTGRES_HOSTNAME}:{env.POSTGRES_PORT}/{env.POSTGRES_DB}",
+        db_url=database_url(env.POSTGRES_HOSTNAME),
+        replica_urls=[database_url(host) for host in env.POSTGRES_REPLICA_HOSTNAMES],
+        echo=env.db_echo,
+        pool_size=env.db_pool_size,
+        max_overflow=env.db_max_overflow,
+        pool_timeout=env.db_pool_timeout,
+        pool_recycle=env.db_pool_recycle,
+        pool_pre_ping=env.db_pool_pre_ping,
+        statement_cache_size=env.db_statement_cache_size,
+        pgbouncer=env.db_pgbouncer,
+        replica_max_lag=env.db_replica_max_lag,
+        replica_check_interval=env.db_replica_check_interval,
+        read_your_writes_window=env.db_read_your_writes_window,
+    )
+
+    unit_of_work = providers.Factory(
+        UnitOfWork, session_factory=db.provided.session_factory
+    )
+    unit_of_work_factory = providers.Singleton(
+        UnitOfWorkFactory, session_factory=db.provided.session_factory
+    )
+
+    row_counter = providers.Singleton(RowCounter, ttl=env.count_cache_ttl)
+    cache_backend = providers.Singleton(create_cache_backend, url=env.cache_url)
+    catalog_cache = providers.Singleton(
+        ResponseCache,
+        ttl=env.catalog_cache_ttl,
+        max_entries=env.catalog_cache_max_entries,
+        backend=cache_backend,
+        channel="catalog",
+    )
+    item_cache = providers.Singleton(
+        ObjectCache,
+        backend=cache_backend,
+        namespace="item",
+        schema=ItemDTO,
+        ttl=env.object_cache_ttl,
+        version=4,
+    )
+    shop_cache = providers.Singleton(
+        ObjectCache,
+        backend=cache_backend,
+        namespace="shop",
+        schema=UserDTO,
+        ttl=env.object_cache_ttl,
+        version=3,
+    )
+    token_version_cache = providers.Singleton(
+        ObjectCache,
+        backend=cache_backend,
+        namespace="token_version",
+        schema=TokenVersionDTO,
+        ttl=env.object_cache_ttl,
+    )
+    principal_cache = providers.Singleton(
+        ObjectCache,
+        backend=cache_backend,
+        namespace="principal",
+        schema=PrincipalDTO,
+        ttl=env.principal_cache_ttl,
+    )
+
+    password_hasher = providers.Singleton(
+        PasswordHasher,
+        rounds=env.password_hash_rounds,
+        workers=env.password_hash_workers,
+        max_pending=env.password_hash_max_pending,
+    )
+
+    image_processor = providers.Singleton(
+        ImageProcessor,
+        workers=env.image_workers,
+        max_concurrent=env.image_max_concurrent,
+        queue_timeout=env.image_queue_timeout,
+        job_timeout=env.image_job_timeout,
     )
 
-    unit_of_work = providers.Factory(UnitOfWork, session_factory=db.provided.session)
+    job_queue = providers.Singleton(
+        JobQueue,
+        workers=env.jobs_workers,
+        max_size=env.jobs_max_queued,
+    )
 
     email_sender = providers.Singleton(
         EmailSender,
@@ -50,11 +149,54 @@ class Container(containers.DeclarativeContainer):
         start_ssl=env.smtp_start_ssl,
     )
 
+    media_storage = providers.Singleton(
+        create_media_storage,
+        backend=env.media_storage,
+        root=env.media_local_root,
+        prefix=env.media_root,
+        bucket=env.s3_bucket,
+        endpoint_url=env.s3_endpoint_url,
+        region=env.s3_region,
+        access_key_id=env.s3_access_key_id,
+        secret_access_key=env.s3_secret_access_key,
+        multipart_threshold=env.s3_multipart_threshold,
+        part_size=env.s3_part_size,
+    )
+    media_repository = providers.Factory(
+        MediaRepository, session_factory=db.provided.session
+    )
+    media_service = providers.Factory(
+        MediaService,
+        repo=media_repository,
+        image_processor=image_processor,
+        storage=media_storage,
+        media_root=env.media_root,
+        max_upload_bytes=env.upload_max_bytes,
+        max_upload_pixels=env.upload_max_pixels,
+    )
+
+    media_collector = providers.Singleton(
+        MediaCollector,
+        repo=media_repository,
+        storage=media_storage,
+        media_root=env.media_root,
+        grace_period=env.media_gc_grace_period,
+        batch_size=env.media_gc_batch_size,
+        interval=env.media_gc_interval,
+    )
+
     refresh_token_repository = providers.Factory(
         RefreshTokenRepository, session_factory=db.provided.session
     )
     user_repository = providers.Factory(
-        UserRepository, session_factory=db.provided.session
+        UserRepository,
+        session_factory=db.provided.session,
+        shop_cache=shop_cache,
+        principal_cache=principal_cache,
+        media=media_service,
+    )
+    token_versions = providers.Singleton(
+        TokenVersions, cache=token_version_cache, repo=user_repository
     )
     verification_code_repository = providers.Factory(
         VerificationTokenRepository, session_factory=db.provided.session
@@ -63,14 +205,29 @@ class Container(containers.DeclarativeContainer):
         RecoveryTokenRepository, session_factory=db.provided.session
     )
     favorite_repository = providers.Factory(
-        FavoriteRepository, session_factory=db.provided.session
+        FavoriteRepository,
+        session_factory=db.provided.session,
+        counter=row_counter,
     )
     item_repository = providers.Factory(
-        ItemRepository, session_factory=db.provided.session
+        ItemRepository,
+        session_factory=db.provided.session,
+        counter=row_counter,
+        item_cache=item_cache,
+        media=media_service,
     )
 
-    auth_service = providers.Factory(AuthService, repo=refresh_token_repository)
-    user_service = providers.Factory(UserService, repo=user_repository)
+    auth_service = providers.Factory(
+        AuthService,
+        repo=refresh_token_repository,
+        token_versions=token_versions,
+    )
+    user_service = providers.Factory(
+        UserService,
+        repo=user_repository,
+        token_versions=token_versions,
+        password_hasher=password_hasher,
+    )
     verification_code_service = providers.Factory(
         VerificationTokenService, repo=verification_code_repository
     )
@@ -85,7 +242,10 @@ class Container(containers.DeclarativeContainer):
     )
     item_service = providers.Factory(
         ItemService,
-        repo=item_repository
+        item_repository=item_repository,
+        catalog_cache=catalog_cache,
+        media=media_service,
+        jobs=job_queue,
     )
 
     auth_facade = providers.Factory(
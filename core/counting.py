@@ -0,0 +1,114 @@
+import json
+import time
+from collections import OrderedDict
+from enum import Enum
+from typing import Optional
+
+from sqlalchemy import Select, Table, func, select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class CountStrategy(str, Enum):
+    EXACT = "exact"
+    CACHED = "cached"
+    ESTIMATED = "estimated"
+
+
+class RowCounter:
+    """
+    Подсчёт total для пагинированных списков.
+
+    exact     - честный count(*) на каждый запрос;
+    cached    - count(*) с TTL, сбрасывается через invalidate(namespace);
+    estimated - оценка планировщика (pg_class.reltuples или EXPLAIN),
+                небольшие выборки всё равно считаются точно.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 30.0,
+        max_entries: int = 10000,
+        estimate_threshold: int = 1000,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.estimate_threshold = estimate_threshold
+        self._entries: OrderedDict[tuple, tuple[int, float]] = OrderedDict()
+
+    async def count(
+        self,
+        session: AsyncSession,
+        query: Select,
+        strategy: Optional[CountStrategy],
+        namespace: str,
+    ) -> Optional[int]:
+        """strategy=None означает, что клиенту total не нужен."""
+        if strategy is None:
+            return None
+        query = query.order_by(None)
+        if strategy == CountStrategy.EXACT:
+            return await self._exact(session, query)
+        if strategy == CountStrategy.ESTIMATED:
+            return await self._estimated(session, query)
+
+        key = (namespace, self._fingerprint(query))
+        now = time.monotonic()
+        cached = self._entries.get(key)
+        if cached is not None and cached[1] > now:
+            self._entries.move_to_end(key)
+            return cached[0]
+
+        value = await self._exact(session, query)
+        self._entries[key] = (value, now + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, namespace: str) -> None:
+        for key in [key for key in self._entries if key[0] == namespace]:
+            del self._entries[key]
+
+    @staticmethod
+    def _fingerprint(query: Select) -> tuple:
+        compiled = query.compile(dialect=postgresql.dialect())
+        return str(compiled), tuple(sorted(compiled.params.items()))
+
+    @staticmethod
+    async def _exact(session: AsyncSession, query: Select) -> int:
+        result = await session.execute(
+            select(func.count()).select_from(query.subquery())
+        )
+        return result.scalar_one()
+
+    async def _estimated(self, session: AsyncSession, query: Select) -> int:
+        froms = query.get_final_froms()
+        if query.whereclause is None and len(froms) == 1 and isinstance(froms[0], Table):
+            estimate = await session.scalar(
+                text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:name AS regclass)"),
+                {"name": froms[0].name},
+            )
+        else:
+            sql = query.compile(
+                dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+            )
+            connection = await session.connection()
+            result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}")
+            plan = result.scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            estimate = plan[0]["Plan"]["Plan Rows"]
+
+        # reltuples = -1 у ни разу не анализированной таблицы
+        if estimate is None or estimate < self.estimate_threshold:
+            return await self._exact(session, query)
+        return int(estimate)
+
+
+def count_strategy_for(
+    strategies: dict[str, CountStrategy], endpoint: str, with_count: bool
+) -> Optional[CountStrategy]:
+    if not with_count:
+        return None
+    return strategies.get(endpoint, CountStrategy.EXACT)
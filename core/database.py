@@ -1,33 +1,413 @@
-from contextlib import AbstractAsyncContextManager, asynccontextmanager
+import asyncio
+import time
+from collections import deque
+from contextlib import (
+    AbstractAsyncContextManager,
+    asynccontextmanager,
+    contextmanager,
+)
+from contextvars import ContextVar, Token
 from typing import Callable, Optional
+from uuid import uuid4
 
+from sqlalchemy import event, text
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
-from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.orm import DeclarativeBase, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.sql.dml import UpdateBase
+
+from core.logger import get_logger
 
-from core.logger import logger
+logger = get_logger(__name__)
 
 
 class BaseModel(DeclarativeBase):
     pass
 
 
+# UnitOfWork текущего запроса; сессию он открывает при первом обращении
+_current_unit: ContextVar[Optional["UnitOfWork"]] = ContextVar(
+    "current_unit", default=None
+)
+# Выставляется декоратором read_only: запрос можно отправить на реплику
+_read_only: ContextVar[bool] = ContextVar("read_only", default=False)
+# Выставляется primary_scope: чтение идёт на primary даже в read_only методе
+_primary: ContextVar[bool] = ContextVar("primary", default=False)
+# Ключ для read-your-writes, обычно id текущего пользователя
+_consistency_key: ContextVar[Optional[str]] = ContextVar(
+    "consistency_key", default=None
+)
+
+
+def set_consistency_key(key) -> None:
+    _consistency_key.set(str(key) if key is not None else None)
+
+
+@contextmanager
+def read_only_scope():
+    token = _read_only.set(True)
+    try:
+        yield
+    finally:
+        _read_only.reset(token)
+
+
+@contextmanager
+def primary_scope():
+    """Чтения внутри читают primary: данные только что изменились."""
+    token = _primary.set(True)
+    try:
+        yield
+    finally:
+        _primary.reset(token)
+
+
+class PoolStats:
+    """Счётчики ожидания и удержания соединений пула."""
+
+    def __init__(self, window: int = 1024):
+        self.checkouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self._wait_samples: deque[float] = deque(maxlen=window)
+        self._hold_samples: deque[float] = deque(maxlen=window)
+
+    def record_wait(self, seconds: float) -> None:
+        self.checkouts += 1
+        self.wait_time_total += seconds
+        self.wait_time_max = max(self.wait_time_max, seconds)
+        self._wait_samples.append(seconds)
+
+    def record_hold(self, seconds: float) -> None:
+        self._hold_samples.append(seconds)
+
+    @staticmethod
+    def _p99(samples: deque[float]) -> float:
+        if not samples:
+            return 0.0
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+
+    def snapshot(self) -> dict:
+        return {
+            "checkouts_total": self.checkouts,
+            "wait_time_total_ms": round(self.wait_time_total * 1000, 3),
+            "wait_time_max_ms": round(self.wait_time_max * 1000, 3),
+            "checkout_wait_p99_ms": round(self._p99(self._wait_samples) * 1000, 3),
+            "checkout_hold_p99_ms": round(self._p99(self._hold_samples) * 1000, 3),
+        }
+
+
+class ObservedQueuePool(AsyncAdaptedQueuePool):
+    """Пул, замеряющий время ожидания свободного соединения."""
+
+    stats: Optional[PoolStats] = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            if self.stats is not None:
+                self.stats.record_wait(time.perf_counter() - started)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+class ReplicaRouter:
+    """
+    Выбор реплики для чтения.
+
+    Реплика исключается из ротации, если её отставание больше max_lag или
+    она недоступна. После записи пользователь (ключ согласованности)
+    читает с primary в течение read_your_writes_window секунд.
+
+    Время последней записи хранится в памяти процесса, поэтому гарантия
+    действует внутри одного воркера. Между воркерами её дают липкие сессии
+    балансировщика или короткий read_your_writes_window вместе с max_lag.
+    """
+
+    LAG_QUERY = text(
+        "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() "
+        "THEN 0 ELSE COALESCE("
+        "EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+    )
+
+    def __init__(
+        self,
+        primary: AsyncEngine,
+        replicas: list[AsyncEngine],
+        max_lag: float = 5.0,
+        read_your_writes_window: float = 10.0,
+    ):
+        self.primary = primary
+        self.replicas = replicas
+        self.max_lag = max_lag
+        self.read_your_writes_window = read_your_writes_window
+        self.lag: dict[int, Optional[float]] = {i: None for i in range(len(replicas))}
+        self.healthy: list[AsyncEngine] = list(replicas)
+        self._next = 0
+        self._last_write: dict[str, float] = {}
+
+    def pick_replica(self) -> Optional[AsyncEngine]:
+        if not self.healthy:
+            return None
+        self._next = (self._next + 1) % len(self.healthy)
+        return self.healthy[self._next]
+
+    def record_write(self) -> None:
+        key = _consistency_key.get()
+        if key is None:
+            return
+        now = time.monotonic()
+        if len(self._last_write) > 10000:
+            self._last_write = {
+                k: t for k, t in self._last_write.items()
+                if now - t < self.read_your_writes_window
+            }
+        self._last_write[key] = now
+
+    def is_sticky(self) -> bool:
+        key = _consistency_key.get()
+        if key is None:
+            return False
+        written_at = self._last_write.get(key)
+        return (
+            written_at is not None
+            and time.monotonic() - written_at < self.read_your_writes_window
+        )
+
+    async def check_replicas(self, timeout: float = 2.0) -> None:
+        healthy = []
+        for index, replica in enumerate(self.replicas):
+            try:
+                async with replica.connect() as connection:
+                    lag = await asyncio.wait_for(
+                        connection.scalar(self.LAG_QUERY), timeout
+                    )
+                self.lag[index] = float(lag)
+            except Exception as e:
+                logger.warning("Replica %s is unavailable: %s", index, e)
+                self.lag[index] = None
+                continue
+            if self.lag[index] <= self.max_lag:
+                healthy.append(replica)
+        self.healthy = healthy
+
+    async def monitor(self, interval: float) -> None:
+        while True:
+            await self.check_replicas()
+            await asyncio.sleep(interval)
+
+
+class RoutingSession(Session):
+    """Отправляет чтения из read_only методов на реплики, остальное на primary."""
+
+    def __init__(self, router: Optional[ReplicaRouter] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.router = router
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        writing = self._flushing or isinstance(clause, UpdateBase)
+        if writing:
+            # Транзакцию с записью Database.session не завершает сам
+            self.info["transaction_wrote"] = True
+        router = self.router
+        if router is None or not router.replicas:
+            return super().get_bind(mapper, clause, **kwargs)
+
+        if writing:
+            # Дальше в этой сессии читаем свои же записи
+            self.info["wrote"] = True
+            router.record_write()
+            return router.primary.sync_engine
+
+        if (
+            _read_only.get()
+            and not _primary.get()
+            and not self.info.get("wrote")
+            and not router.is_sticky()
+        ):
+            # Одна реплика на сессию: запросы видят один снимок и
+            # SET LOCAL (set_config(..., true)) действует на следующие запросы
+            replica = self.info.get("replica") or router.pick_replica()
+            if replica is not None:
+                self.info["replica"] = replica
+                return replica.sync_engine
+        return router.primary.sync_engine
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _reset_transaction_wrote(session, transaction) -> None:
+    if transaction.parent is None:
+        session.info.pop("transaction_wrote", None)
+
+
 class Database:
-    def __init__(self, db_url: str) -> None:
-        self._engine = create_async_engine(db_url, echo=True)
+    def __init__(
+        self,
+        db_url: str,
+        replica_urls: Optional[list[str]] = None,
+        echo: bool = False,
+        pool_size: int = 10,
+        max_overflow: int = 20,
+        pool_timeout: float = 30.0,
+        pool_recycle: int = 1800,
+        pool_pre_ping: bool = True,
+        statement_cache_size: int = 100,
+        pgbouncer: bool = False,
+        replica_max_lag: float = 5.0,
+        replica_check_interval: float = 2.0,
+        read_your_writes_window: float = 10.0,
+    ) -> None:
+        engine_options = dict(
+            echo=echo,
+            poolclass=ObservedQueuePool,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_recycle=pool_recycle,
+            pool_pre_ping=pool_pre_ping,
+            connect_args=self._connect_args(statement_cache_size, pgbouncer),
+        )
+        self._engine = self._create_engine(db_url, engine_options)
+        self._replicas = [
+            self._create_engine(url, engine_options) for url in replica_urls or []
+        ]
+        self.router = ReplicaRouter(
+            self._engine,
+            self._replicas,
+            max_lag=replica_max_lag,
+            read_your_writes_window=read_your_writes_window,
+        )
+        self._replica_check_interval = replica_check_interval
+        self._monitor_task: Optional[asyncio.Task] = None
         self._session_factory = async_sessionmaker(
             bind=self._engine,
             class_=AsyncSession,
+            sync_session_class=RoutingSession,
+            router=self.router,
             autocommit=False,
             autoflush=False,
+            # Сессия живёт весь запрос: после commit объекты остаются
+            # загруженными и не требуют повторного SELECT
+            expire_on_commit=False,
         )
 
+    @staticmethod
+    def _connect_args(statement_cache_size: int, pgbouncer: bool) -> dict:
+        if pgbouncer:
+            # В transaction mode соединение с сервером меняется между
+            # транзакциями, поэтому кэш prepared statements выключаем,
+            # а имена делаем уникальными.
+            return {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+            }
+        return {"prepared_statement_cache_size": statement_cache_size}
+
+    @staticmethod
+    def _create_engine(db_url: str, options: dict) -> AsyncEngine:
+        engine = create_async_engine(db_url, **options)
+        stats = PoolStats()
+        engine.pool.stats = stats
+
+        @event.listens_for(engine.sync_engine, "checkout")
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            connection_record.info["checked_out_at"] = time.perf_counter()
+
+        @event.listens_for(engine.sync_engine, "checkin")
+        def on_checkin(dbapi_connection, connection_record):
+            started = connection_record.info.pop("checked_out_at", None)
+            if started is not None:
+                stats.record_hold(time.perf_counter() - started)
+
+        return engine
+
+    @staticmethod
+    def _engine_stats(engine: AsyncEngine) -> dict:
+        pool = engine.pool
+        return {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            **pool.stats.snapshot(),
+        }
+
+    def pool_stats(self) -> dict:
+        return {
+            **self._engine_stats(self._engine),
+            "replicas": [
+                {
+                    **self._engine_stats(replica),
+                    "healthy": replica in self.router.healthy,
+                    "lag_seconds": self.router.lag[index],
+                }
+                for index, replica in enumerate(self._replicas)
+            ],
+        }
+
+    def start_replica_monitor(self) -> None:
+        if self._replicas and self._monitor_task is None:
+            self._monitor_task = asyncio.create_task(
+                self.router.monitor(self._replica_check_interval)
+            )
+
+    async def dispose(self) -> None:
+        if self._monitor_task is not None:
+            self._monitor_task.cancel()
+            self._monitor_task = None
+        for engine in (self._engine, *self._replicas):
+            await engine.dispose()
+
+    @property
+    def session_factory(self) -> async_sessionmaker[AsyncSession]:
+        return self._session_factory
+
     @asynccontextmanager
     async def session(self) -> Callable[..., AbstractAsyncContextManager[AsyncSession]]:
-        # Генерация новой сессии для каждого запроса
+        # Внутри запроса отдаём сессию, привязанную UnitOfWork
+        unit = _current_unit.get()
+        if unit is not None:
+            current = unit.open()
+            depth = current.info.get("depth", 0)
+            current.info["depth"] = depth + 1
+            try:
+                yield current
+            except Exception as exc:
+                current.info["depth"] = depth
+                # Откатывает только внешний блок: вложенный не знает,
+                # что ещё сделано в транзакции
+                if depth == 0 and (
+                    isinstance(exc, SQLAlchemyError)
+                    or not current.info.get("transaction_wrote")
+                ):
+                    await current.rollback()
+                raise
+            current.info["depth"] = depth
+            # Транзакция только с чтениями завершается сразу: соединение
+            # не висит idle in transaction до конца запроса
+            if (
+                depth == 0
+                and current.in_transaction()
+                and not current.info.get("transaction_wrote")
+                and not (current.new or current.dirty or current.deleted)
+            ):
+                await current.commit()
+            return
+
+        # Генерация новой сессии вне запроса (скрипты, фоновые задачи)
         async with self._session_factory() as session:
             try:
                 yield session
@@ -39,81 +419,101 @@ class Database:
 
 
 class UnitOfWork:
-    def __init__(
-        self, session_factory: Callable[..., AbstractAsyncContextManager[AsyncSession]]
-    ):
+    """
+    Сессия на время одного HTTP-запроса.
+
+    Пока UnitOfWork открыт, все репозитории получают одну и ту же сессию
+    и общую identity map. Сессия создаётся при первом Database.session,
+    соединение - при первом запросе к базе, а после блока только с
+    чтениями возвращается в пул (см. Database.session).
+    Сессия не предназначена для конкурентного использования (asyncio.gather).
+    """
+
+    def __init__(self, session_factory: Callable[[], AsyncSession]):
         """
         :param session_factory: Фабрика для создания сессии базы данных
         """
         self.session_factory = session_factory
         self.session: Optional[AsyncSession] = None
-        self.transaction = None  # Переменная для хранения состояния транзакции
+        self._token: Optional[Token] = None
+
+    async def __aenter__(self) -> "UnitOfWork":
+        await self.begin()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        try:
+            if exc_type is not None and self.session is not None:
+                await self.rollback()
+        finally:
+            await self.close()
 
     async def begin(self):
         """
-        Метод для явного начала транзакции.
+        Делает UnitOfWork текущим для репозиториев; сессию откроет open.
         """
+        if self._token is None:
+            self._token = _current_unit.set(self)
+
+    def open(self) -> AsyncSession:
         if self.session is None:
-            # Генерируем сессию
-            async with self.session_factory() as session:
-                self.session = session
-                # Начинаем транзакцию
-                self.transaction = await self.session.begin()
+            self.session = self.session_factory()
+        return self.session
 
     async def commit(self):
         """
         Коммит транзакции.
         """
-        if self.session is None or self.transaction is None:
-            raise RuntimeError("Session or transaction not initialized.")
+        if self.session is None:
+            raise RuntimeError("Session is not initialized.")
 
         try:
             await self.session.commit()  # Выполняем commit транзакции
         except Exception as e:
             await self.session.rollback()  # При ошибке делаем rollback
-            logger.error(f"Error during commit: {e}")
+            logger.error("Error during commit: %s", e)
             raise RuntimeError(f"Failed to commit transaction: {e}") from e
 
     async def rollback(self):
         """
         Откат транзакции.
         """
-        if self.session is None or self.transaction is None:
-            raise RuntimeError("Session or transaction not initialized.")
+        if self.session is None:
+            raise RuntimeError("Session is not initialized.")
 
         try:
             await self.session.rollback()  # Выполняем rollback транзакции
         except Exception as e:
-            logger.error(f"Error during rollback: {e}")
+            logger.error("Error during rollback: %s", e)
             raise RuntimeError(f"Failed to rollback transaction: {e}") from e
 
     async def close(self):
         """
-        Завершение работы сессии и транзакции.
+        Завершение работы сессии, соединение возвращается в пул.
         """
-        if self.session is not None:
-            try:
+        try:
+            if self.session is not None:
                 await self.session.close()
-            except Exception as e:
-                logger.error(f"Error during session closing: {e}")
-                raise RuntimeError(f"Failed to close session: {e}") from e
-            finally:
-                self.session = None
-                self.transaction = None  # Очищаем транзакцию после завершения
+        except Exception as e:
+            logger.error("Error during session closing: %s", e)
+            raise RuntimeError(f"Failed to close session: {e}") from e
+        finally:
+            if self._token is not None:
+                _current_unit.reset(self._token)
+            self.session = None
+            self._token = None
 
     async def get_session(self) -> AsyncSession:
         """
         Возвращает текущую сессию для использования в репозиториях.
         """
-        if self.session is None:
+        if self._token is None:
             raise RuntimeError("Session is not initialized or already closed.")
-        return self.session
+        return self.open()
 
 
 class UnitOfWorkFactory:
-    def __init__(
-        self, session_factory: Callable[..., AbstractAsyncContextManager[AsyncSession]]
-    ):
+    def __init__(self, session_factory: Callable[[], AsyncSession]):
         self.session_factory = session_factory
 
     def create(self) -> UnitOfWork:
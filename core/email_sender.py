@@ -4,7 +4,9 @@ from email.mime.text import MIMEText
 import aiosmtplib
 from pydantic import EmailStr
 
-from core.logger import logger
+from core.logger import get_logger
+
+logger = get_logger(__name__)
 
 
 class EmailSender:
@@ -61,4 +63,4 @@ class EmailSender:
                 )
             print("Email sent successfully")
         except Exception as e:
-            logger.error(f"Failed to send email: {str(e)}")
+            logger.error("Failed to send email: %s", e)
@@ -1,8 +1,10 @@
 import os
-from typing import List
+from typing import Annotated, List, Optional
 
 from pydantic import Field, validator
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, NoDecode
+
+from core.counting import CountStrategy
 
 
 class Settings(BaseSettings):
@@ -14,13 +16,123 @@ class Settings(BaseSettings):
     POSTGRES_HOSTNAME: str
     DATABASE_DIALECT: str
 
+    # Токен для /health/* (заголовок X-Internal-Token); без него эндпоинты
+    # отвечают 404 - внутреннее устройство пулов и очередей наружу не видно
+    internal_token: Optional[str] = None
+
+    db_echo: bool = False
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_statement_cache_size: int = 100
+    # PgBouncer в transaction mode не поддерживает именованные prepared statements
+    db_pgbouncer: bool = False
+
+    # Реплики для чтения через запятую: "host" или "host:port", те же база
+    # и пользователь. NoDecode: значение не JSON, его разбирает валидатор ниже
+    POSTGRES_REPLICA_HOSTNAMES: Annotated[List[str], NoDecode] = Field(default=[])
+    db_replica_max_lag: float = 5.0
+    db_replica_check_interval: float = 2.0
+    # Чтение своих записей с primary помнится в памяти воркера: запрос,
+    # попавший в другой воркер или реплику бэкенда, может прочитать реплику
+    db_read_your_writes_window: float = 10.0
+
     jwt_algorithm: str
 
     secret_key: str
     access_token_lifetime: int
     refresh_token_lifetime: int
 
+    # Стоимость bcrypt (2^rounds итераций). Старые хэши пересчитываются
+    # при следующем успешном входе
+    password_hash_rounds: int = 12
+    password_hash_workers: int = 2
+    # Сколько хэшей может ждать пул; остальные запросы получают 503
+    password_hash_max_pending: int = 64
+
     media_root: str = "media"
+    # Каталог медиа на диске для media_storage=local (ключи media_root/...
+    # лежат прямо в нём). В контейнерах это том /app/media
+    media_local_root: str = "/app/media"
+    # Префикс URL файлов в ответах API: "/" - тот же хост (nginx или
+    # uploads.router), для S3 - адрес бакета или CDN перед ним
+    media_url_base: str = "/"
+    # local - файлы на диске (том, общий для воркеров), s3 - S3-совместимый
+    # бакет, общий для всех реплик (poetry install -E s3). Для MinIO:
+    # S3_ENDPOINT_URL=http://marketplace_minio:9000
+    media_storage: str = "local"
+    s3_bucket: str = "media"
+    s3_endpoint_url: Optional[str] = None
+    s3_region: Optional[str] = None
+    s3_access_key_id: Optional[str] = None
+    s3_secret_access_key: Optional[str] = None
+    s3_multipart_threshold: int = 8 * 1024 * 1024
+    s3_part_size: int = 8 * 1024 * 1024
+    # Сборка неиспользуемых файлов (uploads.collector): раз в
+    # media_gc_interval секунд в одном из воркеров, 0 - только из
+    # dev_tools.collect_media. Файлы моложе media_gc_grace_period не удаляются
+    media_gc_interval: float = 6 * 3600
+    media_gc_grace_period: float = 3600
+    media_gc_batch_size: int = 500
+    # Лимиты загрузки фото до обработки; nginx client_max_body_size чуть больше
+    upload_max_bytes: int = 20 * 1024 * 1024
+    upload_max_pixels: int = 50_000_000
+    # Тело запроса целиком (фото и поля формы): больше - 413 до разбора
+    # multipart, см. core.middleware.BodySizeLimitMiddleware
+    request_max_bytes: int = 21 * 1024 * 1024
+    # Пул процессов для обработки фото; задачи сверх image_max_concurrent
+    # ждут место не дольше image_queue_timeout, потом 503
+    image_workers: int = 2
+    image_max_concurrent: int = 4
+    image_queue_timeout: float = 10.0
+    image_job_timeout: float = 30.0
+    # Фоновые задачи (обработка фото товаров) в памяти каждого воркера;
+    # при заполненной очереди загрузка получает 503
+    jobs_workers: int = 2
+    jobs_max_queued: int = 100
+    # Фото в processing дольше этого помечается failed: задача потерялась
+    # с перезапуском воркера. Проверка при старте и затем с тем же периодом
+    jobs_stale_after: float = 600.0
+
+    # Уровень корневого логгера и уровни отдельных модулей:
+    # LOG_LEVELS='{"core.database": "WARNING", "auth": "DEBUG"}'
+    log_level: str = "INFO"
+    log_levels: dict[str, str] = Field(default={"uvicorn.access": "WARNING"})
+    log_json: bool = True
+    # Доля записей ниже WARNING, которая доходит до вывода, по префиксу логгера
+    log_sample_rates: dict[str, float] = Field(default={"auth.depends": 0.01})
+
+    # Как считать total в списках: exact, cached или estimated
+    count_strategies: dict[str, CountStrategy] = Field(
+        default={
+            "catalog": CountStrategy.CACHED,
+            "shop_items": CountStrategy.CACHED,
+            "my_items": CountStrategy.EXACT,
+            "favorites": CountStrategy.EXACT,
+        }
+    )
+    count_cache_ttl: float = 30.0
+
+    # Кэш готовых ответов GET /shop/catalog/ в памяти воркера
+    catalog_cache_ttl: float = 10.0
+    catalog_cache_max_entries: int = 1024
+
+    # memory:// - в памяти воркера, redis://host:6379/0 - общий кэш и рассылка
+    # инвалидаций между воркерами (poetry install -E redis)
+    cache_url: str = "memory://"
+    object_cache_ttl: float = 60.0
+    # Короткий TTL: страховка, если инвалидация где-то не сработала
+    principal_cache_ttl: float = 30.0
+    # Проверять роль и верификацию по claims токена, без запроса к users.
+    # Отзыв токенов держится на версии (claim ver) из users.token_version,
+    # в cache_url только её кэш: с memory:// другой воркер увидит отзыв
+    # через object_cache_ttl, без задержки - с Redis
+    auth_stateless: bool = False
+
+    # Порог word_similarity для search_mode=similar (0..1, больше - строже)
+    search_similarity_threshold: float = 0.3
 
     smtp_server: str
     smtp_port: int
@@ -29,9 +141,7 @@ class Settings(BaseSettings):
     smtp_start_tls: bool
     smtp_start_ssl: bool
 
-    allowed_origins: List[str] = Field(default=[])
-
-    allowed_origins: List[str] = Field(default=[])
+    allowed_origins: Annotated[List[str], NoDecode] = Field(default=[])
     domain: str
 
     frontend_url: str
@@ -49,7 +159,7 @@ class Settings(BaseSettings):
         env_file = os.getenv("ENV_FILE")
         env_file_encoding = "utf-8"
 
-    @validator("allowed_origins", pre=True)
+    @validator("allowed_origins", "POSTGRES_REPLICA_HOSTNAMES", pre=True)
     def parse_allowed_origins(cls, v):
         if isinstance(v, str):
             return [origin.strip() for origin in v.split(",") if origin.strip()]
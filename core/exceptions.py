@@ -29,3 +29,10 @@ class ValidationError(HTTPException):
         self, detail: Any = None, headers: Optional[dict[str, Any]] = None
     ) -> None:
         super().__init__(status.HTTP_400_BAD_REQUEST, detail, headers)
+
+
+class ServiceUnavailableError(HTTPException):
+    def __init__(
+        self, detail: Any = None, headers: Optional[dict[str, Any]] = None
+    ) -> None:
+        super().__init__(status.HTTP_503_SERVICE_UNAVAILABLE, detail, headers)
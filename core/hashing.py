@@ -0,0 +1,108 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+from core.exceptions import ServiceUnavailableError
+from core.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class PasswordHasher:
+    """
+    bcrypt в отдельном ограниченном пуле потоков.
+
+    Один хэш стоит десятки-сотни миллисекунд CPU; в event loop это
+    останавливает все запросы воркера. bcrypt отпускает GIL, поэтому
+    потоков достаточно. Очередь ограничена: при наплыве логинов лишние
+    запросы сразу получают 503, а не ждут десятки секунд.
+    """
+
+    def __init__(self, rounds: int = 12, workers: int = 2, max_pending: int = 64):
+        self.rounds = rounds
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="bcrypt"
+        )
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.run_time_total = 0.0
+
+    async def hash(self, password: str) -> str:
+        hashed = await self._submit(
+            lambda: bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(self.rounds))
+        )
+        return hashed.decode("utf-8")
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._submit(
+            lambda: bcrypt.checkpw(
+                password.encode("utf-8"), hashed_password.encode("utf-8")
+            )
+        )
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """Хэш посчитан с другой стоимостью: $2b$<rounds>$..."""
+        try:
+            return int(hashed_password.split("$")[2]) != self.rounds
+        except (IndexError, ValueError):
+            return False
+
+    async def _submit(self, call):
+        # Счётчик меняется только в event loop, проверка и захват атомарны
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            logger.warning("Password hasher queue is full (%s pending)", self.pending)
+            raise ServiceUnavailableError(detail="error.server.busy")
+        self.pending += 1
+        submitted = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._run, call, submitted
+            )
+        finally:
+            self.pending -= 1
+
+    def _run(self, call, submitted: float):
+        started = time.perf_counter()
+        wait = started - submitted
+        with self._lock:
+            self.running += 1
+            self.wait_time_total += wait
+            self.wait_time_max = max(self.wait_time_max, wait)
+        try:
+            return call()
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+                self.run_time_total += time.perf_counter() - started
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            completed = self.completed
+            return {
+                "rounds": self.rounds,
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "running": self.running,
+                "queued": max(self.pending - self.running, 0),
+                "completed": completed,
+                "rejected": self.rejected,
+                "wait_time_avg_ms": self.wait_time_total / completed * 1000 if completed else 0.0,
+                "wait_time_max_ms": self.wait_time_max * 1000,
+                "run_time_avg_ms": self.run_time_total / completed * 1000 if completed else 0.0,
+            }
@@ -0,0 +1,414 @@
+import asyncio
+import hashlib
+import io
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, NamedTuple, Optional
+
+from fastapi import HTTPException
+
+from core.exceptions import ServiceUnavailableError
+from core.logger import get_logger
+from core.placeholders import blurhash, dominant_color
+
+logger = get_logger(__name__)
+
+
+class ImageError(Exception):
+    """Ошибка обработки в рабочем процессе; args[0] - ключ ошибки для клиента."""
+
+    @property
+    def detail(self) -> str:
+        return self.args[0]
+
+
+# Варианты для клиентов: (наибольшая сторона, качество WebP, качество AVIF)
+VARIANTS = {
+    "full": (2000, 85, 60),
+    "card": (800, 80, 55),
+    "thumb": (320, 75, 50),
+}
+
+
+class ProcessedImage(NamedTuple):
+    # Основной JPEG (поле photo/avatar) и варианты:
+    # {"thumb": {"width": ..., "height": ..., "webp": bytes, "avif": bytes | None}}
+    content: bytes
+    variants: dict[str, dict]
+    # Расширение content: jpg или png (небольшой PNG сохраняется как есть)
+    extension: str
+    # sha256 content: считается здесь же, в рабочем процессе
+    digest: str
+    # BlurHash и основной цвет (#rrggbb) для показа до загрузки фото
+    placeholder: str
+    color: str
+
+
+def _open_image(content: bytes, max_dimension: int):
+    """Декодирует загрузку один раз: HEIF, поворот по EXIF, RGB/RGBA; (image, формат)."""
+    from PIL import Image, ImageOps, UnidentifiedImageError
+    from pillow_heif import register_heif_opener
+
+    register_heif_opener()
+    try:
+        image = Image.open(io.BytesIO(content))
+        source_format = image.format
+        # JPEG умеет декодироваться сразу в уменьшенном масштабе (кратно 1/8)
+        image.draft("RGB", (max_dimension, max_dimension))
+        image = ImageOps.exif_transpose(image)
+    except (UnidentifiedImageError, OSError) as exc:
+        raise ImageError("error.photo.invalid") from exc
+    if image.mode not in ("RGB", "RGBA"):
+        has_alpha = image.mode in ("LA", "PA") or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+    return image, source_format
+
+
+def _encode(image, format: str, quality: int) -> bytes:
+    output = io.BytesIO()
+    image.save(output, format=format, quality=quality)
+    return output.getvalue()
+
+
+def _encode_jpeg(image, quality: int, optimize: bool = True) -> bytes:
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=quality, optimize=optimize)
+    return output.getvalue()
+
+
+def _fit_dimension(image, max_dimension: int):
+    from PIL import Image
+
+    if max(image.size) <= max_dimension:
+        return image
+    ratio = max_dimension / max(image.size)
+    new_size = tuple(max(int(dim * ratio), 1) for dim in image.size)
+    return image.resize(new_size, Image.Resampling.LANCZOS)
+
+
+class _TrialEncoder:
+    """
+    Оценка размера полного кодирования по уменьшенной копии.
+
+    Проба - около TRIAL_PIXELS пикселей без optimize, в разы дешевле полного
+    кодирования. Её размер умножается на коэффициент, который уточняется
+    после каждого полного кодирования, поэтому оценка быстро сходится.
+    """
+
+    TRIAL_PIXELS = 250_000
+
+    def __init__(self, image):
+        factor = int((image.size[0] * image.size[1] / self.TRIAL_PIXELS) ** 0.5)
+        self.trial = image.reduce(max(factor, 2))
+        self.scale = (image.size[0] * image.size[1]) / (
+            self.trial.size[0] * self.trial.size[1]
+        )
+        self.sizes: dict[int, int] = {}
+
+    def size(self, quality: int) -> int:
+        if quality not in self.sizes:
+            self.sizes[quality] = len(_encode_jpeg(self.trial, quality, optimize=False))
+        return self.sizes[quality]
+
+    def calibrate(self, quality: int, real_size: int) -> None:
+        self.scale = real_size / self.size(quality)
+
+    def best_quality(self, max_size: int, low: int, high: int) -> int:
+        """Наибольшее качество в [low, high], которое по оценке укладывается."""
+        # Частый случай: фото укладывается и с максимальным качеством
+        if self.size(high) * self.scale <= max_size:
+            return high
+        best, high = low, high - 1
+        while low <= high:
+            quality = (low + high) // 2
+            if self.size(quality) * self.scale <= max_size:
+                best, low = quality, quality + 1
+            else:
+                high = quality - 1
+        return best
+
+
+def compress_image_with_stats(
+    content: bytes,
+    max_size: int,
+    max_dimension: int = 2000,
+    min_dimension: int = 800,
+    min_quality: int = 20,
+    max_quality: int = 95,
+    tolerance: float = 0.9,
+) -> tuple[bytes, int, int]:
+    """
+    Пережимает фото в JPEG не больше max_size байт.
+
+    Возвращает (байты, полные кодирования, пробные кодирования). Исходник
+    декодируется один раз и один раз уменьшается до max_dimension. Качество
+    ищется бинарным поиском по оценке с пробной копии; после каждого полного
+    кодирования границы поиска сужаются, а оценка калибруется. Результат от
+    tolerance * max_size и выше принимается сразу. Закодированные байты
+    повторно не декодируются. Размер уменьшается, только если даже
+    min_quality не укладывается в лимит.
+    """
+    if len(content) <= max_size:
+        return content, 0, 0
+    image, _ = _open_image(content, max_dimension)
+    return _compress_decoded(
+        image, max_size, max_dimension,
+        min_dimension, min_quality, max_quality, tolerance,
+    )
+
+
+def _compress_decoded(
+    image,
+    max_size: int,
+    max_dimension: int = 2000,
+    min_dimension: int = 800,
+    min_quality: int = 20,
+    max_quality: int = 95,
+    tolerance: float = 0.9,
+) -> tuple[bytes, int, int]:
+    if image.mode == "RGBA":
+        # Прозрачный фон товара в JPEG - белый, а не чёрный
+        from PIL import Image
+
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+    encodes = trial_encodes = 0
+    dimension = max_dimension
+    while True:
+        image = _fit_dimension(image, dimension)
+        trial = _TrialEncoder(image)
+        best = None
+        smallest = None
+        low, high = min_quality, max_quality
+        while low <= high:
+            quality = trial.best_quality(max_size, low, high)
+            encodes += 1
+            output = _encode_jpeg(image, quality)
+            trial.calibrate(quality, len(output))
+            if len(output) <= max_size:
+                best, low = output, quality + 1
+                if len(output) >= max_size * tolerance:
+                    break
+            else:
+                smallest, high = output, quality - 1
+        trial_encodes += len(trial.sizes)
+        if best is not None:
+            return best, encodes, trial_encodes
+
+        # Не уложились даже с min_quality: smallest - это кодирование с ним
+        if dimension <= min_dimension:
+            raise ImageError("error.photo.too_large")
+        # Площадь пропорциональна размеру файла: сторона - корню
+        dimension = max(
+            int(max(image.size) * (max_size / len(smallest)) ** 0.5 * 0.95),
+            min_dimension,
+        )
+
+
+def compress_image(content: bytes, max_size: int) -> bytes:
+    """Пережимает фото в JPEG, пока оно не уложится в max_size байт."""
+    content, _, _ = compress_image_with_stats(content, max_size)
+    return content
+
+
+def make_variants(image) -> dict[str, dict]:
+    """
+    WebP (и AVIF, если Pillow собран с ним) для каждого размера из VARIANTS.
+
+    Меньшие варианты уменьшаются из предыдущего, а не из исходника.
+    """
+    from PIL import features
+
+    avif = features.check("avif")
+    variants = {}
+    for name, (dimension, webp_quality, avif_quality) in VARIANTS.items():
+        image = _fit_dimension(image, dimension)
+        variants[name] = {
+            "width": image.width,
+            "height": image.height,
+            "webp": _encode(image, "WEBP", webp_quality),
+            "avif": _encode(image, "AVIF", avif_quality) if avif else None,
+        }
+    return variants
+
+
+def process_image(content: bytes, max_size: int) -> ProcessedImage:
+    """Основной JPEG не больше max_size и набор вариантов из одного декодирования."""
+    image, source_format = _open_image(content, VARIANTS["full"][0])
+    # Небольшие JPEG/PNG оставляем как есть; HEIF браузеры не показывают
+    if len(content) <= max_size and source_format in ("JPEG", "PNG"):
+        photo, extension = content, "png" if source_format == "PNG" else "jpg"
+    else:
+        (photo, _, _), extension = _compress_decoded(image, max_size), "jpg"
+    return ProcessedImage(
+        photo, make_variants(image), extension, hashlib.sha256(photo).hexdigest(),
+        blurhash(image), dominant_color(image),
+    )
+
+
+def compute_placeholder(content: bytes) -> tuple[str, str]:
+    """BlurHash и основной цвет уже сохранённого фото (для заполнения старых)."""
+    image, _ = _open_image(content, VARIANTS["thumb"][0])
+    return blurhash(image), dominant_color(image)
+
+
+def _timed(func: Callable, *args):
+    # Время внутри процесса: без ожидания в очереди и передачи данных
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+class ImageProcessor:
+    """
+    Обработка изображений в пуле процессов.
+
+    Pillow держит GIL на декодировании и ресайзе, поэтому потоков мало:
+    фото на 20 МБ останавливало бы воркер на секунды. Одновременно в пуле
+    не больше max_concurrent задач; кто не дождался места за queue_timeout,
+    получает 503. Задача дольше job_timeout тоже даёт 503: процессы пула
+    завершаются (зависший иначе продолжал бы есть CPU), пул создаётся
+    заново, а задачи, которые были в нём вместе с зависшей, получают 503.
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        max_concurrent: int = 4,
+        queue_timeout: float = 10.0,
+        job_timeout: float = 30.0,
+    ):
+        self.workers = workers
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self.job_timeout = job_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.run_time_total = 0.0
+        self.run_time_max = 0.0
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: fork процесса с потоками (логи, bcrypt) может зависнуть
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def _reset_pool(
+        self, executor: Optional[ProcessPoolExecutor] = None, terminate: bool = False
+    ) -> None:
+        # Пул, на котором случилась ошибка, мог уже смениться новым
+        if self._executor is None or executor not in (None, self._executor):
+            return
+        # shutdown не останавливает уже запущенную задачу, поэтому зависший
+        # процесс завершаем сами; _processes - единственный доступ к ним
+        processes = list((self._executor._processes or {}).values())
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+        if terminate:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+
+    async def run(self, func: Callable, *args):
+        """Выполняет func(*args) в пуле; func и аргументы должны сериализоваться pickle."""
+        queued = time.perf_counter()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            logger.warning("Image processor is busy (%s waiting)", self.waiting)
+            raise ServiceUnavailableError(detail="error.server.busy")
+        finally:
+            self.waiting -= 1
+
+        wait = time.perf_counter() - queued
+        self.wait_time_total += wait
+        self.wait_time_max = max(self.wait_time_max, wait)
+        self.running += 1
+        executor = self._pool()
+        try:
+            future = asyncio.get_running_loop().run_in_executor(
+                executor, _timed, func, *args
+            )
+            result, run_time = await asyncio.wait_for(future, self.job_timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.warning("Image job %s timed out after %ss", func.__name__, self.job_timeout)
+            self._reset_pool(executor, terminate=True)
+            raise ServiceUnavailableError(detail="error.photo.processing_timeout")
+        except asyncio.CancelledError:
+            task = asyncio.current_task()
+            if task is not None and task.cancelling():
+                raise
+            # Задачу отменил _reset_pool из-за чужого таймаута
+            self.failed += 1
+            raise ServiceUnavailableError(detail="error.server.busy")
+        except BrokenProcessPool:
+            self.failed += 1
+            logger.error("Image process pool is broken, restarting")
+            self._reset_pool(executor, terminate=True)
+            raise ServiceUnavailableError(detail="error.server.busy")
+        except ImageError as exc:
+            self.failed += 1
+            raise HTTPException(status_code=422, detail=exc.detail)
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.running -= 1
+            self._semaphore.release()
+
+        self.completed += 1
+        self.run_time_total += run_time
+        self.run_time_max = max(self.run_time_max, run_time)
+        logger.debug(
+            "Image job %s: wait %.1f ms, run %.1f ms",
+            func.__name__, wait * 1000, run_time * 1000,
+        )
+        return result
+
+    async def compress(self, content: bytes, max_size: int) -> bytes:
+        if len(content) <= max_size:
+            return content
+        return await self.run(compress_image, content, max_size)
+
+    async def process(self, content: bytes, max_size: int) -> ProcessedImage:
+        return await self.run(process_image, content, max_size)
+
+    async def placeholder(self, content: bytes) -> tuple[str, str]:
+        return await self.run(compute_placeholder, content)
+
+    def shutdown(self) -> None:
+        self._reset_pool()
+
+    def stats(self) -> dict:
+        completed = self.completed
+        return {
+            "workers": self.workers,
+            "max_concurrent": self.max_concurrent,
+            "waiting": self.waiting,
+            "running": self.running,
+            "completed": completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "wait_time_avg_ms": self.wait_time_total / completed * 1000 if completed else 0.0,
+            "wait_time_max_ms": self.wait_time_max * 1000,
+            "run_time_avg_ms": self.run_time_total / completed * 1000 if completed else 0.0,
+            "run_time_max_ms": self.run_time_max * 1000,
+        }
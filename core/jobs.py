@@ -0,0 +1,106 @@
+import asyncio
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Hashable, Optional
+
+from core.exceptions import ServiceUnavailableError
+from core.logger import get_logger
+
+logger = get_logger(__name__)
+
+Job = tuple[Hashable, Callable[..., Awaitable[None]], tuple]
+
+
+class JobQueue:
+    """
+    Очередь фоновых задач внутри воркера.
+
+    Задачи выполняются после ответа клиенту в нескольких asyncio-задачах;
+    тяжёлая часть (Pillow) при этом уходит в пул процессов. Очередь живёт
+    в памяти процесса: после перезапуска невыполненные задачи теряются,
+    поэтому результат задачи должен сохраняться в базе (статус объекта).
+    """
+
+    def __init__(self, workers: int = 2, max_size: int = 100):
+        self.workers = workers
+        self.max_size = max_size
+        self._queue: asyncio.Queue[Job] = asyncio.Queue(maxsize=max_size)
+        self._tasks: list[asyncio.Task] = []
+        self._states: dict[Hashable, str] = {}
+        self._reserved = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._work()) for _ in range(self.workers)
+            ]
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """Даёт очереди доработать не дольше timeout, затем отменяет задачи."""
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Job queue stopped with %s pending jobs", self._queue.qsize())
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    @contextmanager
+    def reserve(self):
+        """
+        Место в очереди на время подготовки задачи.
+
+        503 приходит до записи в базу, а не после неё; submit внутри
+        блока место уже не ждёт.
+        """
+        if self._queue.qsize() + self._reserved >= self.max_size:
+            self.rejected += 1
+            raise ServiceUnavailableError(detail="error.server.busy")
+        self._reserved += 1
+        try:
+            yield
+        finally:
+            self._reserved -= 1
+
+    def submit(self, key: Hashable, func: Callable[..., Awaitable[None]], *args) -> None:
+        try:
+            self._queue.put_nowait((key, func, args))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise ServiceUnavailableError(detail="error.server.busy")
+        self._states[key] = "queued"
+
+    def state(self, key: Hashable) -> Optional[str]:
+        """queued, running или None, если задачи по ключу нет в этом воркере."""
+        return self._states.get(key)
+
+    async def _work(self) -> None:
+        while True:
+            key, func, args = await self._queue.get()
+            self._states[key] = "running"
+            try:
+                await func(*args)
+                self.completed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.failed += 1
+                logger.exception("Job %s failed", key)
+            finally:
+                self._states.pop(key, None)
+                self._queue.task_done()
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_size": self.max_size,
+            "queued": self._queue.qsize(),
+            "reserved": self._reserved,
+            "running": sum(state == "running" for state in self._states.values()),
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
@@ -1,28 +1,137 @@
+import atexit
+import copy
+import json
 import logging
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
 
+# Стандартные поля LogRecord; всё остальное пришло через extra=
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message",
+    "asctime",
+    "taskName",
+}
 
-def setup_logger():
-    # Create a logger
-    logger = logging.getLogger(__name__)
-    logger.setLevel(logging.DEBUG)
+_listener: Optional[QueueListener] = None
 
-    # Create a console handler and set its log level to DEBUG
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.DEBUG)
 
-    # Create a formatter and add it to the console handler
-    formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
-    console_handler.setFormatter(formatter)
+def get_logger(name: str) -> logging.Logger:
+    """Логгер модуля: get_logger(__name__), уровень задаётся в Settings.log_levels."""
+    return logging.getLogger(name)
 
-    # Add the console handler to the logger
-    logger.addHandler(console_handler)
 
-    return logger
+class JsonFormatter(logging.Formatter):
+    """Одна строка JSON на запись; поля из extra= попадают в объект как есть."""
 
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
 
-# Usage example
-logger = setup_logger()
-logger.debug("This is a debug message")
-logger.info("This is an info message")
-logger.warning("This is a warning message")
-logger.error("This is an error message")
+
+class SamplingFilter(logging.Filter):
+    """
+    Пропускает долю записей ниже WARNING от шумных логгеров.
+
+    rates: {"auth.depends": 0.01} - каждая сотая запись этого логгера
+    и его потомков. Предупреждения и ошибки не сэмплируются.
+    """
+
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        # Длинные префиксы первыми: более точное правило важнее
+        self.rates = sorted(rates.items(), key=lambda rate: -len(rate[0]))
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        for prefix, rate in self.rates:
+            if record.name == prefix or record.name.startswith(prefix + "."):
+                return random.random() < rate
+        return True
+
+
+class _ThreadQueueHandler(QueueHandler):
+    """
+    QueueHandler без форматирования в вызывающем потоке.
+
+    Стандартный prepare() прогоняет запись через форматтер ещё до очереди;
+    здесь в event loop остаётся только подстановка аргументов в сообщение,
+    JSON и traceback собирает поток QueueListener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        # Аргументы подставляем сразу: объекты могут измениться до записи
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def setup_logging(
+    level: str = "INFO",
+    levels: Optional[dict[str, str]] = None,
+    json_output: bool = True,
+    sample_rates: Optional[dict[str, float]] = None,
+) -> None:
+    """
+    Переводит корневой логгер на очередь.
+
+    Запись в поток вывода идёт в отдельном потоке QueueListener, поэтому
+    медленный stdout не останавливает event loop. Повторный вызов
+    перенастраивает уровни и обработчики, не запуская второй поток.
+    """
+    global _listener
+
+    if json_output:
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(name)s - %(message)s")
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(formatter)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    handler = _ThreadQueueHandler(log_queue)
+    if sample_rates:
+        handler.addFilter(SamplingFilter(sample_rates))
+
+    stop_logging()
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level.upper())
+    for name, module_level in (levels or {}).items():
+        logging.getLogger(name).setLevel(module_level.upper())
+    # uvicorn вешает свои обработчики; пусть пишет через ту же очередь
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+
+
+def stop_logging() -> None:
+    """Дописывает оставшиеся в очереди записи и останавливает поток вывода."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
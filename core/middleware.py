@@ -0,0 +1,69 @@
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.database import UnitOfWorkFactory
+
+
+class RequestSessionMiddleware:
+    """UnitOfWork на каждый HTTP-запрос; сессия откроется при первом обращении."""
+
+    def __init__(self, app: ASGIApp, unit_of_work_factory: UnitOfWorkFactory):
+        self.app = app
+        self.unit_of_work_factory = unit_of_work_factory
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async with self.unit_of_work_factory.create():
+            await self.app(scope, receive, send)
+
+
+class BodySizeLimitMiddleware:
+    """
+    413 для тел запросов больше max_body_size.
+
+    Starlette принимает multipart целиком до вызова эндпоинта, поэтому
+    лимит проверяется здесь: по Content-Length - до чтения тела, без него
+    (chunked) - по мере чтения, как только прочитано больше лимита.
+    """
+
+    def __init__(self, app: ASGIApp, max_body_size: int):
+        self.app = app
+        self.max_body_size = max_body_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    break
+                if declared > self.max_body_size:
+                    response = JSONResponse(
+                        status_code=413,
+                        content={"error": "error.request.too_large", "status": "error"},
+                    )
+                    await response(scope, receive, send)
+                    return
+                break
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    # FastAPI пропускает HTTPException из разбора тела как есть
+                    raise HTTPException(status_code=413, detail="error.request.too_large")
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -0,0 +1,140 @@
+import base64
+import binascii
+import json
+import math
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Optional
+
+from sqlalchemy import BigInteger, DateTime, Float, Numeric, Select, SmallInteger, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.exceptions import ValidationError
+
+
+# Разрядность целых колонок; курсор вне диапазона - 400, а не DataError
+_INTEGER_BITS = {SmallInteger: 16, BigInteger: 64}
+
+
+class Keyset:
+    """
+    Стабильная сортировка для курсорной пагинации.
+
+    Все колонки сортируются в одном направлении, последняя колонка должна
+    быть уникальной (обычно id), тогда сравнение кортежей (a, b) > (x, y)
+    однозначно продолжает выдачу и использует составной индекс.
+    """
+
+    def __init__(self, name: str, *columns, descending: bool = False):
+        self.name = name
+        self.columns = columns
+        self.descending = descending
+
+    def order_by(self, query: Select) -> Select:
+        return query.order_by(
+            *(column.desc() if self.descending else column.asc() for column in self.columns)
+        )
+
+    def after(self, query: Select, cursor: str) -> Select:
+        values = self.decode(cursor)
+        row = tuple_(*self.columns)
+        bound = tuple_(*values)
+        return query.where(row < bound if self.descending else row > bound)
+
+    def cursor_for(self, row: Any) -> str:
+        return self.encode([self._value(row, column) for column in self.columns])
+
+    @staticmethod
+    def _value(row: Any, column) -> Any:
+        # Вычисляемые ключи (например, ранг поиска) выбираются отдельной
+        # колонкой с label, остальные берутся из сущности
+        mapping = row._mapping
+        if column.key in mapping:
+            return mapping[column.key]
+        return getattr(row[0], column.key)
+
+    def encode(self, values: list) -> str:
+        payload = json.dumps(
+            {"o": self.name, "v": [self._dump(value) for value in values]},
+            separators=(",", ":"),
+        )
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def decode(self, cursor: str) -> list:
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if payload["o"] != self.name or len(payload["v"]) != len(self.columns):
+                raise ValueError("cursor does not match ordering")
+            return [
+                self._load(column, value)
+                for column, value in zip(self.columns, payload["v"])
+            ]
+        except (ValueError, KeyError, TypeError, ArithmeticError, binascii.Error):
+            raise ValidationError(detail="error.pagination.cursor.invalid")
+
+    @staticmethod
+    def _dump(value: Any) -> Any:
+        if isinstance(value, datetime):
+            return value.isoformat()
+        if isinstance(value, Decimal):
+            return str(value)
+        return value
+
+    @staticmethod
+    def _load(column, value: Any) -> Any:
+        column_type = column.type
+        if isinstance(column_type, DateTime):
+            return datetime.fromisoformat(value)
+        if isinstance(column_type, Float):
+            value = float(value)
+        elif isinstance(column_type, Numeric):
+            # decimal.InvalidOperation - подкласс ArithmeticError
+            value = Decimal(value)
+            # Значение вне numeric(p, s) база отвергла бы с DataError (500)
+            if (
+                value.is_finite()
+                and column_type.precision is not None
+                and abs(value) >= Decimal(10) ** (column_type.precision - (column_type.scale or 0))
+            ):
+                raise ValueError("cursor value out of range")
+        else:
+            value = int(value)
+            bits = _INTEGER_BITS.get(type(column_type), 32)
+            if not -(2 ** (bits - 1)) <= value < 2 ** (bits - 1):
+                raise ValueError("cursor value out of range")
+            return value
+        # NaN и Infinity из подделанного курсора сломали бы сравнение в SQL
+        if not math.isfinite(value):
+            raise ValueError("cursor value is not finite")
+        return value
+
+
+async def paginate(
+    session: AsyncSession,
+    query: Select,
+    keyset: Keyset,
+    limit: int,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+) -> tuple[list, Optional[str]]:
+    """
+    Возвращает страницу и курсор следующей страницы.
+
+    С курсором offset игнорируется. Курсор отдаётся и в offset-режиме,
+    чтобы клиенты могли перейти на курсоры без изменения первой страницы.
+    Первой колонкой query должна идти сущность, она и возвращается.
+    """
+    query = keyset.order_by(query)
+    if cursor:
+        query = keyset.after(query, cursor)
+    else:
+        query = query.offset(offset)
+    result = await session.execute(query.limit(limit + 1))
+    rows = result.all()
+
+    next_cursor = None
+    if limit > 0 and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = keyset.cursor_for(rows[-1])
+    return [row[0] for row in rows], next_cursor
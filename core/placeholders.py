@@ -0,0 +1,130 @@
+"""
+Заглушки для фото, пока оно грузится: BlurHash и основной цвет.
+
+Считаются в рабочем процессе из уже декодированного изображения
+(см. core.images.process_image) по уменьшенной до 32 px копии, поэтому
+чистый Python здесь укладывается в миллисекунды.
+"""
+import math
+
+BASE83 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~"
+
+# Размер копии для BlurHash: больше не нужно, заглушка всё равно размыта
+BLURHASH_SIZE = 32
+COLOR_SIZE = 64
+
+
+def _base83(value: int, length: int) -> str:
+    return "".join(
+        BASE83[value // 83 ** (length - i - 1) % 83] for i in range(length)
+    )
+
+
+def _srgb_to_linear(value: int) -> float:
+    v = value / 255
+    return v / 12.92 if v <= 0.04045 else ((v + 0.055) / 1.055) ** 2.4
+
+
+def _linear_to_srgb(value: float) -> int:
+    v = max(0.0, min(1.0, value))
+    if v <= 0.0031308:
+        return int(v * 12.92 * 255 + 0.5)
+    return int((1.055 * v ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def _sign_pow(value: float, exp: float) -> float:
+    return math.copysign(abs(value) ** exp, value)
+
+
+def _flatten(image):
+    # Прозрачные области показываются на белом, как и в основном JPEG
+    from PIL import Image
+
+    if image.mode == "RGBA":
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def _shrink(image, size: int):
+    from PIL import Image
+
+    scale = size / max(image.size)
+    if scale >= 1:
+        return image
+    width = max(1, round(image.width * scale))
+    height = max(1, round(image.height * scale))
+    return image.resize((width, height), Image.Resampling.BILINEAR, reducing_gap=2.0)
+
+
+def blurhash(image, components: tuple[int, int] | None = None) -> str:
+    """
+    BlurHash (https://blurha.sh) изображения, 20-30 символов.
+
+    По умолчанию 4 компоненты по длинной стороне и 3 по короткой.
+    """
+    small = _flatten(_shrink(image, BLURHASH_SIZE))
+    width, height = small.size
+    if components is None:
+        components = (4, 3) if width >= height else (3, 4)
+    cx, cy = components
+
+    pixels = [
+        tuple(_srgb_to_linear(channel) for channel in pixel)
+        for pixel in small.getdata()
+    ]
+    cos_x = [[math.cos(math.pi * i * x / width) for x in range(width)] for i in range(cx)]
+    cos_y = [[math.cos(math.pi * j * y / height) for y in range(height)] for j in range(cy)]
+
+    factors = []
+    for j in range(cy):
+        for i in range(cx):
+            norm = (1 if i == 0 and j == 0 else 2) / (width * height)
+            r = g = b = 0.0
+            for y in range(height):
+                row = y * width
+                wy = cos_y[j][y]
+                for x in range(width):
+                    weight = cos_x[i][x] * wy
+                    pr, pg, pb = pixels[row + x]
+                    r += weight * pr
+                    g += weight * pg
+                    b += weight * pb
+            factors.append((r * norm, g * norm, b * norm))
+
+    dc, ac = factors[0], factors[1:]
+    result = _base83((cx - 1) + (cy - 1) * 9, 1)
+    if ac:
+        actual_max = max(abs(value) for factor in ac for value in factor)
+        quantised_max = max(0, min(82, int(actual_max * 166 - 0.5)))
+        maximum = (quantised_max + 1) / 166
+        result += _base83(quantised_max, 1)
+    else:
+        maximum = 1.0
+        result += _base83(0, 1)
+
+    result += _base83(
+        (_linear_to_srgb(dc[0]) << 16) + (_linear_to_srgb(dc[1]) << 8) + _linear_to_srgb(dc[2]),
+        4,
+    )
+    for factor in ac:
+        quant = [
+            max(0, min(18, int(math.floor(_sign_pow(value / maximum, 0.5) * 9 + 9.5))))
+            for value in factor
+        ]
+        result += _base83(quant[0] * 19 * 19 + quant[1] * 19 + quant[2], 2)
+    return result
+
+
+def dominant_color(image) -> str:
+    """Самый частый цвет из палитры в 5 цветов, #rrggbb."""
+    from PIL import Image
+
+    small = _flatten(_shrink(image, COLOR_SIZE))
+    # Медианное сечение не даёт мелким деталям перетянуть цвет на себя
+    quantized = small.quantize(colors=5, method=Image.Quantize.MEDIANCUT)
+    _, index = max(quantized.getcolors())
+    palette = quantized.getpalette()
+    r, g, b = palette[index * 3:index * 3 + 3]
+    return f"#{r:02x}{g:02x}{b:02x}"
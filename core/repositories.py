@@ -1,8 +1,23 @@
 from contextlib import asynccontextmanager
+from functools import wraps
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from core.logger import logger
+from core.database import read_only_scope
+from core.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def read_only(method):
+    """Метод только читает данные и может быть выполнен на реплике."""
+
+    @wraps(method)
+    async def wrapper(*args, **kwargs):
+        with read_only_scope():
+            return await method(*args, **kwargs)
+
+    return wrapper
 
 
 class BaseRepository:
@@ -14,7 +29,7 @@ class BaseRepository:
     async def get_session(self, session: AsyncSession = None):
         """Контекстный менеджер для работы с сессией."""
         if session:
-            logger.info("Using existing session")
+            logger.debug("Using existing session")
             yield session
         else:
             async with self.session_factory() as new_session:
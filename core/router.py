@@ -0,0 +1,71 @@
+from dependency_injector.wiring import Provide, inject
+from fastapi import APIRouter, Depends
+
+from auth.depends import require_internal_token
+from core.cache import ObjectCache, ResponseCache
+from core.container import Container
+from core.database import Database
+from core.hashing import PasswordHasher
+from core.images import ImageProcessor
+from core.jobs import JobQueue
+from core.schemas import (
+    GetCacheStatsResponseSchema,
+    GetImageProcessorStatsResponseSchema,
+    GetJobQueueStatsResponseSchema,
+    GetPasswordHasherStatsResponseSchema,
+    GetPoolStatsResponseSchema,
+)
+
+router = APIRouter(
+    prefix="/health",
+    tags=["health"],
+    dependencies=[Depends(require_internal_token)],
+)
+
+
+@router.get("/db/pool/", response_model=GetPoolStatsResponseSchema)
+@inject
+async def get_pool_stats(
+    db: Database = Depends(Provide[Container.db]),
+):
+    return GetPoolStatsResponseSchema(data=db.pool_stats())
+
+
+@router.get("/cache/", response_model=GetCacheStatsResponseSchema)
+@inject
+async def get_cache_stats(
+    catalog_cache: ResponseCache = Depends(Provide[Container.catalog_cache]),
+    item_cache: ObjectCache = Depends(Provide[Container.item_cache]),
+    shop_cache: ObjectCache = Depends(Provide[Container.shop_cache]),
+):
+    return GetCacheStatsResponseSchema(
+        data={
+            "catalog": catalog_cache.stats(),
+            "item": item_cache.stats(),
+            "shop": shop_cache.stats(),
+        }
+    )
+
+
+@router.get("/password-hasher/", response_model=GetPasswordHasherStatsResponseSchema)
+@inject
+async def get_password_hasher_stats(
+    password_hasher: PasswordHasher = Depends(Provide[Container.password_hasher]),
+):
+    return GetPasswordHasherStatsResponseSchema(data=password_hasher.stats())
+
+
+@router.get("/images/", response_model=GetImageProcessorStatsResponseSchema)
+@inject
+async def get_image_processor_stats(
+    image_processor: ImageProcessor = Depends(Provide[Container.image_processor]),
+):
+    return GetImageProcessorStatsResponseSchema(data=image_processor.stats())
+
+
+@router.get("/jobs/", response_model=GetJobQueueStatsResponseSchema)
+@inject
+async def get_job_queue_stats(
+    job_queue: JobQueue = Depends(Provide[Container.job_queue]),
+):
+    return GetJobQueueStatsResponseSchema(data=job_queue.stats())
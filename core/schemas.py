@@ -1,9 +1,132 @@
-from pydantic import BaseModel
+from typing import Annotated, Optional
+
+from pydantic import BaseModel, PlainSerializer
+
+from core.utils import media_url
+
+# Ключ хранилища внутри приложения, URL в ответе API
+MediaUrl = Annotated[str, PlainSerializer(media_url, return_type=str)]
 
 
 class StatusOkSchema(BaseModel):
     status: str = "ok"
 
 
+class ImageVariantDTO(BaseModel):
+    width: int
+    height: int
+    webp: MediaUrl
+    # None, если сервер собран без поддержки AVIF
+    avif: Optional[MediaUrl] = None
+
+
 class CountSchema(BaseModel):
-    count: int
+    # None, если клиент запросил список с with_count=false
+    count: Optional[int] = None
+
+
+class CursorSchema(BaseModel):
+    next_cursor: Optional[str] = None
+
+
+class PoolStatsDTO(BaseModel):
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    checkouts_total: int
+    wait_time_total_ms: float
+    wait_time_max_ms: float
+    checkout_wait_p99_ms: float
+    checkout_hold_p99_ms: float
+
+
+class ReplicaPoolStatsDTO(PoolStatsDTO):
+    healthy: bool
+    lag_seconds: Optional[float] = None
+
+
+class DatabasePoolStatsDTO(PoolStatsDTO):
+    replicas: list[ReplicaPoolStatsDTO] = []
+
+
+class GetPoolStatsResponseSchema(StatusOkSchema):
+    data: DatabasePoolStatsDTO
+
+
+class CacheStatsDTO(BaseModel):
+    entries: int
+    max_entries: int
+    hits: int
+    misses: int
+    coalesced: int
+    evictions: int
+    invalidations: int
+    hit_ratio: float
+
+
+class ObjectCacheStatsDTO(BaseModel):
+    hits: int
+    misses: int
+    hit_ratio: float
+
+
+class CachesStatsDTO(BaseModel):
+    catalog: CacheStatsDTO
+    item: ObjectCacheStatsDTO
+    shop: ObjectCacheStatsDTO
+
+
+class GetCacheStatsResponseSchema(StatusOkSchema):
+    data: CachesStatsDTO
+
+
+class PasswordHasherStatsDTO(BaseModel):
+    rounds: int
+    workers: int
+    max_pending: int
+    pending: int
+    running: int
+    queued: int
+    completed: int
+    rejected: int
+    wait_time_avg_ms: float
+    wait_time_max_ms: float
+    run_time_avg_ms: float
+
+
+class GetPasswordHasherStatsResponseSchema(StatusOkSchema):
+    data: PasswordHasherStatsDTO
+
+
+class ImageProcessorStatsDTO(BaseModel):
+    workers: int
+    max_concurrent: int
+    waiting: int
+    running: int
+    completed: int
+    failed: int
+    rejected: int
+    timeouts: int
+    wait_time_avg_ms: float
+    wait_time_max_ms: float
+    run_time_avg_ms: float
+    run_time_max_ms: float
+
+
+class GetImageProcessorStatsResponseSchema(StatusOkSchema):
+    data: ImageProcessorStatsDTO
+
+
+class JobQueueStatsDTO(BaseModel):
+    workers: int
+    max_size: int
+    queued: int
+    running: int
+    completed: int
+    failed: int
+    rejected: int
+
+
+class GetJobQueueStatsResponseSchema(StatusOkSchema):
+    data: JobQueueStatsDTO
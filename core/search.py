@@ -0,0 +1,44 @@
+from enum import Enum
+
+from sqlalchemy import func, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.environment import env
+
+
+class SearchMode(str, Enum):
+    SUBSTRING = "substring"
+    SIMILAR = "similar"
+    FULLTEXT = "fulltext"
+
+
+async def substring_filter(
+    session: AsyncSession,
+    column,
+    search: str,
+    mode: SearchMode = SearchMode.SUBSTRING,
+    threshold: float | None = None,
+):
+    """
+    Условие поиска по колонке с триграммным GIN-индексом (gin_trgm_ops).
+
+    substring - прежняя семантика ilike('%q%'), индекс используется как есть;
+    similar   - q <% column (word_similarity), терпит опечатки. Порог задаётся
+                на текущую транзакцию, поэтому условие нужно выполнять в той же
+                сессии. Режимы, которых колонка не знает, ищут подстроку.
+    """
+    if mode == SearchMode.SIMILAR:
+        await session.execute(
+            select(
+                func.set_config(
+                    "pg_trgm.word_similarity_threshold",
+                    str(
+                        env.search_similarity_threshold
+                        if threshold is None else threshold
+                    ),
+                    True,
+                )
+            )
+        )
+        return literal(search).bool_op("<%")(column)
+    return column.ilike(f"%{search}%")
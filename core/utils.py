@@ -1,26 +1,22 @@
-import hashlib
-import time
 from datetime import datetime
-from urllib.parse import urljoin
+from typing import Optional
 
 from fastapi import Request
 
+from core.environment import env
 
-def generate_hashed_filename(filename: str) -> str:
-    unique_data = f"{filename}_{time.time()}"
 
-    hash_object = hashlib.sha256(unique_data.encode())
-    hashed_filename = hash_object.hexdigest()
+def media_url(path: Optional[str]) -> Optional[str]:
+    """
+    URL файла по ключу хранилища: media_url_base + ключ.
 
-    ext = filename.split(".")[-1] if "." in filename else ""
-    if ext:
-        return f"{hashed_filename}.{ext}"
-    return hashed_filename
-
-
-def get_media_url(base_url, path: str) -> str:
-    full_url = urljoin(str(base_url), f"{path}")  # Формируем полный URL для файла
-    return full_url
+    Ключ хранилища содержит sha256 содержимого, поэтому URL сам по себе
+    версия: новое фото - новый URL, и его можно кэшировать навсегда.
+    Уже готовые URL (аватары OAuth, значения из кэша) не меняются.
+    """
+    if not path or path.startswith("/") or "://" in path:
+        return path
+    return f"{env.media_url_base.rstrip('/')}/{path}"
 
 
 async def get_language_from_cookies(request: Request) -> str:
@@ -0,0 +1,118 @@
+"""
+Заполнение BlurHash и основного цвета у фото, загруженных до их появления.
+
+Идёт по items.photo и users.avatar пачками по id, читает каждый файл
+из хранилища один раз (одно фото может быть у нескольких строк) и считает
+заглушку в пуле процессов ImageProcessor. Строки с уже заполненной
+заглушкой и внешние аватары (OAuth) пропускаются, поэтому команду можно
+прерывать и запускать снова.
+
+Запуск из корня проекта, после alembic upgrade head:
+
+    python -m dev_tools.backfill_placeholders [--batch-size 200] [--dry-run]
+
+Закэшированные DTO получат заглушки после истечения OBJECT_CACHE_TTL.
+"""
+import argparse
+import asyncio
+import sys
+
+from fastapi import HTTPException
+from sqlalchemy import select, update
+
+import uploads.models  # noqa: F401
+import users.models  # noqa: F401  регистрирует все модели в metadata
+from core.container import Container
+from items.models import Item
+from users.models import User
+
+
+# (модель, колонка пути, колонка заглушки, колонка цвета)
+TARGETS = [
+    (Item, Item.photo, Item.photo_placeholder, Item.photo_color),
+    (User, User.avatar, User.avatar_placeholder, User.avatar_color),
+]
+
+
+async def _placeholder(storage, image_processor, path: str):
+    try:
+        content = await storage.read(path)
+        return await image_processor.placeholder(content)
+    except FileNotFoundError:
+        print(f"missing  {path}")
+    except HTTPException as exc:
+        print(f"failed   {path}: {exc.detail}")
+    return None
+
+
+async def backfill(container: Container, target, batch_size: int, dry_run: bool) -> int:
+    model, path_column, placeholder_column, color_column = target
+    db = container.db()
+    storage = container.media_storage()
+    image_processor = container.image_processor()
+    # Пачки по image_max_concurrent: остальные задачи ждали бы в очереди пула
+    parallel = image_processor.max_concurrent
+    last_id = 0
+    updated = 0
+    while True:
+        async with db.session() as session:
+            rows = (await session.execute(
+                select(model.id, path_column)
+                .where(
+                    model.id > last_id,
+                    path_column.is_not(None),
+                    path_column.not_like("http%"),
+                    placeholder_column.is_(None),
+                )
+                .order_by(model.id)
+                .limit(batch_size)
+            )).all()
+        if not rows:
+            return updated
+        last_id = rows[-1].id
+        paths = sorted({row[1] for row in rows})
+
+        results = {}
+        for start in range(0, len(paths), parallel):
+            chunk = paths[start:start + parallel]
+            values = await asyncio.gather(
+                *(_placeholder(storage, image_processor, path) for path in chunk)
+            )
+            results.update(
+                (path, value) for path, value in zip(chunk, values) if value
+            )
+
+        if not dry_run and results:
+            async with db.session() as session:
+                for path, (placeholder, color) in results.items():
+                    await session.execute(
+                        update(model)
+                        .where(path_column == path, placeholder_column.is_(None))
+                        .values({placeholder_column: placeholder, color_column: color})
+                    )
+                await session.commit()
+        updated += len(results)
+        print(f"{model.__tablename__}: up to id {last_id}, {updated} photos")
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--dry-run", action="store_true", help="считать, но не записывать")
+    args = parser.parse_args()
+
+    container = Container()
+    try:
+        for target in TARGETS:
+            updated = await backfill(container, target, args.batch_size, args.dry_run)
+            print(f"{target[0].__tablename__}: done, {updated} photos"
+                  f"{' (dry run)' if args.dry_run else ''}")
+    finally:
+        container.image_processor().shutdown()
+        await container.media_storage().close()
+        await container.db().dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,136 @@
+"""
+Сравнение сжатия фото: старый цикл из _upload_photo и поиск качества.
+
+Для каждого файла печатает число полных JPEG-кодирований, время и итоговый
+размер у обоих вариантов. Без аргументов генерирует синтетический набор
+(случайный шум поверх градиента, худший случай для JPEG); лучше передать каталог
+с настоящими фотографиями:
+
+    python -m dev_tools.benchmark_photo_compression ~/photos
+    python -m dev_tools.benchmark_photo_compression --max-size 2097152 ~/photos
+"""
+import argparse
+import io
+import random
+import sys
+import time
+from pathlib import Path
+
+from PIL import Image
+
+from core.images import ImageError, compress_image_with_stats
+
+EXTENSIONS = {".jpg", ".jpeg", ".png", ".heic", ".heif", ".webp"}
+
+
+def legacy_compress(content: bytes, max_size: int) -> tuple[bytes, int]:
+    """Алгоритм _upload_photo до перехода на поиск качества; возвращает (байты, кодирования)."""
+    file_size = len(content)
+    encodes = 0
+    if file_size <= max_size:
+        return content, encodes
+
+    image = Image.open(io.BytesIO(content))
+    max_dimension = 2000
+    quality = 95
+
+    while file_size > max_size and (quality > 20 or max_dimension > 800):
+        if max(image.size) > max_dimension:
+            ratio = min(max_dimension / max(image.size[0], image.size[1]), 1.0)
+            new_size = tuple(int(dim * ratio) for dim in image.size)
+            image = image.resize(new_size, Image.Resampling.LANCZOS)
+
+        output = io.BytesIO()
+        # Старый код падал на RGBA; конвертируем, чтобы сравнить на PNG тоже
+        image.convert("RGB").save(output, format="JPEG", quality=quality, optimize=True)
+        encodes += 1
+        content = output.getvalue()
+        file_size = len(content)
+
+        if file_size > max_size:
+            quality -= 5
+            max_dimension = int(max_dimension * 0.9)
+
+        if file_size > max_size:
+            image = Image.open(io.BytesIO(content))
+
+    if file_size > max_size:
+        raise ImageError("error.photo.too_large")
+    return content, encodes
+
+
+def synthetic_corpus() -> list[tuple[str, bytes]]:
+    # Фиксированный seed: одинаковый набор между запусками
+    rng = random.Random(0)
+    corpus = []
+    for (width, height), alpha in [
+        ((2400, 1600), 0.3), ((4032, 3024), 0.5), ((4032, 3024), 0.8), ((6000, 4000), 1.0)
+    ]:
+        gradient = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+        noise = Image.frombytes("RGB", (width, height), rng.randbytes(width * height * 3))
+        image = Image.blend(gradient, noise, alpha)
+        output = io.BytesIO()
+        image.save(output, format="PNG")
+        corpus.append((f"synthetic_{width}x{height}_{alpha}.png", output.getvalue()))
+    return corpus
+
+
+def load_corpus(paths: list[str]) -> list[tuple[str, bytes]]:
+    if not paths:
+        return synthetic_corpus()
+    try:
+        from pillow_heif import register_heif_opener
+
+        register_heif_opener()
+    except ImportError:
+        pass
+    corpus = []
+    for path in map(Path, paths):
+        files = sorted(path.iterdir()) if path.is_dir() else [path]
+        corpus += [
+            (file.name, file.read_bytes())
+            for file in files
+            if file.suffix.lower() in EXTENSIONS
+        ]
+    return corpus
+
+
+def measure(compress, content: bytes, max_size: int) -> tuple[str, float, int]:
+    started = time.perf_counter()
+    try:
+        output, *encodes = compress(content, max_size)
+        size = len(output)
+    except ImageError:
+        encodes, size = [], -1
+    return "+".join(map(str, encodes)) or "fail", time.perf_counter() - started, size
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("paths", nargs="*", help="файлы или каталоги с фото")
+    parser.add_argument("--max-size", type=int, default=5 * 1024 * 1024)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.paths)
+    if not corpus:
+        print("no photos found")
+        return 1
+
+    print(f"{'file':32} {'bytes':>10} | {'legacy enc':>10} {'ms':>8} {'bytes':>9} "
+          f"| {'search enc':>10} {'ms':>8} {'bytes':>9}")
+    totals = {"legacy": 0.0, "search": 0.0}
+    for name, content in corpus:
+        legacy = measure(legacy_compress, content, args.max_size)
+        search = measure(compress_image_with_stats, content, args.max_size)
+        totals["legacy"] += legacy[1]
+        totals["search"] += search[1]
+        print(f"{name[:32]:32} {len(content):>10} | {legacy[0]:>10} {legacy[1] * 1000:>8.0f} "
+              f"{legacy[2]:>9} | {search[0]:>10} {search[1] * 1000:>8.0f} {search[2]:>9}")
+
+    print(f"\ntotal: legacy {totals['legacy']:.2f}s, search {totals['search']:.2f}s")
+    print("search enc = full encodes + reduced-size trial encodes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
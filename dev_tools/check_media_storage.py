@@ -0,0 +1,69 @@
+"""
+Проверка драйвера хранилища медиа из настроек (MEDIA_STORAGE, S3_*).
+
+Записывает маленький объект и объект больше порога multipart, проверяет
+exists и листинг, затем удаляет оба. Для S3 удобно прогонять против MinIO
+из dev_tools/docker-compose-local.yml (профиль s3, бакет создаётся заранее):
+
+    docker compose -f dev_tools/docker-compose-local.yml --profile s3 up -d
+    MEDIA_STORAGE=s3 S3_ENDPOINT_URL=http://localhost:9000 \\
+        python -m dev_tools.check_media_storage
+"""
+import asyncio
+import os
+import sys
+
+from core.environment import env
+from uploads.storage import create_media_storage
+
+
+PREFIX = "media/storage-check"
+
+
+async def main() -> int:
+    storage = create_media_storage(
+        backend=env.media_storage,
+        root=env.media_local_root,
+        prefix=env.media_root,
+        bucket=env.s3_bucket,
+        endpoint_url=env.s3_endpoint_url,
+        region=env.s3_region,
+        access_key_id=env.s3_access_key_id,
+        secret_access_key=env.s3_secret_access_key,
+        multipart_threshold=env.s3_multipart_threshold,
+        part_size=env.s3_part_size,
+    )
+    objects = {
+        f"{PREFIX}/small.jpg": os.urandom(1024),
+        # Две с половиной части: последняя часть короче остальных
+        f"{PREFIX}/large.jpg": os.urandom(env.s3_multipart_threshold * 5 // 2),
+    }
+    failed = False
+    try:
+        for key, data in objects.items():
+            await storage.save(key, data)
+            if not await storage.exists(key):
+                print(f"FAIL  {key}: not found after save")
+                failed = True
+
+        listed = {obj.key: obj.size async for obj in storage.iter_objects(PREFIX)}
+        for key, data in objects.items():
+            status = "ok" if listed.get(key) == len(data) else "FAIL"
+            failed |= status == "FAIL"
+            print(f"{status:4}  {key}: {len(data)} bytes, listed {listed.get(key)}")
+
+        for key in objects:
+            await storage.delete(key)
+            # Повторное удаление не должно падать
+            await storage.delete(key)
+            if await storage.exists(key):
+                print(f"FAIL  {key}: still exists after delete")
+                failed = True
+    finally:
+        await storage.close()
+    print(f"{type(storage).__name__}: {'FAILED' if failed else 'passed'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,211 @@
+"""
+Проверка, что запросы репозиториев попадают в индексы.
+
+Каждая проверка вызывает метод репозитория, перехватывает отправленный в базу
+SQL (before_cursor_execute) и прогоняет его через EXPLAIN с выключенным
+seq scan: на пустой или маленькой таблице планировщик иначе честно выберет
+последовательное чтение. Если ожидаемый индекс не встречается ни в одном
+плане, значит запрос написан так, что индекс использовать нельзя.
+
+Перед этим индексы и уникальные ограничения моделей сверяются с базой:
+отсутствующий индекс обычно означает забытую или непримененную миграцию.
+
+Запуск из корня проекта, на базе после alembic upgrade head:
+
+    python -m dev_tools.check_query_plans
+"""
+import asyncio
+import json
+import sys
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+from sqlalchemy import UniqueConstraint, event, text
+from sqlalchemy.engine import Engine
+
+import uploads.models  # noqa: F401
+import users.models  # noqa: F401  регистрирует все модели в metadata
+from auth.repositories import RefreshTokenRepository
+from cart.repositories import CartRepository
+from core.container import Container
+from core.database import BaseModel
+from core.search import SearchMode
+from items.schemas import ItemOrdering
+from orders.repositories import OrderRepository
+
+
+USER = SimpleNamespace(id=1)
+
+CHECKS = [
+    (
+        "items: my items, substring search",
+        ("ix_items_name_trgm", "ix_items_shop_id_id"),
+        lambda c: c.item_repository().get_my_items(USER, "phone"),
+    ),
+    (
+        "items: my items, similarity search",
+        ("ix_items_name_trgm", "ix_items_shop_id_id"),
+        lambda c: c.item_repository().get_my_items(
+            USER, "phnoe", search_mode=SearchMode.SIMILAR
+        ),
+    ),
+    (
+        "items: shop items, substring search",
+        ("ix_items_name_trgm", "ix_items_shop_id_id"),
+        lambda c: c.item_repository().get_shop_items(1, "phone"),
+    ),
+    (
+        "items: catalog, full-text search",
+        "ix_items_search_vector",
+        lambda c: c.item_repository().get_catalog(
+            "phone", search_mode=SearchMode.FULLTEXT
+        ),
+    ),
+    (
+        "favorites: items, substring search",
+        "ix_items_name_trgm",
+        lambda c: c.favorite_repository().get_favorite_items(1, search="phone"),
+    ),
+    (
+        "favorites: shops, substring search",
+        "ix_users_name_trgm",
+        lambda c: c.favorite_repository().get_favorite_shops(1, search="shop"),
+    ),
+    (
+        "items: shop items",
+        "ix_items_shop_id_id",
+        lambda c: c.item_repository().get_shop_items(1),
+    ),
+    (
+        "items: catalog by price",
+        "ix_items_price_id",
+        lambda c: c.item_repository().get_catalog(order=ItemOrdering.PRICE_ASC),
+    ),
+    (
+        "favorites: items",
+        "ix_favorite_items_user_id_created_at_id",
+        lambda c: c.favorite_repository().get_favorite_items(1),
+    ),
+    (
+        "favorites: shops",
+        "ix_favorite_shops_user_id_created_at_id",
+        lambda c: c.favorite_repository().get_favorite_shops(1),
+    ),
+    (
+        "favorites: remove item",
+        "uq_favorite_items_user_id_item_id",
+        lambda c: c.favorite_repository().remove_item(0, 0),
+    ),
+    (
+        "cart: list",
+        "ix_cart_user_id_created_at_id",
+        lambda c: CartRepository(c.db().session).get_cart(1),
+    ),
+    (
+        "cart: remove item",
+        "unique_user_item_cart",
+        lambda c: CartRepository(c.db().session).remove_from_cart(0, 0),
+    ),
+    (
+        "orders: own orders",
+        "ix_orders_user_id",
+        lambda c: OrderRepository(c.db().session).get_self_orders(1),
+    ),
+    (
+        "auth: refresh token lookup",
+        "refresh_tokens_refresh_token_key",
+        lambda c: RefreshTokenRepository(c.db().session).get_refresh_token("-"),
+    ),
+    (
+        "users: lookup by email",
+        "ix_users_email",
+        lambda c: c.user_repository().get_user_by_email("-"),
+    ),
+]
+
+
+async def missing_indexes(engine) -> list[str]:
+    """Индексы и уникальные ограничения из моделей, которых нет в базе."""
+    expected = set()
+    for table in BaseModel.metadata.tables.values():
+        expected |= {(table.name, index.name) for index in table.indexes}
+        expected |= {
+            (table.name, constraint.name)
+            for constraint in table.constraints
+            if isinstance(constraint, UniqueConstraint) and constraint.name
+        }
+    async with engine.connect() as conn:
+        result = await conn.execute(
+            text("SELECT tablename, indexname FROM pg_indexes WHERE schemaname = 'public'")
+        )
+        existing = {tuple(row) for row in result}
+    return sorted(f"{table}.{name}" for table, name in expected - existing)
+
+
+@contextmanager
+def capture_statements():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(Engine, "before_cursor_execute", before_cursor_execute)
+
+
+def used_indexes(plan: dict) -> set[str]:
+    indexes = set()
+    if "Index Name" in plan:
+        indexes.add(plan["Index Name"])
+    for child in plan.get("Plans", []):
+        indexes |= used_indexes(child)
+    return indexes
+
+
+async def explain(engine, statements) -> set[str]:
+    indexes = set()
+    async with engine.connect() as conn:
+        raw = await conn.get_raw_connection()
+        driver = raw.driver_connection
+        await driver.execute("SET enable_seqscan = off")
+        for statement, parameters in statements:
+            # EXPLAIN без ANALYZE ничего не выполняет, DML тоже можно
+            if not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+                continue
+            plan = await driver.fetchval(
+                f"EXPLAIN (FORMAT JSON) {statement}", *(parameters or ())
+            )
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            indexes |= used_indexes(plan[0]["Plan"])
+    return indexes
+
+
+async def main() -> int:
+    container = Container()
+    db = container.db()
+    failed = 0
+    try:
+        for name in await missing_indexes(db.router.primary):
+            failed += 1
+            print(f"FAIL missing index {name}")
+        for name, expected, call in CHECKS:
+            # Несколько имён: подходит любой из индексов
+            expected = expected if isinstance(expected, tuple) else (expected,)
+            with capture_statements() as statements:
+                await call(container)
+            indexes = await explain(db.router.primary, statements)
+            ok = bool(indexes.intersection(expected))
+            failed += not ok
+            print(f"{'OK  ' if ok else 'FAIL'} {name}: expected {' or '.join(expected)}, "
+                  f"used {', '.join(sorted(indexes)) or 'no index'}")
+    finally:
+        await db.dispose()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
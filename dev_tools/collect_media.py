@@ -0,0 +1,51 @@
+"""
+Удаление файлов медиа, на которые больше ничего не ссылается.
+
+То же, что периодически делает приложение (MEDIA_GC_INTERVAL), но по запросу,
+например из cron при MEDIA_GC_INTERVAL=0. Если сборка уже идёт в одном
+из воркеров, команда ничего не делает.
+
+Запуск из корня проекта:
+
+    python -m dev_tools.collect_media --dry-run
+    python -m dev_tools.collect_media [--grace-period 3600]
+"""
+import argparse
+import asyncio
+import sys
+from dataclasses import asdict
+
+import uploads.models  # noqa: F401
+import users.models  # noqa: F401  регистрирует все модели в metadata
+from core.container import Container
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--dry-run", action="store_true", help="только посчитать")
+    parser.add_argument(
+        "--grace-period", type=float, help="не трогать файлы моложе, секунд"
+    )
+    args = parser.parse_args()
+
+    container = Container()
+    collector = container.media_collector()
+    if args.grace_period is not None:
+        collector.grace_period = args.grace_period
+    try:
+        report = await collector.collect(dry_run=args.dry_run)
+    finally:
+        await container.media_storage().close()
+        await container.db().dispose()
+
+    if report.skipped:
+        print("Collection is already running in another process")
+        return 1
+    for name, value in asdict(report).items():
+        print(f"{name:16} {value}")
+    print(f"{'reclaimed_mb':16} {report.reclaimed_bytes / 1024 / 1024:.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
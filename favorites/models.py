@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, func, DateTime
+from sqlalchemy import Column, Integer, ForeignKey, func, DateTime, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from core.database import BaseModel
 from datetime import datetime
@@ -7,6 +7,11 @@ from sqlalchemy.orm import Mapped, mapped_column
 
 class FavoriteItem(BaseModel):
     __tablename__ = "favorite_items"
+    __table_args__ = (
+        Index("ix_favorite_items_user_id_created_at_id", "user_id", "created_at", "id"),
+        UniqueConstraint("user_id", "item_id", name="uq_favorite_items_user_id_item_id"),
+        Index("ix_favorite_items_item_id", "item_id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     item_id: Mapped[int] = mapped_column(Integer, ForeignKey("items.id"))
@@ -21,6 +26,11 @@ class FavoriteItem(BaseModel):
 
 class FavoriteShop(BaseModel):
     __tablename__ = "favorite_shops"
+    __table_args__ = (
+        Index("ix_favorite_shops_user_id_created_at_id", "user_id", "created_at", "id"),
+        UniqueConstraint("user_id", "shop_id", name="uq_favorite_shops_user_id_shop_id"),
+        Index("ix_favorite_shops_shop_id", "shop_id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     shop_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"))
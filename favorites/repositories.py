@@ -1,93 +1,122 @@
-from core.repositories import BaseRepository
+from core.counting import CountStrategy, RowCounter
+from core.pagination import Keyset, paginate
+from core.repositories import BaseRepository, read_only
 from favorites.models import FavoriteItem, FavoriteShop
 from favorites.schemas import FavoriteItemDTO, FavoriteShopDTO
+from core.search import SearchMode, substring_filter
+from items.models import Item
+from users.models import User
 from sqlalchemy import select, delete, func
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import selectinload
 
 
+FAVORITE_ITEMS_KEYSET = Keyset(
+    "-created_at", FavoriteItem.created_at, FavoriteItem.id, descending=True
+)
+FAVORITE_SHOPS_KEYSET = Keyset(
+    "-created_at", FavoriteShop.created_at, FavoriteShop.id, descending=True
+)
+
+
 class FavoriteRepository(BaseRepository):
+    def __init__(self, session_factory, counter: RowCounter):
+        super().__init__(session_factory)
+        self.counter = counter
 
     async def add_item(self, item_id: int, user_id: int) -> FavoriteItem:
         async with self.get_session() as session:
-            favorite = FavoriteItem(item_id=item_id, user_id=user_id)
-            session.add(favorite)
+            # Повторное добавление не создаёт дубль (uq_favorite_items_user_id_item_id)
+            await session.execute(
+                insert(FavoriteItem).values(item_id=item_id, user_id=user_id)
+                .on_conflict_do_nothing(
+                    index_elements=[FavoriteItem.user_id, FavoriteItem.item_id]
+                )
+            )
             await session.commit()
-            await session.refresh(favorite)
+            self.counter.invalidate(f"favorite_items:{user_id}")
+            favorite = await session.scalar(
+                select(FavoriteItem).where(
+                    FavoriteItem.item_id == item_id, FavoriteItem.user_id == user_id
+                )
+            )
             return FavoriteItemDTO.model_validate(favorite)
     
     async def add_shop(self, shop_id: int, user_id: int) -> FavoriteShop:
         async with self.get_session() as session:
-            favorite = FavoriteShop(shop_id=shop_id, user_id=user_id)
-            session.add(favorite)
+            # Повторное добавление не создаёт дубль (uq_favorite_shops_user_id_shop_id)
+            await session.execute(
+                insert(FavoriteShop).values(shop_id=shop_id, user_id=user_id)
+                .on_conflict_do_nothing(
+                    index_elements=[FavoriteShop.user_id, FavoriteShop.shop_id]
+                )
+            )
             await session.commit()
-            await session.refresh(favorite)
+            self.counter.invalidate(f"favorite_shops:{user_id}")
+            favorite = await session.scalar(
+                select(FavoriteShop).where(
+                    FavoriteShop.shop_id == shop_id, FavoriteShop.user_id == user_id
+                )
+            )
             return FavoriteShopDTO.model_validate(favorite)
 
+    @read_only
     async def get_favorite_items(
         self, user_id: int, limit: int = 10, 
-        offset: int = 0, search: str | None = None
-    ) -> tuple[list[FavoriteItemDTO], int]:
+        offset: int = 0, search: str | None = None,
+        cursor: str | None = None,
+        count_strategy: CountStrategy | None = CountStrategy.EXACT,
+        search_mode: SearchMode = SearchMode.SUBSTRING
+    ) -> tuple[list[FavoriteItemDTO], int | None, str | None]:
         async with self.get_session() as session:
             favorites = select(FavoriteItem).where(
                 FavoriteItem.user_id == user_id
             )
             if search:
-                favorites = favorites.options(
+                favorites = favorites.join(FavoriteItem.item).options(
                     selectinload(FavoriteItem.item)
                 ).where(
-                    FavoriteItem.item.name.ilike(f"%{search}%")
+                    await substring_filter(session, Item.name, search, search_mode)
                 )
-            favorites = favorites.limit(limit).offset(offset)
-            favorites = await session.execute(favorites)
-            favorites = favorites.scalars().all()
+            page, next_cursor = await paginate(
+                session, favorites, FAVORITE_ITEMS_KEYSET, limit, offset, cursor
+            )
             
-            count_query = select(func.count(FavoriteItem.id)).where(
-                FavoriteItem.user_id == user_id
+            count = await self.counter.count(
+                session, favorites, count_strategy, f"favorite_items:{user_id}"
             )
-            if search:
-                count_query = count_query.options(
-                    selectinload(FavoriteItem.item)
-                ).where(
-                    FavoriteItem.item.name.ilike(f"%{search}%")
-                )
-            count = await session.execute(count_query)
-            count = count.scalar_one()
             return [
-                FavoriteItemDTO.model_validate(favorite) for favorite in favorites
-            ], count
+                FavoriteItemDTO.model_validate(favorite) for favorite in page
+            ], count, next_cursor
 
+    @read_only
     async def get_favorite_shops(
         self, user_id: int, limit: int = 10, 
-        offset: int = 0, search: str | None = None
-    ) -> tuple[list[FavoriteShopDTO], int]:
+        offset: int = 0, search: str | None = None,
+        cursor: str | None = None,
+        count_strategy: CountStrategy | None = CountStrategy.EXACT,
+        search_mode: SearchMode = SearchMode.SUBSTRING
+    ) -> tuple[list[FavoriteShopDTO], int | None, str | None]:
         async with self.get_session() as session:
             favorites = select(FavoriteShop).where(
                 FavoriteShop.user_id == user_id
             )
             if search:
-                favorites = favorites.options(
+                favorites = favorites.join(FavoriteShop.shop).options(
                     selectinload(FavoriteShop.shop)
                 ).where(
-                    FavoriteShop.shop.name.ilike(f"%{search}%")
+                    await substring_filter(session, User.name, search, search_mode)
                 )
-            favorites = favorites.limit(limit).offset(offset)
-            favorites = await session.execute(favorites)
-            favorites = favorites.scalars().all()
+            page, next_cursor = await paginate(
+                session, favorites, FAVORITE_SHOPS_KEYSET, limit, offset, cursor
+            )
             
-            count_query = select(func.count(FavoriteShop.id)).where(
-                FavoriteShop.user_id == user_id
+            count = await self.counter.count(
+                session, favorites, count_strategy, f"favorite_shops:{user_id}"
             )
-            if search:
-                count_query = count_query.options(
-                    selectinload(FavoriteShop.shop)
-                ).where(
-                    FavoriteShop.shop.name.ilike(f"%{search}%")
-                )   
-            count = await session.execute(count_query)
-            count = count.scalar_one()
             return [
-                FavoriteShopDTO.model_validate(favorite) for favorite in favorites
-            ], count
+                FavoriteShopDTO.model_validate(favorite) for favorite in page
+            ], count, next_cursor
     
     async def remove_item(self, item_id: int, user_id: int) -> None:
         async with self.get_session() as session:
@@ -98,6 +127,7 @@ class FavoriteRepository(BaseRepository):
                 )
             )
             await session.commit()
+            self.counter.invalidate(f"favorite_items:{user_id}")
 
     async def remove_shop(self, shop_id: int, user_id: int) -> None:
         async with self.get_session() as session:
@@ -108,3 +138,4 @@ class FavoriteRepository(BaseRepository):
                 )
             )
             await session.commit()
+            self.counter.invalidate(f"favorite_shops:{user_id}")
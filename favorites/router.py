@@ -3,6 +3,7 @@ from dependency_injector.wiring import inject, Provide
 from core.container import Container
 from users.schemas import UserDTO
 from auth.depends import get_current_verified_buyer
+from core.search import SearchMode
 from favorites.schemas import (
     AddItemToFavoritesResponseSchema,
     AddShopToFavoritesResponseSchema,
@@ -41,11 +42,15 @@ async def get_favorite_items(
     search: str | None = None,
     limit: int = 10,
     offset: int = 0,
+    cursor: str | None = None,
+    with_count: bool = True,
+    search_mode: SearchMode = SearchMode.SUBSTRING,
     current_user: UserDTO = Depends(get_current_verified_buyer),
     favorite_service: FavoriteService = Depends(Provide[Container.favorite_service]),
 ) -> GetFavoriteItemsResponseSchema:
     return await favorite_service.get_favorite_items(
-        current_user.id, limit, offset, search
+        current_user.id, limit, offset, search, cursor, with_count,
+        search_mode
     )
 
 @router.get("/shops/", response_model=GetFavoriteShopsResponseSchema)
@@ -54,11 +59,15 @@ async def get_favorite_shops(
     search: str | None = None,
     limit: int = 10,
     offset: int = 0,
+    cursor: str | None = None,
+    with_count: bool = True,
+    search_mode: SearchMode = SearchMode.SUBSTRING,
     current_user: UserDTO = Depends(get_current_verified_buyer),
     favorite_service: FavoriteService = Depends(Provide[Container.favorite_service]),
 ) -> GetFavoriteShopsResponseSchema:
     return await favorite_service.get_favorite_shops(
-        current_user.id, limit, offset, search
+        current_user.id, limit, offset, search, cursor, with_count,
+        search_mode
     )
 
 @router.delete("/item/{item_id}/")
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, ConfigDict
-from core.schemas import StatusOkSchema, CountSchema
+from core.schemas import StatusOkSchema, CountSchema, CursorSchema
 from datetime import datetime
 
 
@@ -28,10 +28,10 @@ class AddShopToFavoritesResponseSchema(StatusOkSchema):
     data: FavoriteShopDTO
     message: str = "success.favorites.shop.added"
 
-class GetFavoriteItemsResponseSchema(StatusOkSchema, CountSchema):   
+class GetFavoriteItemsResponseSchema(StatusOkSchema, CountSchema, CursorSchema):   
     data: list[FavoriteItemDTO]
 
-class GetFavoriteShopsResponseSchema(StatusOkSchema, CountSchema):   
+class GetFavoriteShopsResponseSchema(StatusOkSchema, CountSchema, CursorSchema):   
     data: list[FavoriteShopDTO]
 
 
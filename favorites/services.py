@@ -9,6 +9,9 @@ from favorites.repositories import FavoriteRepository
 from items.repositories import ItemRepository
 from users.repositories import UserRepository
 from fastapi import HTTPException
+from core.counting import count_strategy_for
+from core.environment import env
+from core.search import SearchMode
 
 
 class FavoriteService:
@@ -32,7 +35,7 @@ class FavoriteService:
         )
     
     async def add_shop_to_favorites(self, shop_id: int, user_id: int) -> AddShopToFavoritesResponseSchema:
-        shop = await self.user_repo.get_user_by_id(shop_id)
+        shop = await self.user_repo.get_shop(shop_id)
         if not shop:
             raise HTTPException(status_code=404, detail="error.shop.not_found")
         favorite = await self.fav_repo.add_shop(shop_id, user_id)
@@ -40,24 +43,32 @@ class FavoriteService:
 
     async def get_favorite_items(
         self, user_id: int, limit: int = 10, 
-        offset: int = 0, search: str | None = None
+        offset: int = 0, search: str | None = None,
+        cursor: str | None = None, with_count: bool = True,
+        search_mode: SearchMode = SearchMode.SUBSTRING
     ) -> GetFavoriteItemsResponseSchema:
-        favorites, count = await self.fav_repo.get_favorite_items(
-            user_id, limit, offset, search
+        favorites, count, next_cursor = await self.fav_repo.get_favorite_items(
+            user_id, limit, offset, search, cursor,
+            count_strategy_for(env.count_strategies, "favorites", with_count),
+            search_mode
         )
         return GetFavoriteItemsResponseSchema(
-            data=favorites, count=count
+            data=favorites, count=count, next_cursor=next_cursor
         )
 
     async def get_favorite_shops(
         self, user_id: int, limit: int = 10, 
-        offset: int = 0, search: str | None = None
+        offset: int = 0, search: str | None = None,
+        cursor: str | None = None, with_count: bool = True,
+        search_mode: SearchMode = SearchMode.SUBSTRING
     ) -> GetFavoriteShopsResponseSchema:
-        favorites, count = await self.fav_repo.get_favorite_shops(
-            user_id, limit, offset, search
+        favorites, count, next_cursor = await self.fav_repo.get_favorite_shops(
+            user_id, limit, offset, search, cursor,
+            count_strategy_for(env.count_strategies, "favorites", with_count),
+            search_mode
         )
         return GetFavoriteShopsResponseSchema(
-            data=favorites, count=count
+            data=favorites, count=count, next_cursor=next_cursor
         )
     
     async def remove_item_from_favorites(self, item_id: int, user_id: int) -> None:
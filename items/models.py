@@ -5,6 +5,7 @@ from typing import List, Optional
 
 from sqlalchemy import (
     Boolean,
+    Computed,
     DateTime,
     Enum,
     ForeignKey,
@@ -15,27 +16,89 @@ from sqlalchemy import (
     func,
     Integer
 )
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from core.database import BaseModel
 
 
+# Конфигурации полнотекстового поиска по языку интерфейса. Для грузинского
+# в PostgreSQL нет стеммера, поэтому используется simple (без морфологии).
+SEARCH_CONFIGS = {
+    "ru": "russian",
+    "en": "english",
+    "ka": "simple",
+}
+
+
+def _search_vector_expression() -> str:
+    # name весит больше description; каждая конфигурация добавляет свои
+    # лексемы, поэтому запрос на любом из языков находит товар
+    parts = []
+    for column, weight in (("name", "A"), ("description", "B")):
+        for config in sorted(set(SEARCH_CONFIGS.values())):
+            parts.append(
+                f"setweight(to_tsvector('{config}', coalesce({column}, '')), '{weight}')"
+            )
+    return " || ".join(parts)
+
+
+class ItemStatus(str, enum.Enum):
+    # Фото обрабатывается в фоне (core.jobs); до первого готового фото
+    # товар виден только продавцу
+    PROCESSING = "processing"
+    READY = "ready"
+    FAILED = "failed"
+
+
 class Item(BaseModel):
     __tablename__ = "items"
+    __table_args__ = (
+        # Курсорная пагинация: (shop_id, id) для витрины магазина,
+        # (price, id) для сортировки каталога по цене
+        Index("ix_items_shop_id_id", "shop_id", "id"),
+        Index("ix_items_price_id", "price", "id"),
+        Index("ix_items_search_vector", "search_vector", postgresql_using="gin"),
+        Index(
+            "ix_items_name_trgm", "name",
+            postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     description: Mapped[str] = mapped_column(String, nullable=False)
     price: Mapped[float] = mapped_column(Numeric(10, 2), nullable=False)
-    photo: Mapped[str] = mapped_column(String, nullable=False)
+    # None, пока первое фото не обработано
+    photo: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    # Пути к уменьшенным копиям, см. uploads.services.MediaService
+    photo_variants: Mapped[Optional[dict]] = mapped_column(JSONB, nullable=True)
+    # BlurHash и #rrggbb, см. core.placeholders
+    photo_placeholder: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    photo_color: Mapped[Optional[str]] = mapped_column(String(7), nullable=True)
+    status: Mapped[str] = mapped_column(
+        String(16), nullable=False,
+        default=ItemStatus.READY.value, server_default=ItemStatus.READY.value,
+    )
+    # Код ошибки последней обработки фото (error.photo.*)
+    photo_error: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    # Когда фото поставлено в очередь, см. ItemService.fail_stale_photos
+    photo_queued_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
     type: Mapped[str] = mapped_column(String(255), nullable=False)
 
     shop_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR, Computed(_search_vector_expression(), persisted=True), deferred=True
+    )
 
     shop: Mapped["User"] = relationship(back_populates="items")
     favorite_items: Mapped[list["FavoriteItem"]] = relationship(back_populates="item")
+    cart: Mapped[list["Cart"]] = relationship(back_populates="item")
 
 
 from users.models import User
-from favorites.models import FavoriteItem
\ No newline at end of file
+from favorites.models import FavoriteItem
+from cart.models import Cart
\ No newline at end of file
@@ -1,88 +1,151 @@
-from core.repositories import BaseRepository
-from sqlalchemy import select, func
+from datetime import datetime, timezone
 
-from items.models import Item
+from core.repositories import BaseRepository, read_only
+from sqlalchemy import Float, or_, select, func, literal_column, update
+
+from items.models import SEARCH_CONFIGS, Item, ItemStatus
 from users.schemas import UserDTO
-from items.schemas import ItemDTO, CreateItem, UpdateItem
+from items.schemas import (
+    ItemDTO, ItemOrdering, ItemStatusDTO, SearchMode, CreateItem, UpdateItem
+)
+
+from fastapi import HTTPException
+from core.cache import ObjectCache
+from core.counting import CountStrategy, RowCounter
+from core.pagination import Keyset, paginate
+from core.search import substring_filter
+from uploads.services import MediaService
+
+
+ITEM_KEYSETS = {
+    ItemOrdering.ID_ASC: Keyset("id", Item.id),
+    ItemOrdering.ID_DESC: Keyset("-id", Item.id, descending=True),
+    ItemOrdering.PRICE_ASC: Keyset("price", Item.price, Item.id),
+    ItemOrdering.PRICE_DESC: Keyset("-price", Item.price, Item.id, descending=True),
+}
 
-from fastapi import HTTPException, UploadFile
-from PIL import Image
-import io
-import os
-from core.utils import generate_hashed_filename
+
+def _search_query(search: str, language: str):
+    # websearch_to_tsquery не падает на произвольном вводе (кавычки, "or", "-").
+    # simple-вариант ловит слова, которые стеммер языка не знает.
+    config = SEARCH_CONFIGS.get(language, "simple")
+    return func.websearch_to_tsquery(
+        literal_column(f"'{config}'::regconfig"), search
+    ).op("||")(
+        func.websearch_to_tsquery(literal_column("'simple'::regconfig"), search)
+    )
 
 
 class ItemRepository(BaseRepository):
+    def __init__(
+        self,
+        session_factory,
+        counter: RowCounter,
+        item_cache: ObjectCache,
+        media: MediaService,
+    ):
+        super().__init__(session_factory)
+        self.counter = counter
+        self.item_cache = item_cache
+        self.media = media
 
     async def get_my_items(
         self, current_user: UserDTO, 
         search: str | None = None, limit: int = 10, 
-        offset: int = 0
-    ) -> tuple[list[ItemDTO], int]:
+        offset: int = 0, cursor: str | None = None,
+        order: ItemOrdering = ItemOrdering.ID_ASC,
+        count_strategy: CountStrategy | None = CountStrategy.EXACT,
+        search_mode: SearchMode = SearchMode.SUBSTRING
+    ) -> tuple[list[ItemDTO], int | None, str | None]:
         async with self.get_session() as session:
             query = select(Item).filter(Item.shop_id == current_user.id)
             if search:
-                query = query.filter(Item.name.ilike(f"%{search}%"))
-            items = await session.execute(query.offset(offset).limit(limit))
+                query = query.filter(
+                    await substring_filter(session, Item.name, search, search_mode)
+                )
+            items, next_cursor = await paginate(
+                session, query, ITEM_KEYSETS[order], limit, offset, cursor
+            )
 
-            count = await session.execute(
-                select(
-                    func.count(Item.id)
-                ).filter(Item.shop_id == current_user.id)
+            count = await self.counter.count(
+                session, query, count_strategy, "items"
             )
-            items = items.scalars().all()
             return [
                 ItemDTO.model_validate(item) for item in items
-            ], count.scalar()
+            ], count, next_cursor
 
+    @read_only
     async def get_shop_items(
         self, shop_id: int,
         search: str | None = None, 
         limit: int = 10, 
-        offset: int = 0
-    ) -> tuple[list[ItemDTO], int]:
+        offset: int = 0,
+        cursor: str | None = None,
+        order: ItemOrdering = ItemOrdering.ID_ASC,
+        count_strategy: CountStrategy | None = CountStrategy.EXACT,
+        search_mode: SearchMode = SearchMode.SUBSTRING
+    ) -> tuple[list[ItemDTO], int | None, str | None]:
         async with self.get_session() as session:
-            query = select(Item).filter(Item.shop_id == shop_id)
-            if search:
-                query = query.filter(Item.name.ilike(f"%{search}%"))
-            items = await session.execute(query.offset(offset).limit(limit))
-            items = items.scalars().all()
-
-            count_query = select(
-                select(
-                    func.count(Item.id)
-                ).filter(Item.shop_id == shop_id)
+            # Новые товары появляются на витрине после обработки фото
+            query = select(Item).filter(
+                Item.shop_id == shop_id, Item.photo.is_not(None)
             )
             if search:
-                count_query = count_query.filter(Item.name.ilike(f"%{search}%"))
-            count = await session.execute(count_query)
+                query = query.filter(
+                    await substring_filter(session, Item.name, search, search_mode)
+                )
+            items, next_cursor = await paginate(
+                session, query, ITEM_KEYSETS[order], limit, offset, cursor
+            )
+
+            count = await self.counter.count(
+                session, query, count_strategy, "items"
+            )
             return [
                 ItemDTO.model_validate(item) for item in items
-            ], count.scalar()
+            ], count, next_cursor
 
+    @read_only
     async def get_catalog(
         self, 
         search: str | None = None,
         limit: int = 10,
-        offset: int = 0
-    ) -> tuple[list[ItemDTO], int]:
+        offset: int = 0,
+        cursor: str | None = None,
+        order: ItemOrdering = ItemOrdering.ID_ASC,
+        count_strategy: CountStrategy | None = CountStrategy.EXACT,
+        search_mode: SearchMode = SearchMode.SUBSTRING,
+        language: str = "en"
+    ) -> tuple[list[ItemDTO], int | None, str | None]:
         async with self.get_session() as session:
-            query = select(Item)
-            if search:
-                query = query.filter(Item.name.ilike(f"%{search}%"))
-            items = await session.execute(query.offset(offset).limit(limit))
-            items = items.scalars().all()
+            query = select(Item).filter(Item.photo.is_not(None))
+            if search and search_mode == SearchMode.FULLTEXT:
+                ts_query = _search_query(search, language)
+                query = query.filter(Item.search_vector.bool_op("@@")(ts_query))
+                # В полнотекстовом режиме выдача всегда по релевантности
+                rank = func.ts_rank(
+                    Item.search_vector, ts_query, type_=Float
+                ).label("rank")
+                items, next_cursor = await paginate(
+                    session, query.add_columns(rank),
+                    Keyset("rank", rank, Item.id, descending=True),
+                    limit, offset, cursor
+                )
+            else:
+                if search:
+                    query = query.filter(
+                        await substring_filter(session, Item.name, search, search_mode)
+                    )
+                items, next_cursor = await paginate(
+                    session, query, ITEM_KEYSETS[order], limit, offset, cursor
+                )
 
-            count_query = select(
-                func.count(Item.id)
+            count = await self.counter.count(
+                session, query, count_strategy, "items"
             )
-            if search:
-                count_query = count_query.filter(Item.name.ilike(f"%{search}%"))
-            count = await session.execute(count_query)
-            
             return [
                 ItemDTO.model_validate(item) for item in items
-            ], count.scalar()
+            ], count, next_cursor
         
     async def get_my_item(self, item_id: int, current_user: UserDTO) -> ItemDTO:
         async with self.get_session() as session:
@@ -97,73 +160,32 @@ class ItemRepository(BaseRepository):
             raise HTTPException(status_code=404, detail="error.item.not_found")
         
     async def get_item(self, item_id: int) -> ItemDTO | None:
+        return await self.item_cache.get_or_load(
+            item_id, lambda: self._load_item(item_id)
+        )
+
+    @read_only
+    async def _load_item(self, item_id: int) -> ItemDTO | None:
         async with self.get_session() as session:
-            item = await session.execute(
-                select(Item).filter(Item.id == item_id)
-            )
-            item = item.scalar()
-            if item:
+            item = await session.get(Item, item_id)
+            if item and item.photo is not None:
                 return ItemDTO.model_validate(item)
 
-    async def _upload_photo(self, user_id: int, photo: UploadFile) -> str:  
-        allowed_types = ["image/jpeg", "image/png", "image/heif"]
-        if photo.content_type not in allowed_types:
-            raise HTTPException(status_code=422, detail="error.photo.invalid_type")
-
-        max_size = 5 * 1024 * 1024
-        content = await photo.read()
-        file_size = len(content)
-
-        if file_size > max_size:
-            image = Image.open(io.BytesIO(content))
-
-            max_dimension = 2000
-            quality = 95
-
-            while file_size > max_size and (quality > 20 or max_dimension > 800):
-                if max(image.size) > max_dimension:
-                    ratio = min(max_dimension / max(image.size[0], image.size[1]), 1.0)
-                    new_size = tuple(int(dim * ratio) for dim in image.size)
-                    image = image.resize(new_size, Image.Resampling.LANCZOS)
-
-                output = io.BytesIO()
-                image.save(output, format="JPEG", quality=quality, optimize=True)
-                content = output.getvalue()
-                file_size = len(content)
-
-                if file_size > max_size:
-                    quality -= 5
-                    max_dimension = int(max_dimension * 0.9)
-
-                if file_size > max_size:
-                    image = Image.open(io.BytesIO(content))
-
-            if file_size > max_size:
-                raise HTTPException(status_code=422, detail="error.photo.too_large")
-
-        os.makedirs("media/items", exist_ok=True)
-
-        hashed_filename = generate_hashed_filename(photo.filename)
-        file_location = f"media/items/{user_id}_{hashed_filename}"
-        with open(file_location, "wb") as file:
-            file.write(content)
-        return file_location
-    
     async def create_item(
         self, 
         item: CreateItem, 
         current_user: UserDTO,
-        photo: UploadFile, 
     ) -> ItemDTO:
+        """Создаёт товар без фото; фото добавит finish_photo."""
         async with self.get_session() as session:
-            photo_path = await self._upload_photo(current_user.id, photo)
             item = Item(
                 name=item.name,
                 description=item.description,
                 price=item.price,
                 type=item.type,
                 shop_id=current_user.id,
-                photo=photo_path
+                status=ItemStatus.PROCESSING.value,
+                photo_queued_at=datetime.now(timezone.utc),
             )
             session.add(item)
             await session.commit()
@@ -176,37 +198,127 @@ class ItemRepository(BaseRepository):
         current_user: UserDTO
     ) -> ItemDTO:
         async with self.get_session() as session:
-            item = await session.execute(
+            db_item = await session.execute(
                 select(Item).filter(Item.id == item_id, Item.shop_id == current_user.id)
             )
-            item = item.scalar()
+            db_item = db_item.scalar()
+            if not db_item:
+                raise HTTPException(status_code=404, detail="error.item.not_found")
             for field, value in item.model_dump(exclude_none=True).items():
-                setattr(item, field, value)
+                setattr(db_item, field, value)
             await session.commit()
-            await session.refresh(item)
-            return ItemDTO.model_validate(item)
+            await session.refresh(db_item)
+            # Изменение name влияет на результаты поиска
+            self.counter.invalidate("items")
+            await self.item_cache.invalidate(item_id)
+            return ItemDTO.model_validate(db_item)
             
-    async def update_item_photo(
+    async def mark_photo_processing(
         self, 
         item_id: int, 
-        photo: UploadFile, 
         current_user: UserDTO
     ) -> ItemDTO:
+        """
+        Старое фото остаётся на витрине, пока новое не обработано.
+        Условный UPDATE: очередь у каждого воркера своя, а второе фото
+        того же товара не должно встать в обработку ни в одном из них.
+        """
         async with self.get_session() as session:
-            item = await session.execute(
-                select(Item).filter(Item.id == item_id, Item.shop_id == current_user.id)
+            item = await session.scalar(
+                update(Item)
+                .where(
+                    Item.id == item_id,
+                    Item.shop_id == current_user.id,
+                    Item.status != ItemStatus.PROCESSING.value,
+                )
+                .values(
+                    status=ItemStatus.PROCESSING.value,
+                    photo_error=None,
+                    photo_queued_at=datetime.now(timezone.utc),
+                )
+                .returning(Item)
             )
-            item = item.scalar()
-            current_photo = item.photo
+            if not item:
+                exists = await session.scalar(
+                    select(Item.id).filter(
+                        Item.id == item_id, Item.shop_id == current_user.id
+                    )
+                )
+                await session.rollback()
+                if not exists:
+                    raise HTTPException(status_code=404, detail="error.item.not_found")
+                raise HTTPException(status_code=409, detail="error.item.photo_processing")
+            await session.commit()
+            await self.item_cache.invalidate(item_id)
+            return ItemDTO.model_validate(item)
+
+    async def finish_photo(self, item_id: int, staged_path: str) -> None:
+        """Обрабатывает загруженное фото и публикует его у товара."""
+        # Обработка до транзакции: ни соединение, ни строка не заняты секунды
+        prepared = await self.media.prepare_staged(staged_path)
+        async with self.get_session() as session:
+            stored = await self.media.acquire(prepared, session)
+            item = await session.scalar(
+                select(Item).filter(Item.id == item_id).with_for_update()
+            )
+            if not item or item.status == ItemStatus.FAILED.value:
+                # Товар удалили или fail_stale_photos уже признал задачу
+                # пропавшей; файлы без ссылок уберёт сборщик
+                await session.rollback()
+                return
+            was_published = item.photo is not None
+            await self.media.release(item.photo, session)
+            item.photo, item.photo_variants = stored.path, stored.variants
+            item.photo_placeholder, item.photo_color = stored.placeholder, stored.color
+            item.status = ItemStatus.READY.value
+            item.photo_error = None
+            await session.commit()
+            if not was_published:
+                self.counter.invalidate("items")
+            await self.item_cache.invalidate(item_id)
 
-            if current_photo:
-                os.remove(current_photo)
+    async def mark_photo_failed(self, item_id: int, detail: str) -> None:
+        async with self.get_session() as session:
+            item = await session.get(Item, item_id)
+            if not item:
+                return
+            item.status = ItemStatus.FAILED.value
+            item.photo_error = detail
+            await session.commit()
+            await self.item_cache.invalidate(item_id)
 
-            photo_path = await self._upload_photo(current_user.id, photo)
-            item.photo = photo_path
+    async def fail_stale_photos(self, before: datetime, detail: str) -> list[int]:
+        async with self.get_session() as session:
+            result = await session.execute(
+                update(Item)
+                .where(
+                    Item.status == ItemStatus.PROCESSING.value,
+                    # NULL - строки, поставленные в обработку до появления колонки
+                    or_(Item.photo_queued_at < before, Item.photo_queued_at.is_(None)),
+                )
+                .values(status=ItemStatus.FAILED.value, photo_error=detail)
+                .returning(Item.id)
+            )
+            item_ids = list(result.scalars())
             await session.commit()
-            await session.refresh(item)
-            return ItemDTO.model_validate(item)
+        for item_id in item_ids:
+            await self.item_cache.invalidate(item_id)
+        return item_ids
+
+    async def get_item_status(
+        self, item_id: int, current_user: UserDTO
+    ) -> ItemStatusDTO | None:
+        async with self.get_session() as session:
+            row = await session.execute(
+                select(Item.id, Item.status, Item.photo_error).filter(
+                    Item.id == item_id, Item.shop_id == current_user.id
+                )
+            )
+            row = row.first()
+            if row:
+                return ItemStatusDTO(
+                    id=row.id, status=row.status, photo_error=row.photo_error
+                )
         
     async def delete_item(
         self, 
@@ -216,5 +328,10 @@ class ItemRepository(BaseRepository):
         async with self.get_session() as session:
             item = await session.execute(select(Item).filter(Item.id == item_id, Item.shop_id == current_user.id))
             item = item.scalar()
+            if not item:
+                raise HTTPException(status_code=404, detail="error.item.not_found")
+            await self.media.release(item.photo, session)
             await session.delete(item)
-            await session.commit()
\ No newline at end of file
+            await session.commit()
+            self.counter.invalidate("items")
+            await self.item_cache.invalidate(item_id)
\ No newline at end of file
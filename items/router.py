@@ -1,5 +1,5 @@
 from dependency_injector.wiring import Provide, inject
-from fastapi import APIRouter, Depends, File, Query, Request, UploadFile
+from fastapi import APIRouter, Depends, File, Form, Query, Request, Response, UploadFile
 
 from auth.depends import (
     get_current_user,
@@ -12,7 +12,10 @@ from auth.depends import (
 from users.schemas import UserDTO
 from items.services import ItemService
 from core.container import Container
+from core.utils import get_language_from_cookies
 from items.schemas import (
+    ItemOrdering,
+    SearchMode,
     CreateItem,
     UpdateItem,
     GetMyItemsResponseSchema,
@@ -21,7 +24,8 @@ from items.schemas import (
     UpdateItemResponseSchema,
     GetItemsResponseSchema,
     GetCatalogResponseSchema,
-    GetItemResponseSchema
+    GetItemResponseSchema,
+    GetItemStatusResponseSchema
 )
 
 
@@ -37,15 +41,21 @@ async def get_my_items(
     search: str | None = None,
     limit: int = 10,
     offset: int = 0,
+    cursor: str | None = None,
+    order: ItemOrdering = ItemOrdering.ID_ASC,
+    with_count: bool = True,
+    search_mode: SearchMode = SearchMode.SUBSTRING,
     current_user: UserDTO = Depends(get_current_verified_seller_with_iin_bin),
     item_service: ItemService = Depends(Provide[Container.item_service]),
 ) -> GetMyItemsResponseSchema:
     return await item_service.get_my_items(
-        current_user, search, limit, offset
+        current_user, search, limit, offset, cursor, order, with_count,
+        search_mode
     )
 
 
 @router.get("/self/{item_id}/")
+@inject
 async def get_my_item(
     item_id: int,
     current_user: UserDTO = Depends(get_current_verified_seller_with_iin_bin),
@@ -54,16 +64,45 @@ async def get_my_item(
     return await item_service.get_my_item(item_id, current_user)
 
 
-@router.post("/item/")
+@router.post("/item/", status_code=202)
+@inject
 async def create_item(
-    item: CreateItem,
+    name: str = Form(...),
+    description: str = Form(...),
+    price: float = Form(...),
+    type: str = Form(...),
+    photo: UploadFile = File(...),
     current_user: UserDTO = Depends(get_current_verified_seller_with_iin_bin),
     item_service: ItemService = Depends(Provide[Container.item_service]),
 ) -> CreateItemResponseSchema:
-    return await item_service.create_item(item, current_user)
+    # 202: товар создан в статусе processing, фото обрабатывается в фоне
+    item = CreateItem(name=name, description=description, price=price, type=type)
+    return await item_service.create_item(item, current_user, photo)
+
+
+@router.put("/self/{item_id}/photo/", status_code=202)
+@inject
+async def update_item_photo(
+    item_id: int,
+    photo: UploadFile = File(...),
+    current_user: UserDTO = Depends(get_current_verified_seller_with_iin_bin),
+    item_service: ItemService = Depends(Provide[Container.item_service]),
+) -> UpdateItemResponseSchema:
+    return await item_service.update_item_photo(item_id, photo, current_user)
+
+
+@router.get("/self/{item_id}/status/")
+@inject
+async def get_item_status(
+    item_id: int,
+    current_user: UserDTO = Depends(get_current_verified_seller_with_iin_bin),
+    item_service: ItemService = Depends(Provide[Container.item_service]),
+) -> GetItemStatusResponseSchema:
+    return await item_service.get_item_status(item_id, current_user)
 
 
 @router.patch("/self/{item_id}/")
+@inject
 async def update_item(
     item_id: int,
     item: UpdateItem,
@@ -74,6 +113,7 @@ async def update_item(
 
 
 @router.delete("/self/{item_id}/")
+@inject
 async def delete_item(
     item_id: int,
     current_user: UserDTO = Depends(get_current_verified_seller_with_iin_bin),
@@ -82,34 +122,54 @@ async def delete_item(
     await item_service.delete_item(item_id, current_user)
 
 
-@router.get("/{shop_id}/")
-async def get_shop_items(
-    shop_id: int,
+# Объявлен до /{shop_id}/, иначе "catalog" разбирался бы как shop_id
+@router.get("/catalog/", response_model=GetCatalogResponseSchema)
+@inject
+async def get_catalog(
     search: str | None = None,
     limit: int = 10,
     offset: int = 0,
-    current_user: UserDTO = Depends(get_current_verified_user),
+    cursor: str | None = None,
+    order: ItemOrdering = ItemOrdering.ID_ASC,
+    with_count: bool = True,
+    search_mode: SearchMode = SearchMode.SUBSTRING,
+    language: str = Depends(get_language_from_cookies),
     item_service: ItemService = Depends(Provide[Container.item_service]),
-) -> GetItemsResponseSchema:
-    return await item_service.get_shop_items(shop_id, search, limit, offset)
+    user: UserDTO = Depends(get_current_verified_user),
+) -> Response:
+    # Ответ уже сериализован и закэширован, повторная валидация не нужна
+    content = await item_service.get_catalog_json(
+        search, limit, offset, cursor, order, with_count,
+        search_mode, language
+    )
+    return Response(content=content, media_type="application/json")
 
 
-@router.get("/catalog/")
-async def get_catalog(
+@router.get("/{shop_id}/")
+@inject
+async def get_shop_items(
+    shop_id: int,
     search: str | None = None,
     limit: int = 10,
     offset: int = 0,
+    cursor: str | None = None,
+    order: ItemOrdering = ItemOrdering.ID_ASC,
+    with_count: bool = True,
+    search_mode: SearchMode = SearchMode.SUBSTRING,
+    current_user: UserDTO = Depends(get_current_verified_user),
     item_service: ItemService = Depends(Provide[Container.item_service]),
-    user: UserDTO = Depends(get_current_verified_user),
-) -> GetCatalogResponseSchema:
-    return await item_service.get_catalog(search, limit, offset)
+) -> GetItemsResponseSchema:
+    return await item_service.get_shop_items(
+        shop_id, search, limit, offset, cursor, order, with_count,
+        search_mode
+    )
 
 
-@router.get("/{item_id}/")
+@router.get("/item/{item_id}/")
+@inject
 async def get_item(
     item_id: int,
     current_user: UserDTO = Depends(get_current_verified_user),
     item_service: ItemService = Depends(Provide[Container.item_service]),
 ) -> GetItemResponseSchema:
     return await item_service.get_item(item_id)
-
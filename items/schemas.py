@@ -1,15 +1,36 @@
-from core.schemas import CountSchema, StatusOkSchema
+from enum import Enum
+from typing import Optional
+
+from core.schemas import (
+    CountSchema, CursorSchema, ImageVariantDTO, MediaUrl, StatusOkSchema
+)
+from core.search import SearchMode
 from pydantic import BaseModel, ConfigDict
 
 
+class ItemOrdering(str, Enum):
+    ID_ASC = "id"
+    ID_DESC = "-id"
+    PRICE_ASC = "price"
+    PRICE_DESC = "-price"
+
+
 class ItemDTO(BaseModel):
     id: int
     name: str
     description: str
     price: float
-    photo: str
+    # None, пока фото нового товара обрабатывается
+    photo: Optional[MediaUrl] = None
+    # thumb (320px), card (800px), full (2000px); None у старых товаров
+    photo_variants: Optional[dict[str, ImageVariantDTO]] = None
+    # BlurHash и основной цвет: клиент рисует их, пока грузится фото
+    photo_placeholder: Optional[str] = None
+    photo_color: Optional[str] = None
     type: str
     shop_id: int
+    status: str = "ready"
+    photo_error: Optional[str] = None
 
     model_config = ConfigDict(from_attributes=True)
     
@@ -29,7 +50,7 @@ class UpdateItem(BaseModel):
     type: str
     
 
-class GetMyItemsResponseSchema(StatusOkSchema, CountSchema):
+class GetMyItemsResponseSchema(StatusOkSchema, CountSchema, CursorSchema):
     data: list[ItemDTO]
 
 
@@ -47,13 +68,25 @@ class UpdateItemResponseSchema(StatusOkSchema):
     message: str = "success.item.updated"
 
 
-class GetItemsResponseSchema(StatusOkSchema, CountSchema):
+class GetItemsResponseSchema(StatusOkSchema, CountSchema, CursorSchema):
     data: list[ItemDTO]
 
 
-class GetCatalogResponseSchema(StatusOkSchema, CountSchema):
+class GetCatalogResponseSchema(StatusOkSchema, CountSchema, CursorSchema):
     data: list[ItemDTO]
 
 
 class GetItemResponseSchema(StatusOkSchema):
-    data: ItemDTO
\ No newline at end of file
+    data: ItemDTO
+
+
+class ItemStatusDTO(BaseModel):
+    id: int
+    status: str
+    photo_error: Optional[str] = None
+    # queued или running; None, если задачи нет в этом процессе
+    job: Optional[str] = None
+
+
+class GetItemStatusResponseSchema(StatusOkSchema):
+    data: ItemStatusDTO
\ No newline at end of file
@@ -1,48 +1,124 @@
+from datetime import datetime, timedelta, timezone
+
 from items.schemas import (
-    ItemDTO, CreateItem, UpdateItem, 
+    ItemDTO, ItemOrdering, SearchMode, CreateItem, UpdateItem, 
     GetMyItemsResponseSchema, GetMyItemResponseSchema, 
     CreateItemResponseSchema, UpdateItemResponseSchema,
     GetItemsResponseSchema, GetCatalogResponseSchema,
-    GetItemResponseSchema
+    GetItemResponseSchema, GetItemStatusResponseSchema
 )
 from items.repositories import ItemRepository
 from users.schemas import UserDTO
+from core.cache import ResponseCache
+from core.counting import count_strategy_for
+from core.environment import env
+from core.jobs import JobQueue
+from core.logger import get_logger
+from uploads.services import MediaService
 
 from fastapi import UploadFile, HTTPException
+
+logger = get_logger(__name__)
+
+
 class ItemService:
-    def __init__(self, item_repository: ItemRepository):
+    def __init__(
+        self,
+        item_repository: ItemRepository,
+        catalog_cache: ResponseCache,
+        media: MediaService,
+        jobs: JobQueue,
+    ):
         self.item_repository = item_repository
+        self.catalog_cache = catalog_cache
+        self.media = media
+        self.jobs = jobs
 
     async def get_my_items(
         self, 
         current_user: UserDTO, search: str | None = None, 
-        limit: int = 10, offset: int = 0
+        limit: int = 10, offset: int = 0,
+        cursor: str | None = None,
+        order: ItemOrdering = ItemOrdering.ID_ASC,
+        with_count: bool = True,
+        search_mode: SearchMode = SearchMode.SUBSTRING
     ) -> GetMyItemsResponseSchema:
-        items, count = await self.item_repository.get_my_items(
-            current_user, search, limit, offset
+        items, count, next_cursor = await self.item_repository.get_my_items(
+            current_user, search, limit, offset, cursor, order,
+            count_strategy_for(env.count_strategies, "my_items", with_count),
+            search_mode
+        )
+        return GetMyItemsResponseSchema(
+            data=items, count=count, next_cursor=next_cursor
         )
-        return GetMyItemsResponseSchema(data=items, count=count)
 
     async def get_shop_items(
         self, 
         shop_id: int, 
         search: str | None = None, 
         limit: int = 10, 
-        offset: int = 0
+        offset: int = 0,
+        cursor: str | None = None,
+        order: ItemOrdering = ItemOrdering.ID_ASC,
+        with_count: bool = True,
+        search_mode: SearchMode = SearchMode.SUBSTRING
     ) -> GetItemsResponseSchema:
-        items, count = await self.item_repository.get_shop_items(
-            shop_id, search, limit, offset
+        items, count, next_cursor = await self.item_repository.get_shop_items(
+            shop_id, search, limit, offset, cursor, order,
+            count_strategy_for(env.count_strategies, "shop_items", with_count),
+            search_mode
+        )
+        return GetItemsResponseSchema(
+            data=items, count=count, next_cursor=next_cursor
         )
-        return GetItemsResponseSchema(data=items, count=count)
     
     async def get_catalog(
         self, 
         search: str | None = None,
         limit: int = 10,
-        offset: int = 0
+        offset: int = 0,
+        cursor: str | None = None,
+        order: ItemOrdering = ItemOrdering.ID_ASC,
+        with_count: bool = True,
+        search_mode: SearchMode = SearchMode.SUBSTRING,
+        language: str = "en"
     ) -> GetCatalogResponseSchema:
-        items, count = await self.item_repository.get_catalog(search, limit, offset)
-        return GetCatalogResponseSchema(data=items, count=count)
+        items, count, next_cursor = await self.item_repository.get_catalog(
+            search, limit, offset, cursor, order,
+            count_strategy_for(env.count_strategies, "catalog", with_count),
+            search_mode, language
+        )
+        return GetCatalogResponseSchema(
+            data=items, count=count, next_cursor=next_cursor
+        )
+
+    async def get_catalog_json(
+        self,
+        search: str | None = None,
+        limit: int = 10,
+        offset: int = 0,
+        cursor: str | None = None,
+        order: ItemOrdering = ItemOrdering.ID_ASC,
+        with_count: bool = True,
+        search_mode: SearchMode = SearchMode.SUBSTRING,
+        language: str = "en"
+    ) -> bytes:
+        """Сериализованный ответ каталога из кэша или из базы."""
+        if not (search and search_mode == SearchMode.FULLTEXT):
+            # Язык влияет только на полнотекстовый поиск
+            language = None
+        key = (
+            search, limit, offset, cursor, order, with_count, search_mode, language
+        )
+
+        async def load() -> bytes:
+            response = await self.get_catalog(
+                search, limit, offset, cursor, order, with_count,
+                search_mode, language or "en"
+            )
+            return response.model_dump_json().encode()
+
+        return await self.catalog_cache.get_or_load(key, load)
 
     async def get_my_item(
         self, 
@@ -69,7 +145,18 @@ class ItemService:
         current_user: UserDTO,
         photo: UploadFile
     ) -> CreateItemResponseSchema:
-        item = await self.item_repository.create_item(item, current_user, photo)
+        # Проверка загрузки синхронная: ошибки формата и размера клиент
+        # получает сразу, в фон уходит только перекодирование. Место
+        # в очереди занято заранее: товар не останется в processing без задачи
+        with self.jobs.reserve():
+            staged_path = await self.media.stage_upload(photo)
+            try:
+                item = await self.item_repository.create_item(item, current_user)
+                self._submit_photo(item.id, staged_path)
+            except BaseException:
+                await self.media.discard_staged(staged_path)
+                raise
+        # Товар без фото не попадает в каталог, кэш сбросит задача
         return CreateItemResponseSchema(data=item)
     
     async def update_item(
@@ -79,6 +166,7 @@ class ItemService:
         current_user: UserDTO
     ) -> UpdateItemResponseSchema:
         item = await self.item_repository.update_item(item_id, item, current_user)
+        await self.catalog_cache.invalidate()
         return UpdateItemResponseSchema(data=item)
     
     async def update_item_photo(
@@ -87,12 +175,69 @@ class ItemService:
         photo: UploadFile, 
         current_user: UserDTO
     ) -> UpdateItemResponseSchema:
-        item = await self.item_repository.update_item_photo(item_id, photo, current_user)
+        # Повторная загрузка во время обработки - 409 из mark_photo_processing
+        with self.jobs.reserve():
+            staged_path = await self.media.stage_upload(photo)
+            try:
+                item = await self.item_repository.mark_photo_processing(
+                    item_id, current_user
+                )
+                self._submit_photo(item.id, staged_path)
+            except BaseException:
+                await self.media.discard_staged(staged_path)
+                raise
         return UpdateItemResponseSchema(data=item)
 
+    async def get_item_status(
+        self,
+        item_id: int,
+        current_user: UserDTO
+    ) -> GetItemStatusResponseSchema:
+        status = await self.item_repository.get_item_status(item_id, current_user)
+        if not status:
+            raise HTTPException(status_code=404, detail="error.item.not_found")
+        status.job = self.jobs.state(("item_photo", item_id))
+        return GetItemStatusResponseSchema(data=status)
+
+    def _submit_photo(self, item_id: int, staged_path: str) -> None:
+        self.jobs.submit(
+            ("item_photo", item_id), self._process_photo, item_id, staged_path
+        )
+
+    async def _process_photo(self, item_id: int, staged_path: str) -> None:
+        try:
+            await self.item_repository.finish_photo(item_id, staged_path)
+        except HTTPException as exc:
+            # Ошибки обработки (битый файл, таймаут пула) видны в статусе товара
+            logger.warning("Photo for item %s failed: %s", item_id, exc.detail)
+            await self.item_repository.mark_photo_failed(item_id, exc.detail)
+        except Exception:
+            await self.item_repository.mark_photo_failed(
+                item_id, "error.photo.processing_failed"
+            )
+            raise
+        finally:
+            await self.catalog_cache.invalidate()
+
+    async def fail_stale_photos(self) -> int:
+        """
+        Фото в processing дольше jobs_stale_after: задача пропала вместе
+        с воркером (очередь и временные файлы живут в его памяти и на диске).
+        """
+        max_age = timedelta(seconds=env.jobs_stale_after)
+        items = await self.item_repository.fail_stale_photos(
+            datetime.now(timezone.utc) - max_age, "error.photo.processing_interrupted"
+        )
+        await self.media.discard_stale_staged(max_age.total_seconds())
+        if items:
+            logger.warning("Photo processing interrupted for items %s", items)
+            await self.catalog_cache.invalidate()
+        return len(items)
+
     async def delete_item(
         self, 
         item_id: int, 
         current_user: UserDTO
     ):
-        await self.item_repository.delete_item(item_id, current_user)
\ No newline at end of file
+        await self.item_repository.delete_item(item_id, current_user)
+        await self.catalog_cache.invalidate()
\ No newline at end of file
@@ -1,3 +1,6 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 import firebase_admin
 from fastapi import FastAPI
 from fastapi.exceptions import HTTPException, RequestValidationError
@@ -10,18 +13,70 @@ from accounts.router import router as account_router
 from auth.router import router as auth_router
 from core.container import Container
 from core.environment import env
+from core.logger import get_logger, setup_logging, stop_logging
+from core.middleware import BodySizeLimitMiddleware, RequestSessionMiddleware
+from core.router import router as health_router
 from users.router import router as user_router
 from favorites.router import router as favorite_router
 from items.router import router as item_router
 from orders.router import router as order_router
+from uploads.router import router as media_router
+
+setup_logging(
+    level=env.log_level,
+    levels=env.log_levels,
+    json_output=env.log_json,
+    sample_rates=env.log_sample_rates,
+)
+
+container = Container()
+container.init_resources()
+container.wire(modules=[__name__])
+
+logger = get_logger(__name__)
+
 
-app = FastAPI()
+async def fail_stale_photos() -> None:
+    while True:
+        try:
+            await container.item_service().fail_stale_photos()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Stale photo check failed")
+        await asyncio.sleep(env.jobs_stale_after)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    db = container.db()
+    db.start_replica_monitor()
+    await container.catalog_cache().listen()
+    container.job_queue().start()
+    container.media_collector().start()
+    stale_photos = asyncio.create_task(fail_stale_photos())
+    yield
+    stale_photos.cancel()
+    await asyncio.gather(stale_photos, return_exceptions=True)
+    await container.media_collector().stop()
+    await container.job_queue().stop()
+    await container.cache_backend().close()
+    await container.media_storage().close()
+    await db.dispose()
+    container.password_hasher().shutdown()
+    container.image_processor().shutdown()
+    stop_logging()
+
+
+app = FastAPI(lifespan=lifespan)
 app.include_router(auth_router)
 app.include_router(user_router)
 app.include_router(account_router)
 app.include_router(favorite_router)
 app.include_router(item_router)
 app.include_router(order_router)
+app.include_router(health_router)
+app.include_router(media_router)
 
 app.add_middleware(
     CORSMiddleware,
@@ -31,10 +86,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(
+    RequestSessionMiddleware,
+    unit_of_work_factory=container.unit_of_work_factory(),
+)
 
-container = Container()
-container.init_resources()
-container.wire(modules=[__name__])
+# Добавлен последним, значит внешний: лишнее тело отсекается до сессии и разбора
+app.add_middleware(BodySizeLimitMiddleware, max_body_size=env.request_max_bytes)
 
 
 @app.exception_handler(RequestValidationError)
@@ -7,6 +7,9 @@ from core.database import BaseModel
 
 class Order(BaseModel):
     __tablename__ = "orders"
+    __table_args__ = (
+        Index("ix_orders_user_id", "user_id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
@@ -39,6 +42,7 @@ class OrderItem(BaseModel):
 
     __table_args__ = (
         Index("idx_order_item", "order_id", "item_id", unique=True),
+        Index("ix_order_items_item_id", "item_id"),
     )
     
 
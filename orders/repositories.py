@@ -10,39 +10,38 @@ class OrderRepository(BaseRepository):
     
     async def create_order(self, user_id: int) -> int:
         async with self.get_session() as session:
-            async with session.begin():
-                cart_items = await session.execute(
-                    select(Cart).options(
-                        selectinload(Cart.item)
-                    ).where(Cart.user_id == user_id)
-                )
-                cart_items = cart_items.scalars().all()
+            cart_items = await session.execute(
+                select(Cart).options(
+                    selectinload(Cart.item)
+                ).where(Cart.user_id == user_id)
+            )
+            cart_items = cart_items.scalars().all()
 
-                order = Order(
-                    user_id=user_id,
-                    status="pending",
-                    total_price=sum(
-                        cart_item.quantity * cart_item.item.price
-                        for cart_item in cart_items
-                    ),
-                )
-                await session.add(order)
-                await session.flush()
-                order_items = [
-                    OrderItem(
-                        order_id=order.id,
-                        item_id=cart_item.item_id,
-                        quantity=cart_item.quantity,
-                        price_at_time=cart_item.item.price
-                    )
+            order = Order(
+                user_id=user_id,
+                status="pending",
+                total_price=sum(
+                    cart_item.quantity * cart_item.item.price
                     for cart_item in cart_items
-                ]
-                for order_item in order_items:
-                    await session.add(order_item)
+                ),
+            )
+            session.add(order)
+            await session.flush()
+            order_items = [
+                OrderItem(
+                    order_id=order.id,
+                    item_id=cart_item.item_id,
+                    quantity=cart_item.quantity,
+                    price_at_time=cart_item.item.price
+                )
+                for cart_item in cart_items
+            ]
+            for order_item in order_items:
+                session.add(order_item)
 
-                await session.commit()
-                await session.refresh(order)
-                return order.id
+            await session.commit()
+            await session.refresh(order)
+            return order.id
 
     async def get_order_with_items(self, order_id: int) -> OrderDTO | None:
         async with self.get_session() as session:
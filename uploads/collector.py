@@ -0,0 +1,193 @@
+import asyncio
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Sequence
+
+from core.logger import get_logger
+from uploads.repositories import MediaRepository
+from uploads.storage import (
+    LEGACY_MEDIA_DIRS,
+    MediaStorage,
+    StoredObject,
+    content_digest,
+)
+
+logger = get_logger(__name__)
+
+
+class _CollectorBusy(Exception):
+    """Пачку уже обрабатывает сборщик в другом процессе."""
+
+
+@dataclass
+class CollectReport:
+    dry_run: bool = False
+    scanned: int = 0
+    released_files: int = 0
+    orphan_files: int = 0
+    reclaimed_bytes: int = 0
+    # Другой воркер уже собирает мусор
+    skipped: bool = False
+
+
+class MediaCollector:
+    """
+    Удаление файлов, на которые больше ничего не ссылается.
+
+    Два прохода:
+    - записи media_files с refcount = 0, освобождённые раньше grace_period:
+      файлы удаляются под блокировкой строки, поэтому параллельная загрузка
+      того же фото либо ждёт и записывает файлы заново, либо успевает
+      взять ссылку, и строка пропускается;
+    - обход хранилища пачками по batch_size: файлы без записи в media_files
+      и без ссылок из items/users (старые пути до хранилища). Файлы моложе
+      grace_period не трогаются: их могут прямо сейчас загружать.
+
+    Каждая пачка - отдельная транзакция под pg_try_advisory_xact_lock:
+    соединение не висит idle in transaction весь проход. Если блокировку
+    держит другой процесс, проход останавливается (skipped).
+
+    Обходятся только каталоги хранилища ({media_root}/ab/) и legacy_dirs:
+    в media_root лежит и статика из репозитория (opengraph), её не трогаем.
+    """
+
+    def __init__(
+        self,
+        repo: MediaRepository,
+        storage: MediaStorage,
+        media_root: str = "media",
+        grace_period: float = 3600.0,
+        batch_size: int = 500,
+        interval: float = 0.0,
+        legacy_dirs: Sequence[str] = LEGACY_MEDIA_DIRS,
+    ):
+        self.repo = repo
+        self.storage = storage
+        self.media_root = media_root
+        self.grace_period = grace_period
+        self.batch_size = batch_size
+        self.interval = interval
+        self.legacy_dirs = tuple(legacy_dirs)
+        self._task: Optional[asyncio.Task] = None
+
+    async def collect(self, dry_run: bool = False) -> CollectReport:
+        report = CollectReport(dry_run=dry_run)
+        before = datetime.now(timezone.utc) - timedelta(seconds=self.grace_period)
+        try:
+            await self._collect_released(report, before)
+            await self._collect_orphans(report, before)
+        except _CollectorBusy:
+            report.skipped = True
+        logger.info("Media collected: %s", asdict(report))
+        return report
+
+    async def _lock(self, session) -> None:
+        if not await self.repo.try_lock_collector(session):
+            raise _CollectorBusy()
+
+    async def _collect_released(self, report: CollectReport, before: datetime) -> None:
+        after = ""
+        while True:
+            async with self.repo.get_session() as session:
+                await self._lock(session)
+                rows = await self.repo.lock_released(
+                    before, after, self.batch_size, session
+                )
+                if not rows:
+                    return
+                after = rows[-1].digest
+                for row in rows:
+                    keys = [row.path]
+                    for variant in (row.variants or {}).values():
+                        keys += [variant.get("webp"), variant.get("avif")]
+                    keys = [key for key in keys if key]
+                    if not report.dry_run:
+                        # Основной файл первым: без него загрузка запишет всё заново
+                        for key in keys:
+                            await self.storage.delete(key)
+                    report.released_files += len(keys)
+                    report.reclaimed_bytes += row.size
+                if report.dry_run:
+                    await session.rollback()
+                else:
+                    await self.repo.delete_released([row.digest for row in rows], session)
+                    await session.commit()
+
+    def _orphan_prefixes(self) -> list[str]:
+        prefixes = [f"{self.media_root}/{index:02x}/" for index in range(256)]
+        prefixes += [f"{self.media_root}/{directory}/" for directory in self.legacy_dirs]
+        return prefixes
+
+    async def _collect_orphans(self, report: CollectReport, before: datetime) -> None:
+        batch: list[StoredObject] = []
+        for prefix in self._orphan_prefixes():
+            async for obj in self.storage.iter_objects(prefix):
+                report.scanned += 1
+                if obj.modified >= before:
+                    continue
+                batch.append(obj)
+                if len(batch) >= self.batch_size:
+                    await self._collect_batch(report, batch)
+                    batch = []
+        if batch:
+            await self._collect_batch(report, batch)
+
+    async def _collect_batch(self, report: CollectReport, batch: list[StoredObject]) -> None:
+        by_digest: dict[str, list[StoredObject]] = {}
+        legacy: list[StoredObject] = []
+        for obj in batch:
+            digest = content_digest(obj.key)
+            if digest:
+                by_digest.setdefault(digest, []).append(obj)
+            else:
+                legacy.append(obj)
+
+        async with self.repo.get_session() as session:
+            await self._lock(session)
+            orphans = []
+            if legacy:
+                referenced = await self.repo.referenced_legacy_paths(
+                    [obj.key for obj in legacy], session
+                )
+                orphans += [obj for obj in legacy if obj.key not in referenced]
+
+            if by_digest:
+                known = await self.repo.known_digests(list(by_digest), session)
+                for digest, objects in by_digest.items():
+                    if digest in known:
+                        continue
+                    # Под блокировкой acquire не добавит запись, пока файлы
+                    # удаляются; занятый digest подождёт следующего прохода
+                    if not await self.repo.try_lock_digest(digest, session):
+                        continue
+                    if await self.repo.known_digests([digest], session):
+                        continue
+                    orphans += objects
+
+            for obj in orphans:
+                if not report.dry_run:
+                    await self.storage.delete(obj.key)
+                report.orphan_files += 1
+                report.reclaimed_bytes += obj.size
+            # Снимает блокировки digest и сборщика
+            await session.commit()
+
+    def start(self) -> None:
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run_periodically())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.collect()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Media collection failed")
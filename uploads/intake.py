@@ -0,0 +1,101 @@
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, BinaryIO, Optional
+
+from fastapi import HTTPException, UploadFile
+
+from core.logger import get_logger
+
+logger = get_logger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# Бренды ftyp контейнера HEIF (фото с iPhone и большинства Android)
+HEIF_BRANDS = {b"heic", b"heix", b"hevc", b"hevx", b"heim", b"heis", b"mif1", b"msf1"}
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Тип по сигнатуре первых байтов; Content-Type от клиента не используется."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:8] == b"ftyp" and head[8:12] in HEIF_BRANDS:
+        return "image/heif"
+    return None
+
+
+def _read_dimensions(file: BinaryIO) -> tuple[int, int]:
+    # Image.open читает только заголовок; пиксели не декодируются
+    from PIL import Image, UnidentifiedImageError
+    from pillow_heif import register_heif_opener
+
+    register_heif_opener()
+    file.seek(0)
+    try:
+        with Image.open(file) as image:
+            return image.size
+    except Image.DecompressionBombError as exc:
+        # Pillow отказывает сам, если пикселей в разы больше MAX_IMAGE_PIXELS
+        raise HTTPException(status_code=422, detail="error.photo.too_many_pixels") from exc
+    except (UnidentifiedImageError, OSError) as exc:
+        raise HTTPException(status_code=422, detail="error.photo.invalid") from exc
+    finally:
+        file.seek(0)
+
+
+@dataclass
+class IntakeFile:
+    file: BinaryIO
+    size: int
+    content_type: str
+    width: int
+    height: int
+
+    def read(self) -> bytes:
+        self.file.seek(0)
+        return self.file.read()
+
+
+@asynccontextmanager
+async def receive_image(
+    upload: UploadFile, max_bytes: int, max_pixels: int, file: BinaryIO
+) -> AsyncIterator[IntakeFile]:
+    """
+    Проверяет загрузку и копирует её кусками в file (файл или буфер вызывающего).
+
+    Тело запроса Starlette к этому моменту уже принял и разобрал целиком:
+    слишком большие запросы отсекают раньше nginx и BodySizeLimitMiddleware.
+    Здесь проверяется содержимое: заявленный размер, сигнатура по первому
+    куску, фактический размер и число пикселей по заголовку, до декодирования.
+    """
+    if upload.size is not None and upload.size > max_bytes:
+        raise HTTPException(status_code=422, detail="error.photo.too_large")
+
+    content_type = None
+    size = 0
+    while chunk := await upload.read(CHUNK_SIZE):
+        if content_type is None:
+            content_type = sniff_image_type(chunk)
+            if content_type is None:
+                logger.warning(
+                    "Rejected upload with unknown signature (declared %s)",
+                    upload.content_type,
+                )
+                raise HTTPException(status_code=422, detail="error.photo.invalid_type")
+        size += len(chunk)
+        if size > max_bytes:
+            raise HTTPException(status_code=422, detail="error.photo.too_large")
+        file.write(chunk)
+    if content_type is None:
+        raise HTTPException(status_code=422, detail="error.photo.invalid_type")
+    file.flush()
+
+    # Для файла на диске чтение заголовка - файловый ввод-вывод
+    width, height = await asyncio.to_thread(_read_dimensions, file)
+    if width * height > max_pixels:
+        raise HTTPException(status_code=422, detail="error.photo.too_many_pixels")
+    yield IntakeFile(file, size, content_type, width, height)
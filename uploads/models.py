@@ -0,0 +1,41 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import BigInteger, DateTime, Index, Integer, String, func, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from core.database import BaseModel
+
+
+class MediaFile(BaseModel):
+    """
+    Загруженный файл, адресуемый хэшем содержимого.
+
+    digest - sha256 обработанного основного файла; варианты лежат рядом
+    под тем же именем. refcount - число строк (товаров, аватаров), которые
+    ссылаются на path. Файлы с refcount = 0 удаляет uploads.collector
+    спустя media_gc_grace_period: их может в этот момент загружать кто-то ещё.
+    """
+
+    __tablename__ = "media_files"
+    __table_args__ = (
+        # Освобождённые записи для uploads.collector; обычно их единицы
+        Index(
+            "ix_media_files_released", "digest",
+            postgresql_where=text("refcount = 0"),
+        ),
+    )
+
+    digest: Mapped[str] = mapped_column(String(64), primary_key=True)
+    path: Mapped[str] = mapped_column(String(255), unique=True, nullable=False)
+    variants: Mapped[Optional[dict]] = mapped_column(JSONB, nullable=True)
+    # Байты основного файла и всех вариантов
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    refcount: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=func.now()
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=func.now(), onupdate=func.now()
+    )
@@ -0,0 +1,125 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import String, bindparam, delete, func, select, text, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.repositories import BaseRepository
+from uploads.models import MediaFile
+
+
+# Ссылки на файлы, загруженные до хранилища: основной путь и пути вариантов
+LEGACY_REFERENCES = text("""
+    SELECT photo FROM items WHERE photo = ANY(:paths)
+    UNION SELECT avatar FROM users WHERE avatar = ANY(:paths)
+    UNION SELECT v.value FROM items, jsonb_each(items.photo_variants) AS e,
+        jsonb_each_text(e.value) AS v WHERE v.value = ANY(:paths)
+    UNION SELECT v.value FROM users, jsonb_each(users.avatar_variants) AS e,
+        jsonb_each_text(e.value) AS v WHERE v.value = ANY(:paths)
+""").bindparams(bindparam("paths", type_=ARRAY(String)))
+
+# Сессионная блокировка: сборщик работает в одном воркере за раз
+COLLECTOR_LOCK = 0x6D65646961  # "media"
+
+
+def _digest_lock(digest: str) -> int:
+    # 60 бит хэша помещаются в bigint pg_advisory_xact_lock
+    return int(digest[:15], 16)
+
+
+class MediaRepository(BaseRepository):
+    """
+    Счётчики ссылок на файлы.
+
+    Методы не коммитят: счётчик меняется в той же транзакции, что и строка,
+    которая ссылается на файл, поэтому сессию передаёт вызывающий.
+    """
+
+    async def acquire(
+        self,
+        digest: str,
+        path: str,
+        variants: dict,
+        size: int,
+        session: Optional[AsyncSession] = None,
+    ) -> bool:
+        """Добавляет ссылку; True, если файл с таким содержимым уже был."""
+        async with self.get_session(session) as session:
+            # Та же блокировка у сборщика: он не удалит файлы, на которые
+            # эта транзакция вот-вот сошлётся (до commit)
+            await session.execute(select(func.pg_advisory_xact_lock(_digest_lock(digest))))
+            refcount = await session.scalar(
+                insert(MediaFile)
+                .values(digest=digest, path=path, variants=variants, size=size, refcount=1)
+                .on_conflict_do_update(
+                    index_elements=[MediaFile.digest],
+                    set_={"refcount": MediaFile.refcount + 1, "updated_at": func.now()},
+                )
+                .returning(MediaFile.refcount)
+            )
+            return refcount > 1
+
+    async def release(self, path: str, session: Optional[AsyncSession] = None) -> bool:
+        """Снимает ссылку; False, если path не из хранилища (старые файлы)."""
+        async with self.get_session(session) as session:
+            digest = await session.scalar(
+                update(MediaFile)
+                .where(MediaFile.path == path)
+                .values(refcount=func.greatest(MediaFile.refcount - 1, 0))
+                .returning(MediaFile.digest)
+            )
+            return digest is not None
+
+    async def lock_released(
+        self, before: datetime, after: str, limit: int, session: AsyncSession
+    ) -> list[MediaFile]:
+        """Записи без ссылок старше before; занятые загрузкой пропускаются."""
+        result = await session.scalars(
+            select(MediaFile)
+            .where(
+                MediaFile.refcount == 0,
+                MediaFile.updated_at < before,
+                MediaFile.digest > after,
+            )
+            .order_by(MediaFile.digest)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        return list(result)
+
+    async def delete_released(self, digests: list[str], session: AsyncSession) -> None:
+        await session.execute(
+            delete(MediaFile).where(
+                MediaFile.digest.in_(digests), MediaFile.refcount == 0
+            )
+        )
+
+    async def known_digests(self, digests: list[str], session: AsyncSession) -> set[str]:
+        result = await session.scalars(
+            select(MediaFile.digest).where(MediaFile.digest.in_(digests))
+        )
+        return set(result)
+
+    async def try_lock_digest(self, digest: str, session: AsyncSession) -> bool:
+        """Блокировка до конца транзакции; False, если digest сейчас загружают."""
+        return await session.scalar(
+            select(func.pg_try_advisory_xact_lock(_digest_lock(digest)))
+        )
+
+    async def referenced_legacy_paths(
+        self, paths: list[str], session: AsyncSession
+    ) -> set[str]:
+        result = await session.scalars(LEGACY_REFERENCES, {"paths": paths})
+        return set(result)
+
+    async def try_lock_collector(self, session: AsyncSession) -> bool:
+        """
+        Блокировка сборщика до конца транзакции (одной пачки).
+
+        Не сессионная: с pgbouncer в transaction mode сессионная блокировка
+        остаётся на серверном соединении, которое уже отдано другому клиенту.
+        """
+        return await session.scalar(
+            select(func.pg_try_advisory_xact_lock(COLLECTOR_LOCK))
+        )
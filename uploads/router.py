@@ -0,0 +1,81 @@
+import asyncio
+import os
+import stat as stat_module
+
+from dependency_injector.wiring import Provide, inject
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+
+from core.container import Container
+from core.environment import env
+from uploads.storage import (
+    IMMUTABLE_CACHE_CONTROL,
+    MediaStorage,
+    content_digest,
+    content_type_for,
+    media_key,
+)
+
+# Запасной путь для развёртываний без nginx; с nginx (или S3 и CDN) запросы
+# к media_root сюда не доходят
+router = APIRouter(
+    prefix=f"/{env.media_root}",
+    tags=["media"],
+    include_in_schema=False,
+)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # W/"x" и "x" для GET сравниваются слабо (RFC 9110, 13.1.2)
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
+
+@router.api_route("/{path:path}", methods=["GET", "HEAD"])
+@inject
+async def get_media_file(
+    path: str,
+    request: Request,
+    storage: MediaStorage = Depends(Provide[Container.media_storage]),
+) -> Response:
+    # Только файлы хранилища и старые каталоги фото, без ".." и т.п.
+    key = media_key(env.media_root, path)
+    file_path = None
+    if key is not None:
+        try:
+            file_path = storage.local_path(key)
+        except ValueError:
+            pass
+    stat = None
+    if file_path is not None:
+        try:
+            stat = await asyncio.to_thread(os.stat, file_path)
+        except (FileNotFoundError, NotADirectoryError):
+            pass
+    if stat is None or not stat_module.S_ISREG(stat.st_mode):
+        raise HTTPException(status_code=404, detail="error.media.not_found")
+
+    digest = content_digest(key)
+    if digest:
+        # Содержимое по этому URL не меняется: браузер не перепроверяет его
+        etag = f'"{digest}"'
+        cache_control = IMMUTABLE_CACHE_CONTROL
+    else:
+        # Старые файлы без хэша в имени: кэш с перепроверкой по ETag
+        etag = f'"{int(stat.st_mtime)}-{stat.st_size}"'
+        cache_control = "public, no-cache"
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    # FileResponse сам обрабатывает Range/If-Range и отдаёт файл через
+    # расширение pathsend (sendfile), если ASGI-сервер его поддерживает
+    return FileResponse(
+        file_path,
+        stat_result=stat,
+        media_type=content_type_for(key),
+        headers=headers,
+        method=request.method,
+    )
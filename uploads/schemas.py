@@ -0,0 +1,13 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class StoredImageDTO(BaseModel):
+    # Значения для полей photo/avatar и photo_variants/avatar_variants
+    path: str
+    variants: dict[str, dict]
+    digest: str
+    deduplicated: bool = False
+    placeholder: Optional[str] = None
+    color: Optional[str] = None
@@ -0,0 +1,209 @@
+import asyncio
+import io
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.images import ImageProcessor
+from uploads.intake import receive_image
+from uploads.repositories import MediaRepository
+from uploads.schemas import StoredImageDTO
+from uploads.storage import MediaStorage
+
+MAX_PHOTO_SIZE = 5 * 1024 * 1024
+
+
+# Временные файлы загрузок живут на локальном диске воркера: фоновая задача
+# выполняется в том же процессе, что принял запрос
+def _staging_file():
+    return tempfile.NamedTemporaryFile(prefix="upload-", delete=False)
+
+
+def _remove_stale_staged(max_age: float) -> int:
+    # Загрузки, задачи которых пропали вместе с воркером
+    directory = tempfile.gettempdir()
+    before = time.time() - max_age
+    removed = 0
+    with os.scandir(directory) as iterator:
+        for entry in iterator:
+            try:
+                if (
+                    entry.name.startswith("upload-")
+                    and entry.is_file(follow_symlinks=False)
+                    and entry.stat(follow_symlinks=False).st_mtime < before
+                ):
+                    os.remove(entry.path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+    return removed
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as file:
+        return file.read()
+
+
+def _remove_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+@dataclass
+class PreparedImage:
+    """Обработанное фото с записанными файлами, ещё без ссылки в media_files."""
+    image: StoredImageDTO
+    files: list[tuple[str, bytes]]
+    written: bool
+
+
+class MediaService:
+    """
+    Хранилище загруженных изображений, адресуемое содержимым.
+
+    Файл лежит в storage по ключу {media_root}/{digest[:2]}/{digest}.{ext},
+    где digest - sha256 обработанных байтов, поэтому одинаковые фото хранятся
+    один раз, а содержимое по одному ключу никогда не меняется.
+    """
+
+    def __init__(
+        self,
+        repo: MediaRepository,
+        image_processor: ImageProcessor,
+        storage: MediaStorage,
+        media_root: str = "media",
+        max_upload_bytes: int = 20 * 1024 * 1024,
+        max_upload_pixels: int = 50_000_000,
+    ):
+        self.repo = repo
+        self.image_processor = image_processor
+        self.storage = storage
+        self.media_root = media_root
+        self.max_upload_bytes = max_upload_bytes
+        self.max_upload_pixels = max_upload_pixels
+
+    def _path(self, digest: str, suffix: str) -> str:
+        return f"{self.media_root}/{digest[:2]}/{digest}{suffix}"
+
+    async def prepare_upload(self, photo: UploadFile) -> PreparedImage:
+        """
+        Обрабатывает фото и записывает файлы в хранилище.
+
+        Базы не касается: вызывать до открытия транзакции, чтобы соединение
+        не ждало Pillow. Ссылку на файлы добавляет acquire.
+        """
+        # Фото всё равно целиком нужно пулу обработки: копим сразу в памяти,
+        # не больше max_upload_bytes
+        buffer = io.BytesIO()
+        async with receive_image(
+            photo, self.max_upload_bytes, self.max_upload_pixels, buffer
+        ):
+            pass
+        return await self._prepare(buffer.getvalue())
+
+    async def stage_upload(self, photo: UploadFile) -> str:
+        """
+        Проверяет загрузку и сохраняет её как есть во временный файл.
+
+        Обработку потом делает prepare_staged в фоне; файл удаляет он же.
+        """
+        # Загрузка пишется сразу во временный файл задачи, без промежуточной копии
+        staged = await asyncio.to_thread(_staging_file)
+        try:
+            with staged:
+                async with receive_image(
+                    photo, self.max_upload_bytes, self.max_upload_pixels, staged
+                ):
+                    pass
+        except BaseException:
+            await self.discard_staged(staged.name)
+            raise
+        return staged.name
+
+    async def prepare_staged(self, staged_path: str) -> PreparedImage:
+        """То же, что prepare_upload, для файла из stage_upload; файл удаляется."""
+        try:
+            content = await asyncio.to_thread(_read_file, staged_path)
+            return await self._prepare(content)
+        finally:
+            await self.discard_staged(staged_path)
+
+    async def discard_staged(self, staged_path: str) -> None:
+        await asyncio.to_thread(_remove_file, staged_path)
+
+    async def discard_stale_staged(self, max_age: float) -> int:
+        return await asyncio.to_thread(_remove_stale_staged, max_age)
+
+    async def _prepare(self, content: bytes) -> PreparedImage:
+        processed = await self.image_processor.process(content, MAX_PHOTO_SIZE)
+        digest = processed.digest
+        path = self._path(digest, f".{processed.extension}")
+        variants = {}
+        files = []
+        for name, variant in processed.variants.items():
+            variants[name] = {"width": variant["width"], "height": variant["height"]}
+            for format in ("webp", "avif"):
+                variant_path = None
+                if variant.get(format) is not None:
+                    variant_path = self._path(digest, f"_{name}.{format}")
+                    files.append((variant_path, variant[format]))
+                variants[name][format] = variant_path
+        # Основной файл последним: если он есть, то есть и все варианты
+        files.append((path, processed.content))
+
+        written = False
+        if not await self.storage.exists(path):
+            await self._save_files(files)
+            written = True
+        image = StoredImageDTO(
+            path=path,
+            variants=variants,
+            digest=digest,
+            placeholder=processed.placeholder,
+            color=processed.color,
+        )
+        return PreparedImage(image=image, files=files, written=written)
+
+    async def acquire(
+        self, prepared: PreparedImage, session: Optional[AsyncSession] = None
+    ) -> StoredImageDTO:
+        """Добавляет ссылку на подготовленное фото в транзакции session."""
+        image = prepared.image
+        deduplicated = await self.repo.acquire(
+            image.digest, image.path, image.variants,
+            sum(len(data) for _, data in prepared.files), session
+        )
+        if (
+            not deduplicated
+            and not prepared.written
+            and not await self.storage.exists(image.path)
+        ):
+            # Сборщик удалил освобождённые файлы между проверкой и acquire;
+            # после acquire он их уже не тронет
+            await self._save_files(prepared.files)
+        return image.model_copy(update={"deduplicated": deduplicated})
+
+    async def _save_files(self, files: list[tuple[str, bytes]]) -> None:
+        for file_path, data in files:
+            await self.storage.save(file_path, data)
+
+    async def release(
+        self, path: Optional[str], session: Optional[AsyncSession] = None
+    ) -> None:
+        """
+        Снимает ссылку на файл в транзакции session.
+
+        Сами файлы удаляет uploads.collector.MediaCollector вне запроса:
+        здесь транзакция ещё может откатиться.
+        """
+        if not path or path.startswith(("http://", "https://")):
+            return
+        # Файлы до хранилища без записи: их найдёт сборщик как потерянные
+        await self.repo.release(path, session)
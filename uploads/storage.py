@@ -0,0 +1,388 @@
+import asyncio
+import os
+import posixpath
+import re
+import uuid
+from contextlib import AsyncExitStack
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional
+
+from core.logger import get_logger
+
+logger = get_logger(__name__)
+
+CONTENT_TYPES = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".webp": "image/webp",
+    ".avif": "image/avif",
+}
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# {digest[:2]}/{digest}.jpg или {digest[:2]}/{digest}_card.webp
+CONTENT_KEY_RE = re.compile(r"(?:^|/)([0-9a-f]{2})/(\1[0-9a-f]{62})(?:_[a-z]+)?\.[a-z]+$")
+
+# Каталоги внутри media_root с файлами, загруженными до хранилища
+LEGACY_MEDIA_DIRS = ("items", "avatars")
+
+
+def content_type_for(key: str) -> str:
+    return CONTENT_TYPES.get(os.path.splitext(key)[1].lower(), "application/octet-stream")
+
+
+def content_digest(key: str) -> Optional[str]:
+    """sha256 из ключа хранилища; None у файлов, загруженных до хранилища."""
+    match = CONTENT_KEY_RE.search(key)
+    return match.group(2) if match else None
+
+
+def _normalized(path: str) -> Optional[str]:
+    # Путь без "..", "." и лишних "/"; иначе None
+    if not path or "\\" in path or "\0" in path:
+        return None
+    normalized = posixpath.normpath(path)
+    if normalized != path.rstrip("/") or normalized.startswith("/"):
+        return None
+    if ".." in normalized.split("/"):
+        return None
+    return normalized
+
+
+def media_key(media_root: str, path: str) -> Optional[str]:
+    """
+    Ключ файла по пути внутри media_root (из URL).
+
+    None для всего, кроме файлов хранилища (ab/<sha256>.jpg) и старых
+    каталогов LEGACY_MEDIA_DIRS: остальное в media_root не отдаём.
+    """
+    normalized = _normalized(path)
+    if normalized is None:
+        return None
+    directory, _, name = normalized.partition("/")
+    if not CONTENT_KEY_RE.match(normalized) and not (
+        directory in LEGACY_MEDIA_DIRS and name
+    ):
+        return None
+    return f"{media_root}/{normalized}"
+
+
+@dataclass
+class StoredObject:
+    key: str
+    size: int
+    modified: datetime
+
+
+class MediaStorage:
+    """
+    Хранилище файлов по ключу.
+
+    Ключ - путь, который лежит в базе (media/ab/<sha256>.jpg). Запись
+    атомарна: читатель видит либо целый файл, либо никакого.
+    """
+
+    async def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    async def read(self, key: str) -> bytes:
+        """Содержимое файла; FileNotFoundError, если его нет."""
+        raise NotImplementedError
+
+    async def save(self, key: str, data: bytes) -> None:
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> None:
+        """Удаляет файл; отсутствующий файл не ошибка."""
+        raise NotImplementedError
+
+    def iter_objects(self, prefix: str = "") -> AsyncIterator[StoredObject]:
+        raise NotImplementedError
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Путь на диске, если файл можно отдать без загрузки в память."""
+        return None
+
+    async def close(self) -> None:
+        pass
+
+
+class LocalStorage(MediaStorage):
+    """
+    Локальный диск; файловые операции уходят в пул потоков.
+
+    root - каталог медиа, ключ {prefix}/ab/x.jpg лежит в root/ab/x.jpg.
+    Другие ключи и ключи с ".." - ValueError: код приложения рядом
+    с каталогом медиа через хранилище недоступен.
+    """
+
+    def __init__(self, root: str, prefix: str = "media"):
+        self.root = os.path.abspath(root)
+        self.prefix = prefix.strip("/")
+
+    def _path(self, key: str) -> str:
+        # Ключи старых записей приходят из базы: наружу root не выходим
+        normalized = _normalized(key)
+        if normalized is None or not (
+            normalized == self.prefix or normalized.startswith(f"{self.prefix}/")
+        ):
+            raise ValueError(f"Media key outside storage root: {key}")
+        path = os.path.abspath(
+            os.path.join(self.root, normalized[len(self.prefix):].lstrip("/"))
+        )
+        if os.path.commonpath([self.root, path]) != self.root:
+            raise ValueError(f"Media key outside storage root: {key}")
+        return path
+
+    def local_path(self, key: str) -> Optional[str]:
+        return self._path(key)
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread(os.path.exists, self._path(key))
+
+    async def read(self, key: str) -> bytes:
+        return await asyncio.to_thread(self._read, self._path(key))
+
+    @staticmethod
+    def _read(path: str) -> bytes:
+        with open(path, "rb") as file:
+            return file.read()
+
+    async def save(self, key: str, data: bytes) -> None:
+        await asyncio.to_thread(self._save, self._path(key), data)
+
+    @staticmethod
+    def _save(path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "wb") as file:
+                file.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._delete, self._path(key))
+
+    @staticmethod
+    def _delete(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    async def iter_objects(self, prefix: str = "") -> AsyncIterator[StoredObject]:
+        # Обход по одной директории за раз: дерево целиком в память не читается
+        pending = [self._path(prefix)]
+        while pending:
+            entries = await asyncio.to_thread(self._scan, pending.pop())
+            for path, is_dir, size, mtime in entries:
+                if is_dir:
+                    pending.append(path)
+                else:
+                    yield StoredObject(
+                        key="/".join((
+                            self.prefix,
+                            os.path.relpath(path, self.root).replace(os.sep, "/"),
+                        )),
+                        size=size,
+                        modified=datetime.fromtimestamp(mtime, timezone.utc),
+                    )
+
+    @staticmethod
+    def _scan(directory: str) -> list[tuple[str, bool, int, float]]:
+        entries = []
+        try:
+            with os.scandir(directory) as iterator:
+                for entry in iterator:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            entries.append((entry.path, True, 0, 0.0))
+                        elif entry.is_file(follow_symlinks=False):
+                            stat = entry.stat(follow_symlinks=False)
+                            entries.append(
+                                (entry.path, False, stat.st_size, stat.st_mtime)
+                            )
+                    except FileNotFoundError:
+                        pass
+        except FileNotFoundError:
+            pass
+        return entries
+
+
+def _is_not_found(exc) -> bool:
+    # HEAD отвечает без тела, поэтому там код "404", а не NoSuchKey
+    return exc.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound")
+
+
+class S3Storage(MediaStorage):
+    """
+    S3-совместимое хранилище (AWS S3, MinIO) через aiobotocore.
+
+    Пакет импортируется только при выборе этого драйвера. Файлы больше
+    multipart_threshold загружаются частями по part_size; объект появляется
+    в бакете только после complete, так что запись тоже атомарна.
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        access_key_id: Optional[str] = None,
+        secret_access_key: Optional[str] = None,
+        multipart_threshold: int = 8 * 1024 * 1024,
+        part_size: int = 8 * 1024 * 1024,
+    ):
+        try:
+            from aiobotocore.session import get_session
+            from botocore.exceptions import ClientError
+        except ImportError as exc:
+            raise RuntimeError(
+                "media_storage=s3, но пакет aiobotocore не установлен "
+                "(poetry install -E s3)"
+            ) from exc
+        # S3 не принимает части меньше 5 МБ (кроме последней)
+        if part_size < 5 * 1024 * 1024:
+            raise ValueError("part_size must be at least 5 MiB")
+        self.bucket = bucket
+        self.multipart_threshold = multipart_threshold
+        self.part_size = part_size
+        self._client_error = ClientError
+        self._session = get_session()
+        self._client_kwargs = {
+            "endpoint_url": endpoint_url,
+            "region_name": region,
+            "aws_access_key_id": access_key_id,
+            "aws_secret_access_key": secret_access_key,
+        }
+        self._exit_stack = AsyncExitStack()
+        self._client = None
+        self._lock = asyncio.Lock()
+
+    async def _get_client(self):
+        if self._client is None:
+            async with self._lock:
+                if self._client is None:
+                    self._client = await self._exit_stack.enter_async_context(
+                        self._session.create_client("s3", **self._client_kwargs)
+                    )
+        return self._client
+
+    async def exists(self, key: str) -> bool:
+        client = await self._get_client()
+        try:
+            await client.head_object(Bucket=self.bucket, Key=key)
+        except self._client_error as exc:
+            if _is_not_found(exc):
+                return False
+            raise
+        return True
+
+    async def read(self, key: str) -> bytes:
+        client = await self._get_client()
+        try:
+            response = await client.get_object(Bucket=self.bucket, Key=key)
+        except self._client_error as exc:
+            if _is_not_found(exc):
+                raise FileNotFoundError(key) from exc
+            raise
+        async with response["Body"] as body:
+            return await body.read()
+
+    async def save(self, key: str, data: bytes) -> None:
+        client = await self._get_client()
+        # Заголовки объекта бакет и CDN отдают клиенту как есть
+        headers = {"ContentType": content_type_for(key)}
+        if content_digest(key):
+            headers["CacheControl"] = IMMUTABLE_CACHE_CONTROL
+        if len(data) <= self.multipart_threshold:
+            await client.put_object(Bucket=self.bucket, Key=key, Body=data, **headers)
+            return
+
+        upload = await client.create_multipart_upload(
+            Bucket=self.bucket, Key=key, **headers
+        )
+        upload_id = upload["UploadId"]
+        try:
+            parts = []
+            view = memoryview(data)
+            for number, offset in enumerate(range(0, len(data), self.part_size), 1):
+                part = await client.upload_part(
+                    Bucket=self.bucket, Key=key, UploadId=upload_id,
+                    PartNumber=number, Body=bytes(view[offset:offset + self.part_size]),
+                )
+                parts.append({"PartNumber": number, "ETag": part["ETag"]})
+            await client.complete_multipart_upload(
+                Bucket=self.bucket, Key=key, UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+        except BaseException:
+            # Незавершённые части занимают место в бакете, пока их не удалить
+            try:
+                await client.abort_multipart_upload(
+                    Bucket=self.bucket, Key=key, UploadId=upload_id
+                )
+            except self._client_error as exc:
+                logger.warning("Failed to abort multipart upload %s: %s", key, exc)
+            raise
+
+    async def delete(self, key: str) -> None:
+        client = await self._get_client()
+        # DeleteObject идемпотентен: отсутствующий ключ не ошибка
+        await client.delete_object(Bucket=self.bucket, Key=key)
+
+    async def iter_objects(self, prefix: str = "") -> AsyncIterator[StoredObject]:
+        client = await self._get_client()
+        paginator = client.get_paginator("list_objects_v2")
+        async for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for item in page.get("Contents", []):
+                yield StoredObject(
+                    key=item["Key"], size=item["Size"], modified=item["LastModified"]
+                )
+
+    async def close(self) -> None:
+        await self._exit_stack.aclose()
+        self._client = None
+
+
+def create_media_storage(
+    backend: str = "local",
+    root: Optional[str] = None,
+    prefix: str = "media",
+    bucket: str = "",
+    endpoint_url: Optional[str] = None,
+    region: Optional[str] = None,
+    access_key_id: Optional[str] = None,
+    secret_access_key: Optional[str] = None,
+    multipart_threshold: int = 8 * 1024 * 1024,
+    part_size: int = 8 * 1024 * 1024,
+) -> MediaStorage:
+    """
+    local - диск воркера (общий том), s3 - бакет, общий для всех реплик.
+
+    root - каталог медиа для local, prefix - media_root в ключах.
+    """
+    if backend == "s3":
+        return S3Storage(
+            bucket,
+            endpoint_url=endpoint_url,
+            region=region,
+            access_key_id=access_key_id,
+            secret_access_key=secret_access_key,
+            multipart_threshold=multipart_threshold,
+            part_size=part_size,
+        )
+    if backend != "local":
+        raise ValueError(f"Unknown media storage backend: {backend}")
+    # Без явного каталога хранилище смотрело бы в рабочую директорию
+    if not root:
+        raise ValueError("Local media storage needs an explicit root directory")
+    return LocalStorage(root, prefix)
@@ -1,6 +1,8 @@
 from datetime import datetime
+from typing import Optional
 
-from sqlalchemy import Boolean, DateTime, String, func
+from sqlalchemy import Boolean, DateTime, Index, Integer, String, func
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from core.database import BaseModel
@@ -8,6 +10,13 @@ from core.database import BaseModel
 
 class User(BaseModel):
     __tablename__ = "users"
+    __table_args__ = (
+        # Поиск магазинов в избранном: ilike('%q%') по name
+        Index(
+            "ix_users_name_trgm", "name",
+            postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     email: Mapped[str] = mapped_column(
@@ -22,6 +31,14 @@ class User(BaseModel):
     )
     iin_bin: Mapped[str] = mapped_column(String(12), nullable=True)
     avatar: Mapped[str] = mapped_column(String(255), nullable=True)
+    avatar_variants: Mapped[Optional[dict]] = mapped_column(JSONB, nullable=True)
+    # BlurHash и #rrggbb, см. core.placeholders
+    avatar_placeholder: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    avatar_color: Mapped[Optional[str]] = mapped_column(String(7), nullable=True)
+    # Версия access-токенов (claim ver), см. auth.services.TokenVersions
+    token_version: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
 
     refresh_tokens: Mapped[list["RefreshToken"]] = relationship(
         back_populates="user"
@@ -42,9 +59,13 @@ class User(BaseModel):
     favorited_by: Mapped[list["FavoriteShop"]] = relationship(
         back_populates="shop", foreign_keys="FavoriteShop.shop_id"
     )
+    cart: Mapped[list["Cart"]] = relationship(back_populates="user")
+    orders: Mapped[list["Order"]] = relationship(back_populates="user")
 
 
 from accounts.models import RecoveryToken, VerificationToken
 from auth.models import RefreshToken
 from items.models import Item
-from favorites.models import FavoriteShop, FavoriteItem
\ No newline at end of file
+from favorites.models import FavoriteShop, FavoriteItem
+from cart.models import Cart
+from orders.models import Order
\ No newline at end of file
@@ -1,21 +1,19 @@
-import io
-import os
 from datetime import datetime
 from typing import Optional
 
 from fastapi import HTTPException, UploadFile
-from PIL import Image
 from sqlalchemy import update
 from sqlalchemy.future import select
 
-from auth.schemas import SignUpSchema
-from core.logger import logger
-from core.repositories import BaseRepository
-from core.utils import generate_hashed_filename
+from auth.schemas import SignUpSchema, TokenVersionDTO
+from core.cache import ObjectCache
+from core.database import primary_scope
+from core.repositories import BaseRepository, read_only
+from uploads.services import MediaService
 
 from .models import User
 from .schemas import (
-    UserDTO, UserWithPasswordDTO,
+    PrincipalDTO, UserDTO, UserWithPasswordDTO,
     UpdateShop,
     UpdateShopResponseSchema,
     UpdateShopImageResponseSchema
@@ -23,6 +21,17 @@ from .schemas import (
 
 
 class UserRepository(BaseRepository):
+    def __init__(
+        self,
+        session_factory,
+        shop_cache: ObjectCache,
+        principal_cache: ObjectCache,
+        media: MediaService,
+    ):
+        super().__init__(session_factory)
+        self.shop_cache = shop_cache
+        self.principal_cache = principal_cache
+        self.media = media
 
     async def create_user(
         self, schema: SignUpSchema, hashed_password: str
@@ -60,15 +69,15 @@ class UserRepository(BaseRepository):
                     return UserDTO.model_validate(user)
             return None
 
+    @read_only
     async def get_user_by_id(
         self, user_id: int, pwd_required: bool = False, is_shop: bool | None = None
     ) -> Optional[UserDTO]:
         async with self.get_session() as session:
-            query = select(User).where(User.id == user_id)
-            if is_shop is not None:
-                query = query.where(User.is_shop == is_shop)
-            results = await session.execute(query)
-            user = results.scalars().first()
+            # session.get сначала смотрит в identity map текущего запроса
+            user = await session.get(User, user_id)
+            if is_shop is not None and user and user.is_shop != is_shop:
+                user = None
             if user:
                 if pwd_required:
                     return UserWithPasswordDTO.model_validate(user)
@@ -76,62 +85,74 @@ class UserRepository(BaseRepository):
                     return UserDTO.model_validate(user)
             return None
 
+    async def get_principal(self, user_id: int) -> Optional[PrincipalDTO]:
+        return await self.principal_cache.get_or_load(
+            user_id, lambda: self._load_principal(user_id)
+        )
+
+    async def _load_principal(self, user_id: int) -> Optional[PrincipalDTO]:
+        # Всегда primary: после смены пароля или верификации реплика может
+        # отставать, а принципал в кэше живёт principal_cache_ttl
+        with primary_scope():
+            return await self._select_principal(user_id)
+
+    async def _select_principal(self, user_id: int) -> Optional[PrincipalDTO]:
+        async with self.get_session() as session:
+            result = await session.execute(
+                select(
+                    User.id, User.email, User.is_shop, User.verified, User.iin_bin
+                ).where(User.id == user_id)
+            )
+            row = result.first()
+            if row:
+                return PrincipalDTO.model_validate(row)
+            return None
+
+    async def get_token_version(self, user_id: int) -> Optional[TokenVersionDTO]:
+        async with self.get_session() as session:
+            result = await session.execute(
+                select(User.token_version).where(User.id == user_id)
+            )
+            version = result.scalar()
+            if version is not None:
+                return TokenVersionDTO(version=version)
+            return None
+
+    async def bump_token_version(self, user_id: int) -> int:
+        async with self.get_session() as session:
+            result = await session.execute(
+                update(User)
+                .where(User.id == user_id)
+                .values(token_version=User.token_version + 1)
+                .returning(User.token_version)
+            )
+            version = result.scalar()
+            await session.commit()
+            return version or 0
+
+    async def _invalidate(self, user_id: int) -> None:
+        await self.principal_cache.invalidate(user_id)
+        await self.shop_cache.invalidate(user_id)
+
+    async def get_shop(self, shop_id: int) -> Optional[UserDTO]:
+        """Публичные данные магазина, через кэш (без пароля)."""
+        return await self.shop_cache.get_or_load(
+            shop_id, lambda: self.get_user_by_id(shop_id, is_shop=True)
+        )
+
     async def verify_user(self, user_id: int) -> None:
         async with self.get_session() as session:
             query = update(User).where(User.id == user_id).values(verified=True)
             await session.execute(query)
             await session.commit()
+            await self._invalidate(user_id)
 
     async def update_password_by_user_id(self, user_id: int, new_password: str) -> None:
         async with self.get_session() as session:
             query = update(User).where(User.id == user_id).values(password=new_password)
             await session.execute(query)
             await session.commit()
-
-    async def _upload_photo(self, user_id: int, photo: UploadFile) -> str:  
-        allowed_types = ["image/jpeg", "image/png", "image/heif"]
-        if photo.content_type not in allowed_types:
-            logger.error(f"Invalid photo type: {photo.content_type}")
-            raise HTTPException(status_code=422, detail="error.photo.invalid_type")
-
-        max_size = 5 * 1024 * 1024
-        content = await photo.read()
-        file_size = len(content)
-
-        if file_size > max_size:
-            image = Image.open(io.BytesIO(content))
-
-            max_dimension = 2000
-            quality = 95
-
-            while file_size > max_size and (quality > 20 or max_dimension > 800):
-                if max(image.size) > max_dimension:
-                    ratio = min(max_dimension / max(image.size[0], image.size[1]), 1.0)
-                    new_size = tuple(int(dim * ratio) for dim in image.size)
-                    image = image.resize(new_size, Image.Resampling.LANCZOS)
-
-                output = io.BytesIO()
-                image.save(output, format="JPEG", quality=quality, optimize=True)
-                content = output.getvalue()
-                file_size = len(content)
-
-                if file_size > max_size:
-                    quality -= 5
-                    max_dimension = int(max_dimension * 0.9)
-
-                if file_size > max_size:
-                    image = Image.open(io.BytesIO(content))
-
-            if file_size > max_size:
-                raise HTTPException(status_code=422, detail="error.photo.too_large")
-
-        os.makedirs("media/avatars", exist_ok=True)
-
-        hashed_filename = generate_hashed_filename(photo.filename)
-        file_location = f"media/avatars/{user_id}_{hashed_filename}"
-        with open(file_location, "wb") as file:
-            file.write(content)
-        return file_location
+            await self._invalidate(user_id)
 
     async def create_user_oauth(
         self, email: str, is_shop: bool
@@ -164,22 +185,27 @@ class UserRepository(BaseRepository):
                     setattr(shop, key, value)
                 await session.commit()
                 await session.refresh(shop)
+                await self._invalidate(user.id)
                 return UserDTO.model_validate(shop)
             raise HTTPException(status_code=404, detail="error.shop.not_found")
 
     async def update_shop_photo(
         self, user: UserDTO, photo: UploadFile
     ) -> UserDTO:
+        # Обработка до транзакции: соединение не держится, пока работает Pillow
+        prepared = await self.media.prepare_upload(photo)
         async with self.get_session() as session:
             shop = await session.execute(select(User).where(User.id == user.id))
             shop = shop.scalar()
             if shop:
-                current_photo = shop.avatar
-                if current_photo:
-                    os.remove(current_photo)
-                shop.avatar = await self._upload_photo(user.id, photo)
+                stored = await self.media.acquire(prepared, session)
+                # OAuth-аватар (внешнюю ссылку) release пропускает
+                await self.media.release(shop.avatar, session)
+                shop.avatar, shop.avatar_variants = stored.path, stored.variants
+                shop.avatar_placeholder, shop.avatar_color = stored.placeholder, stored.color
                 await session.commit()
                 await session.refresh(shop)
+                await self._invalidate(user.id)
                 return UserDTO.model_validate(shop)
             raise HTTPException(status_code=404, detail="error.shop.not_found")
 
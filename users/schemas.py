@@ -3,7 +3,7 @@ from typing import Optional
 
 from pydantic import BaseModel 
 
-from core.schemas import StatusOkSchema
+from core.schemas import ImageVariantDTO, MediaUrl, StatusOkSchema
 
 
 class UserPublicData(BaseModel):
@@ -13,7 +13,11 @@ class UserPublicData(BaseModel):
     verified: bool
     created_at: datetime
     iin_bin: Optional[str] = None
-    avatar: Optional[str] = None
+    avatar: Optional[MediaUrl] = None
+    avatar_variants: Optional[dict[str, ImageVariantDTO]] = None
+    # BlurHash и основной цвет: клиент рисует их, пока грузится аватар
+    avatar_placeholder: Optional[str] = None
+    avatar_color: Optional[str] = None
 
 
 class UserDTO(UserPublicData):
@@ -25,6 +29,18 @@ class UserWithPasswordDTO(UserDTO):
     password: str
 
 
+class PrincipalDTO(BaseModel):
+    """Поля, которые проверяют зависимости auth.depends; без пароля."""
+    id: int
+    email: str
+    is_shop: bool
+    verified: bool
+    iin_bin: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
 class GetMeResponseSchema(StatusOkSchema):
     data: UserDTO
 
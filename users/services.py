@@ -1,13 +1,14 @@
 from typing import Optional
 
-import bcrypt
-
 from auth.schemas import SignUpSchema
+from auth.services import TokenVersions
 from core.environment import env
+from core.hashing import PasswordHasher
 from fastapi import UploadFile
 from .repositories import UserRepository
 from .schemas import (
     GetMeResponseSchema,
+    PrincipalDTO,
     UserDTO,
     UpdateShop,
     UpdateShopResponseSchema,
@@ -15,8 +16,15 @@ from .schemas import (
 )
 
 class UserService:
-    def __init__(self, repo: UserRepository):
+    def __init__(
+        self,
+        repo: UserRepository,
+        token_versions: TokenVersions,
+        password_hasher: PasswordHasher,
+    ):
         self.repo = repo
+        self.token_versions = token_versions
+        self.password_hasher = password_hasher
 
     async def create_user(self, schema: SignUpSchema, hashed_password) -> UserDTO:
         
@@ -31,8 +39,17 @@ class UserService:
 
     async def verify_password(self, password: str, hashed_password: str) -> bool:
         peppered_password = password + env.secret_key
-        return bcrypt.checkpw(
-            peppered_password.encode("utf-8"), hashed_password.encode("utf-8")
+        return await self.password_hasher.verify(peppered_password, hashed_password)
+
+    async def rehash_password_if_needed(
+        self, user_id: int, password: str, hashed_password: str
+    ) -> None:
+        """Пересчитывает хэш после успешного входа, если сменилась стоимость."""
+        if not self.password_hasher.needs_rehash(hashed_password):
+            return
+        # Пароль тот же, поэтому версию токенов не поднимаем
+        await self.repo.update_password_by_user_id(
+            user_id, await self.get_password_hash(password)
         )
 
     async def get_user_by_id(
@@ -40,17 +57,28 @@ class UserService:
     ) -> UserDTO:
         return await self.repo.get_user_by_id(user_id, pwd_required, is_shop)
 
-    async def get_me(self, user: UserDTO) -> GetMeResponseSchema:
-        return GetMeResponseSchema(data=user)
+    async def get_principal(self, user_id: int) -> Optional[PrincipalDTO]:
+        return await self.repo.get_principal(user_id)
+
+    async def get_me(self, user: PrincipalDTO) -> GetMeResponseSchema:
+        # Зависимости отдают только PrincipalDTO, профиль читаем целиком
+        profile = await self.repo.get_user_by_id(user.id)
+        return GetMeResponseSchema(data=profile)
 
     async def verify_user(self, user: UserDTO) -> None:
         await self.repo.verify_user(user.id)
+        # В старых токенах verified=false, клиент перевыпустит их через refresh
+        await self.token_versions.bump(user.id)
+
+    async def update_password_by_user_id(
+        self, user_id: int, new_password: str
+    ) -> None:
+        await self.repo.update_password_by_user_id(user_id, new_password)
+        await self.token_versions.bump(user_id)
 
     async def get_password_hash(self, password: str) -> str:
         peppered_password = password + env.secret_key
-        salt = bcrypt.gensalt()
-        hashed_password = bcrypt.hashpw(peppered_password.encode("utf-8"), salt)
-        return hashed_password.decode("utf-8")
+        return await self.password_hasher.hash(peppered_password)
     
     async def create_user_oauth(
         self, name: str, email: str, avatar: Optional[str]